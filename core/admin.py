@@ -1,3 +1,14 @@
 from django.contrib import admin
+from .models import SiteStatistics
 
-# Register your models here.
+
+@admin.register(SiteStatistics)
+class SiteStatisticsAdmin(admin.ModelAdmin):
+    list_display = [
+        'total_templates', 'categories_count', 'total_downloads',
+        'total_orders', 'updated_at'
+    ]
+    readonly_fields = list_display
+    
+    def has_add_permission(self, request):
+        return False
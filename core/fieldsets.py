@@ -0,0 +1,246 @@
+"""
+Sparse fieldsets (`?fields=`) and expansion control (`?expand=`) for the
+REST API.
+
+`?fields=id,title,category.name` limits a response to the listed fields,
+using dotted paths for nested objects. `?expand=order,order.template`
+lists the nested relations to send as objects; any relation that is not
+listed is sent as its primary key, and `?expand=none` collapses them all.
+Without `expand` relations keep their default expansion.
+
+The queryset is narrowed to match with `only()`, `select_related()` and,
+for nested lists, `prefetch_related()`, so a smaller response also means
+less SQL.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from .pagination import get_queryset_ordering
+
+EXPAND_NONE = 'none'
+
+
+def parse_paths(value):
+    """Turn 'a,b.c,b.d' into {'a': {}, 'b': {'c': {}, 'd': {}}}"""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in path.strip().split('.'):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+def merge_paths(target, source):
+    """Merge the nested (non-leaf) paths of `source` into `target`"""
+    for name, children in source.items():
+        if children:
+            merge_paths(target.setdefault(name, {}), children)
+    return target
+
+
+class DynamicFieldsMixin:
+    """
+    ModelSerializer mixin accepting `fields` and `expand` path trees.
+    
+    Only nested serializers that also use this mixin are expandable. Use
+    `Meta.field_dependencies` to name the model columns read by method and
+    property fields, so querysets can still be narrowed when they are
+    requested.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+        if fields or expand is not None:
+            self.restrict(fields, expand)
+    
+    def restrict(self, fields=None, expand=None):
+        """
+        Drop fields missing from the `fields` tree and collapse relations
+        missing from the `expand` tree; None leaves either unchanged
+        """
+        if fields:
+            for name in list(self.fields):
+                if name not in fields:
+                    self.fields.pop(name)
+        
+        for name, field in list(self.fields.items()):
+            many = isinstance(field, serializers.ListSerializer)
+            nested = field.child if many else field
+            if not isinstance(nested, DynamicFieldsMixin):
+                continue
+            if expand is not None and name not in expand:
+                kwargs = {} if field.source == name else {'source': field.source}
+                self.fields[name] = serializers.PrimaryKeyRelatedField(
+                    read_only=True, many=many, **kwargs
+                )
+            else:
+                nested.restrict(
+                    (fields or {}).get(name) or None,
+                    expand.get(name) if expand is not None else None
+                )
+
+
+def get_field_plan(serializer):
+    """
+    Return `(columns, relations, prefetches)` for the model fields
+    `serializer` reads.
+    
+    `columns` is None when they cannot be determined, `relations` maps
+    each relation to follow with select_related to its own plan, and
+    `prefetches` maps each reverse foreign key to load with
+    prefetch_related to `(relation, child serializer)`; the child is None
+    when only primary keys are sent.
+    """
+    opts = serializer.Meta.model._meta
+    dependencies = getattr(serializer.Meta, 'field_dependencies', {})
+    columns = set()
+    relations = {}
+    prefetches = {}
+    complete = True
+    
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in dependencies:
+            columns.update(dependencies[name])
+            continue
+        try:
+            model_field = opts.get_field(field.source)
+        except FieldDoesNotExist:
+            complete = False
+            continue
+        if model_field.one_to_many and not model_field.concrete:
+            if (isinstance(field, serializers.ListSerializer) and
+                    isinstance(field.child, serializers.ModelSerializer)):
+                prefetches[model_field.name] = (model_field, field.child)
+            elif (isinstance(field, serializers.ManyRelatedField) and
+                    isinstance(field.child_relation, serializers.PrimaryKeyRelatedField)):
+                prefetches[model_field.name] = (model_field, None)
+            else:
+                complete = False
+            continue
+        if not model_field.concrete or model_field.many_to_many:
+            complete = False
+            continue
+        
+        columns.add(model_field.name)
+        if not model_field.is_relation:
+            continue
+        if isinstance(field, serializers.ModelSerializer):
+            relations[model_field.name] = get_field_plan(field)
+        elif not isinstance(field, serializers.PrimaryKeyRelatedField):
+            # e.g. StringRelatedField needs the whole related row, which
+            # is what only() loads when none of its columns are listed
+            relations[model_field.name] = (set(), {}, {})
+    
+    return (columns if complete else None, relations, prefetches)
+
+
+def build_prefetch(relation, serializer, prefix=''):
+    """
+    Return a Prefetch loading the reverse foreign key `relation` with the
+    columns `serializer` needs, or only primary keys without one
+    """
+    queryset = relation.related_model._default_manager.all()
+    # The foreign key lets prefetch_related match rows to their parents
+    link = relation.field.name
+    if serializer is None:
+        queryset = queryset.only(relation.related_model._meta.pk.name, link)
+    else:
+        queryset = narrow_queryset(queryset, serializer, keep=[link])
+    return Prefetch(prefix + relation.get_accessor_name(), queryset=queryset)
+
+
+def narrow_queryset(queryset, serializer, keep=()):
+    """
+    Limit `queryset` to the columns and joins that `serializer` needs,
+    plus the `keep` columns
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    if not isinstance(serializer, serializers.ModelSerializer):
+        return queryset
+    
+    only = list(keep)
+    select = []
+    prefetch = []
+    narrowable = True
+    
+    def walk(plan, prefix):
+        nonlocal narrowable
+        columns, relations, prefetches = plan
+        if columns is None:
+            narrowable = False
+        else:
+            only.extend(prefix + column for column in columns)
+        for name, relation_plan in relations.items():
+            select.append(prefix + name)
+            walk(relation_plan, f'{prefix}{name}__')
+        for relation, child in prefetches.values():
+            prefetch.append(build_prefetch(relation, child, prefix))
+    
+    walk(get_field_plan(serializer), '')
+    if not narrowable:
+        return queryset.select_related(*select) if select else queryset
+    
+    # Joins and prefetches the view added for relations that are no longer
+    # sent would clash with deferring their foreign keys
+    queryset = queryset.select_related(None).prefetch_related(None)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    
+    # Keep the ordering columns loaded; keyset pagination reads them
+    opts = queryset.model._meta
+    for ordering in get_queryset_ordering(queryset):
+        name = ordering.lstrip('-')
+        try:
+            if opts.get_field(name).concrete:
+                only.append(name)
+        except FieldDoesNotExist:
+            pass
+    return queryset.only(*only)
+
+
+class SparseFieldsetMixin:
+    """
+    ViewSet mixin wiring `?fields=` and `?expand=` into the serializer and
+    narrowing querysets for read requests
+    """
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+    
+    def get_sparse_options(self):
+        params = self.request.query_params
+        fields = parse_paths(params.get(self.fields_query_param, ''))
+        expand = params.get(self.expand_query_param, '').strip()
+        if not expand:
+            expand = None
+        elif expand == EXPAND_NONE:
+            expand = merge_paths({}, fields)
+        else:
+            # Asking for a relation's subfields implies expanding it
+            expand = merge_paths(parse_paths(expand), fields)
+        return fields or None, expand
+    
+    def get_serializer(self, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        if (issubclass(serializer_class, DynamicFieldsMixin) and
+                self.request.method in SAFE_METHODS):
+            fields, expand = self.get_sparse_options()
+            kwargs.setdefault('fields', fields)
+            kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+    
+    def narrow_queryset(self, queryset):
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        return narrow_queryset(queryset, self.get_serializer())
+    
+    def filter_queryset(self, queryset):
+        return self.narrow_queryset(super().filter_queryset(queryset))
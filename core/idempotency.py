@@ -0,0 +1,152 @@
+"""
+Idempotency-Key support for API create endpoints.
+
+A client that retries a POST with the same `Idempotency-Key` header gets
+the stored response of the first attempt back, marked with
+`Idempotent-Replayed: true`, instead of creating a second row. Replays
+read only the key table. Keys are scoped to the user, remembered for
+IDEMPOTENCY_KEY_TTL seconds and bound to a fingerprint of the request, so
+reusing a key for a different request is rejected with 422. A retry that
+arrives while the first attempt is still running gets 409.
+
+Only successful responses are stored; a failed attempt releases its key so
+the client can retry it. A key held by a request that never finished is
+taken over once IDEMPOTENCY_LOCK_TIMEOUT has passed.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from .models import IdempotencyKey
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+MAX_KEY_LENGTH = 255
+
+
+def get_ttl():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+
+
+def get_lock_timeout():
+    return timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60))
+
+
+def request_fingerprint(request):
+    """Hash the method, path and parsed body of a DRF request"""
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    body = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return hashlib.sha256(f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def claim_key(user, key, fingerprint):
+    """
+    Claim `key` for a new request. Returns `(record, claimed)`; when the
+    key is already held, `record` is the existing row.
+    """
+    while True:
+        now = timezone.now()
+        record = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if record is None:
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        user=user,
+                        key=key,
+                        fingerprint=fingerprint,
+                        expires_at=now + get_lock_timeout()
+                    )
+                return record, True
+            except IntegrityError:
+                # A concurrent request created it first
+                continue
+        
+        if record.expires_at > now:
+            return record, False
+        
+        # Take over an expired row with one conditional UPDATE, so only one
+        # of several concurrent retries wins it
+        taken = IdempotencyKey.objects.filter(pk=record.pk, expires_at__lte=now).update(
+            fingerprint=fingerprint,
+            response_status=None,
+            response_body=None,
+            created_at=now,
+            expires_at=now + get_lock_timeout()
+        )
+        if taken:
+            return record, True
+
+
+def store_response(record, response):
+    IdempotencyKey.objects.filter(pk=record.pk).update(
+        response_status=response.status_code,
+        response_body=response.data,
+        expires_at=timezone.now() + get_ttl()
+    )
+
+
+def release_key(record):
+    IdempotencyKey.objects.filter(pk=record.pk, response_status__isnull=True).delete()
+
+
+def replay_response(record, fingerprint):
+    if record.fingerprint != fingerprint:
+        return Response(
+            {'error': 'Idempotency-Key was already used for a different request'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if record.response_status is None:
+        return Response(
+            {'error': 'A request with this Idempotency-Key is still being processed'},
+            status=status.HTTP_409_CONFLICT
+        )
+    response = Response(record.response_body, status=record.response_status)
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(view_method):
+    """
+    Make a viewset action honour the Idempotency-Key header. Requests
+    without the header run as before.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if key is None:
+            return view_method(self, request, *args, **kwargs)
+        
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'error': f'Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        fingerprint = request_fingerprint(request)
+        record, claimed = claim_key(request.user, key, fingerprint)
+        if not claimed:
+            return replay_response(record, fingerprint)
+        
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except Exception:
+            release_key(record)
+            raise
+        
+        if status.is_success(response.status_code):
+            store_response(record, response)
+        else:
+            release_key(record)
+        return response
+    
+    return wrapper
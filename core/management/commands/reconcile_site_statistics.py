@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.models import SiteStatistics
+
+
+class Command(BaseCommand):
+    help = 'Recompute homepage statistics from their source tables'
+    
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            before = SiteStatistics.objects.filter(pk=SiteStatistics.SINGLETON_ID).values().first()
+            stats = SiteStatistics.reconcile()
+        
+        for field in ('total_templates', 'categories_count', 'total_downloads', 'total_orders'):
+            value = getattr(stats, field)
+            previous = before[field] if before else None
+            drift = '' if previous in (None, value) else f' (was {previous})'
+            self.stdout.write(f'{field}: {value}{drift}')
+        self.stdout.write(self.style.SUCCESS('Site statistics reconciled'))
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteStatistics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_templates', models.PositiveIntegerField(default=0, help_text='Active templates')),
+                ('categories_count', models.PositiveIntegerField(default=0)),
+                ('total_downloads', models.PositiveBigIntegerField(default=0)),
+                ('total_orders', models.PositiveIntegerField(default=0, help_text='Completed orders')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Site statistics',
+            },
+        ),
+    ]
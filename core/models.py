@@ -1,3 +1,113 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import F, Sum
 
-# Create your models here.
+
+class SiteStatistics(models.Model):
+    """
+    Singleton row with site-wide totals shown on the homepage.
+    
+    Totals are shifted incrementally by core.signals as their sources
+    change, and downloads by the download log rollup. Bulk writes that
+    bypass signals (bulk_create, queryset updates) are picked up by the
+    reconcile_site_statistics command.
+    """
+    SINGLETON_ID = 1
+    
+    total_templates = models.PositiveIntegerField(
+        default=0,
+        help_text="Active templates"
+    )
+    categories_count = models.PositiveIntegerField(default=0)
+    total_downloads = models.PositiveBigIntegerField(default=0)
+    total_orders = models.PositiveIntegerField(
+        default=0,
+        help_text="Completed orders"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = "Site statistics"
+    
+    def __str__(self):
+        return "Site statistics"
+    
+    @classmethod
+    def get(cls):
+        """Return the statistics row, creating it on first use"""
+        try:
+            return cls.objects.get(pk=cls.SINGLETON_ID)
+        except cls.DoesNotExist:
+            return cls.reconcile()
+    
+    @classmethod
+    def adjust(cls, **deltas):
+        """Shift one or more totals in a single UPDATE"""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        updated = cls.objects.filter(pk=cls.SINGLETON_ID).update(
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+        if not updated:
+            cls.reconcile()
+    
+    @classmethod
+    def compute(cls):
+        """Compute every total from its source table"""
+        from templates.models import Template, Category
+        from orders.models import Order
+        
+        return {
+            'total_templates': Template.objects.filter(active=True).count(),
+            'categories_count': Category.objects.count(),
+            'total_downloads': (
+                Template.objects.aggregate(total=Sum('download_count'))['total'] or 0
+            ),
+            'total_orders': Order.objects.filter(status='completed').count(),
+        }
+    
+    @classmethod
+    def reconcile(cls):
+        """Overwrite the stored totals with freshly computed ones"""
+        stats, _ = cls.objects.update_or_create(
+            pk=cls.SINGLETON_ID,
+            defaults=cls.compute()
+        )
+        return stats
+
+
+class IdempotencyKey(models.Model):
+    """
+    An Idempotency-Key sent with an API create request and the response it
+    produced, replayed when the client retries with the same key (see
+    core.idempotency). Rows live until `expires_at` and are removed by the
+    purge_idempotency_keys command or taken over by a later request.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(
+        max_length=64,
+        help_text="SHA-256 of the request method, path and body"
+    )
+    response_status = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        help_text="Empty while the first request is still running"
+    )
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_user_idempotency_key'),
+        ]
+    
+    def __str__(self):
+        return f"{self.key} ({self.user_id})"
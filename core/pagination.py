@@ -0,0 +1,214 @@
+"""
+Keyset (cursor) pagination shared by the HTML views and the REST API.
+
+Pages are addressed by the position of their boundary row on
+`(sort field, pk)` instead of an OFFSET, so fetching a deep page costs the
+same as fetching the first one and no COUNT(*) is needed.
+"""
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(value, pk, reverse=False):
+    payload = {'v': value, 'pk': pk}
+    if reverse:
+        payload['r'] = 1
+    data = json.dumps(payload, default=str, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return payload['v'], payload['pk'], bool(payload.get('r'))
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor(token)
+
+
+def get_queryset_ordering(queryset):
+    """Return the effective ordering of a queryset as a tuple of strings"""
+    ordering = queryset.query.order_by
+    if not ordering and queryset.query.default_ordering:
+        ordering = queryset.model._meta.ordering
+    return tuple(str(field) for field in ordering)
+
+
+class KeysetPage:
+    """
+    One page of a keyset-paginated queryset
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset on `(ordering field, pk)`.
+
+    `ordering` is a single model field name, optionally prefixed with '-';
+    the primary key breaks ties in the same direction.
+    """
+    def __init__(self, queryset, per_page, ordering='-created_at'):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.descending = ordering.startswith('-')
+        self.field = ordering.lstrip('-')
+
+    def get_ordering(self, reverse=False):
+        descending = self.descending != reverse
+        prefix = '-' if descending else ''
+        return [f'{prefix}{self.field}', f'{prefix}pk']
+
+    def get_position_filter(self, value, pk, reverse=False):
+        lookup = 'lt' if self.descending != reverse else 'gt'
+        return (
+            Q(**{f'{self.field}__{lookup}': value}) |
+            Q(**{self.field: value, f'pk__{lookup}': pk})
+        )
+
+    def page(self, cursor=None):
+        queryset = self.queryset
+        reverse = False
+        if cursor:
+            value, pk, reverse = decode_cursor(cursor)
+            try:
+                queryset = queryset.filter(self.get_position_filter(value, pk, reverse))
+            except (ValidationError, ValueError, TypeError) as exc:
+                raise InvalidCursor(cursor) from exc
+
+        rows = list(queryset.order_by(*self.get_ordering(reverse))[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = bool(rows), has_more
+        else:
+            has_next, has_previous = has_more, bool(cursor) and bool(rows)
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(getattr(rows[-1], self.field), rows[-1].pk)
+        if rows and has_previous:
+            previous_cursor = encode_cursor(
+                getattr(rows[0], self.field), rows[0].pk, reverse=True
+            )
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+class KeysetPaginationMixin:
+    """
+    ListView mixin that paginates by cursor when the sort is keyset-able
+    and `use_keyset_pagination()` is true, and by page number otherwise.
+    """
+    cursor_kwarg = 'cursor'
+    keyset_orderings = ()
+
+    def use_keyset_pagination(self):
+        return True
+
+    def get_keyset_ordering(self, queryset):
+        ordering = get_queryset_ordering(queryset)
+        if len(ordering) == 1 and ordering[0] in self.keyset_orderings:
+            return ordering[0]
+        return None
+
+    def paginate_queryset(self, queryset, page_size):
+        ordering = self.get_keyset_ordering(queryset)
+        if ordering is None or not self.use_keyset_pagination():
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KeysetPaginator(queryset, page_size, ordering)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Invalid cursor')
+
+        page.next_url = self.get_cursor_url(page.next_cursor)
+        page.previous_url = self.get_cursor_url(page.previous_cursor)
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def get_cursor_url(self, cursor):
+        if cursor is None:
+            return None
+        params = self.request.GET.copy()
+        params.pop('page', None)
+        params[self.cursor_kwarg] = cursor
+        return f'?{params.urlencode()}'
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    DRF pagination that serves cursor pages for keyset-able orderings.
+
+    Responses carry `next`/`previous` cursor links and no `count`. Requests
+    that pass `?page=`, or whose ordering cannot be keyed (search relevance,
+    download count), fall back to page-number pagination.
+    """
+    cursor_query_param = 'cursor'
+    keyset_orderings = ('-created_at', 'created_at', 'price', '-price', 'title', '-title')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset_page = None
+        ordering = get_queryset_ordering(queryset)
+        if (self.page_query_param in request.query_params or
+                len(ordering) != 1 or ordering[0] not in self.keyset_orderings):
+            return super().paginate_queryset(queryset, request, view)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        self.request = request
+        paginator = KeysetPaginator(queryset, page_size, ordering[0])
+        try:
+            self.keyset_page = paginator.page(request.query_params.get(self.cursor_query_param))
+        except InvalidCursor:
+            raise NotFound('Invalid cursor')
+        return list(self.keyset_page)
+
+    def get_cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        if self.keyset_page is None:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_cursor_link(self.keyset_page.next_cursor),
+            'previous': self.get_cursor_link(self.keyset_page.previous_cursor),
+            'results': data,
+        })
@@ -0,0 +1,74 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from templates.models import Template, Category
+from orders.models import Order
+from orders.signals import order_status_changed
+from .models import SiteStatistics
+
+
+@receiver(post_init, sender=Template)
+def remember_template_totals(sender, instance, **kwargs):
+    loaded = instance.__dict__ if instance.pk else {}
+    instance._stored_active = loaded.get('active')
+    instance._stored_download_count = loaded.get('download_count')
+
+
+@receiver(post_save, sender=Template)
+def update_statistics_on_template_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    
+    if created:
+        SiteStatistics.adjust(
+            total_templates=1 if instance.active else 0,
+            total_downloads=instance.download_count
+        )
+    elif instance._stored_active is None or instance._stored_download_count is None:
+        # Saved from a deferred instance, so the previous values are unknown
+        SiteStatistics.reconcile()
+    else:
+        SiteStatistics.adjust(
+            total_templates=int(instance.active) - int(instance._stored_active),
+            total_downloads=instance.download_count - instance._stored_download_count
+        )
+    
+    instance._stored_active = instance.active
+    instance._stored_download_count = instance.download_count
+
+
+@receiver(post_delete, sender=Template)
+def update_statistics_on_template_delete(sender, instance, **kwargs):
+    SiteStatistics.adjust(
+        total_templates=-1 if instance.active else 0,
+        total_downloads=-instance.download_count
+    )
+
+
+@receiver(post_save, sender=Category)
+def update_statistics_on_category_save(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        SiteStatistics.adjust(categories_count=1)
+
+
+@receiver(post_delete, sender=Category)
+def update_statistics_on_category_delete(sender, instance, **kwargs):
+    SiteStatistics.adjust(categories_count=-1)
+
+
+@receiver(order_status_changed)
+def update_statistics_on_order_status(sender, order, previous_status, created, **kwargs):
+    is_completed = order.status == 'completed'
+    if created:
+        SiteStatistics.adjust(total_orders=1 if is_completed else 0)
+    elif previous_status is None:
+        # Saved from a deferred instance, so the previous status is unknown
+        SiteStatistics.reconcile()
+    elif (previous_status == 'completed') != is_completed:
+        SiteStatistics.adjust(total_orders=1 if is_completed else -1)
+
+
+@receiver(post_delete, sender=Order)
+def update_statistics_on_order_delete(sender, instance, **kwargs):
+    if instance.status == 'completed':
+        SiteStatistics.adjust(total_orders=-1)
+
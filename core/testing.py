@@ -0,0 +1,68 @@
+"""
+Test helpers: catalog fixtures and per-endpoint query budgets
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def create_template(number, category=None, **fields):
+    """
+    Create an active test template; `number` keeps titles and slugs
+    unique, and `fields` override the defaults
+    """
+    from templates.models import Category, Template
+    
+    if category is None:
+        category, _ = Category.objects.get_or_create(
+            slug='utilities', defaults={'name': 'Utilities'}
+        )
+    values = {
+        'title': f'Test Bot {number}',
+        'slug': f'test-bot-{number}',
+        'description': 'Bot used by the tests',
+        'short_description': 'Test bot',
+        'price': 10,
+        'category': category,
+        'file': f'templates/files/test-bot-{number}.zip',
+        'features': ['Test'],
+    }
+    values.update(fields)
+    return Template.objects.create(**values)
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin checking that an endpoint stays within a fixed number of
+    queries however many rows it returns
+    """
+    
+    def capture_queries(self, client, url, **extra):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url, **extra)
+        self.assertEqual(response.status_code, 200, f'GET {url} returned {response.status_code}')
+        return context.captured_queries
+    
+    def format_queries(self, queries):
+        return '\n'.join(f'{i}. {query["sql"]}' for i, query in enumerate(queries, start=1))
+    
+    def assertQueryBudget(self, client, url, budget, add_rows=None, **extra):
+        """
+        Assert GET `url` runs at most `budget` queries and, if `add_rows`
+        is given, that it runs the same number after calling it
+        """
+        queries = self.capture_queries(client, url, **extra)
+        self.assertLessEqual(
+            len(queries), budget,
+            f'GET {url} ran {len(queries)} queries, budget is {budget}:\n'
+            f'{self.format_queries(queries)}'
+        )
+        if add_rows is None:
+            return
+        
+        add_rows()
+        grown = self.capture_queries(client, url, **extra)
+        self.assertEqual(
+            len(grown), len(queries),
+            f'GET {url} ran {len(grown)} queries after adding rows, '
+            f'{len(queries)} before:\n{self.format_queries(grown)}'
+        )
@@ -1,3 +1,72 @@
 from django.test import TestCase
+from core.testing import create_template
+from orders.models import Order
+from templates.models import Category
+from users.models import User
+from .models import SiteStatistics
 
-# Create your tests here.
+
+class SiteStatisticsTests(TestCase):
+    """
+    Model signals shift the site totals as their sources change, keeping
+    them equal to a full recount
+    """
+    
+    def assertTotals(self, **expected):
+        stats = SiteStatistics.get()
+        self.assertEqual(
+            {field: getattr(stats, field) for field in expected}, expected
+        )
+        computed = SiteStatistics.compute()
+        self.assertEqual({field: computed[field] for field in expected}, expected)
+    
+    def test_templates_and_categories(self):
+        template = create_template(1)
+        create_template(2, download_count=4)
+        self.assertTotals(total_templates=2, categories_count=1, total_downloads=4)
+        
+        template.active = False
+        template.save()
+        self.assertTotals(total_templates=1)
+        
+        template.active = True
+        template.download_count = 3
+        template.save()
+        self.assertTotals(total_templates=2, total_downloads=7)
+        
+        template.delete()
+        Category.objects.create(name='Games', slug='games')
+        self.assertTotals(total_templates=1, categories_count=2, total_downloads=4)
+    
+    def test_completed_orders(self):
+        user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+        template = create_template(1)
+        paid = Order.objects.create(user=user, template=template, amount=10, status='completed')
+        unpaid = Order.objects.create(user=user, template=template, amount=10)
+        self.assertTotals(total_orders=1)
+        
+        unpaid.complete()
+        self.assertTotals(total_orders=2)
+        
+        paid.status = 'refunded'
+        paid.save()
+        self.assertTotals(total_orders=1)
+        
+        unpaid.delete()
+        self.assertTotals(total_orders=0)
+    
+    def test_missing_row_is_reconciled(self):
+        create_template(1)
+        SiteStatistics.objects.all().delete()
+        
+        SiteStatistics.adjust(total_downloads=5)
+        
+        self.assertTotals(total_templates=1, total_downloads=0)
+    
+    def test_reconcile_repairs_bulk_writes(self):
+        create_template(1)
+        SiteStatistics.objects.update(total_templates=10, total_orders=3)
+        
+        SiteStatistics.reconcile()
+        
+        self.assertTotals(total_templates=1, total_orders=0)
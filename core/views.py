@@ -4,6 +4,7 @@ from django.http import JsonResponse
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views import View
 from templates.models import Template, Category
+from .models import SiteStatistics
 from .telegram_service import telegram_bot_service
 import logging
 
@@ -24,17 +25,16 @@ class HomeView(TemplateView):
             active=True
         ).select_related('category').order_by('-created_at')[:6]
         
+        # Trending templates (indexed time-decayed score)
+        context['trending_templates'] = Template.objects.filter(
+            active=True
+        ).exclude(trending_score=0).select_related('category').order_by('-trending_score')[:4]
+        
         # Get categories
         context['categories'] = Category.objects.all().order_by('name')
         
         # Statistics
-        context['stats'] = {
-            'total_templates': Template.objects.filter(active=True).count(),
-            'categories_count': Category.objects.count(),
-            'total_downloads': sum(
-                template.download_count for template in Template.objects.all()
-            ),
-        }
+        context['stats'] = SiteStatistics.get()
         
         return context
 
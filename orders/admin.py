@@ -1,7 +1,14 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
-from .models import Order
+from .models import DownloadEvent, DownloadStat, Order, OrderItem, PurchaseSummary
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    raw_id_fields = ['template']
+    readonly_fields = ['download_count']
 
 
 @admin.register(Order)
@@ -13,8 +20,10 @@ class OrderAdmin(admin.ModelAdmin):
     list_filter = ['status', 'created_at', 'completed_at']
     search_fields = [
         'id', 'user__username', 'user__email', 
-        'template__title'
+        'template__title', 'items__template__title'
     ]
+    actions = ['revoke_download_links']
+    inlines = [OrderItemInline]
     readonly_fields = [
         'id', 'download_token', 'created_at', 
         'completed_at', 'payment_link'
@@ -41,6 +50,8 @@ class OrderAdmin(admin.ModelAdmin):
     user_link.short_description = 'User'
     
     def template_link(self, obj):
+        if obj.template_id is None:
+            return "Multiple templates"
         url = reverse('admin:templates_template_change', args=[obj.template.pk])
         return format_html('<a href="{}">{}</a>', url, obj.template.title)
     template_link.short_description = 'Template'
@@ -57,7 +68,56 @@ class OrderAdmin(admin.ModelAdmin):
             return "No payment"
     payment_link.short_description = 'Payment'
     
+    @admin.action(description='Revoke download links')
+    def revoke_download_links(self, request, queryset):
+        for order in queryset:
+            order.revoke_download_links()
+        self.message_user(request, f'Revoked download links for {len(queryset)} orders')
+    
     def get_queryset(self, request):
         return super().get_queryset(request).select_related(
             'user', 'template'
         )
+
+
+
+@admin.register(PurchaseSummary)
+class PurchaseSummaryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'currency', 'completed_count', 'total_spent', 'last_purchase_at']
+    search_fields = ['user__username', 'user__email']
+    readonly_fields = ['user', 'currency', 'completed_count', 'total_spent', 'last_purchase_at']
+    
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(DownloadEvent)
+class DownloadEventAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'template_id', 'user_id', 'order_id', 'bytes_sent', 'client_ip']
+    list_filter = ['created_at']
+    search_fields = ['=order__id', '=template__id', '=user__id', 'client_ip']
+    date_hierarchy = 'created_at'
+    # The log is append-only
+    readonly_fields = [field.name for field in DownloadEvent._meta.fields]
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DownloadStat)
+class DownloadStatAdmin(admin.ModelAdmin):
+    list_display = ['day', 'template', 'downloads', 'bytes_sent']
+    list_filter = ['day']
+    search_fields = ['template__title']
+    raw_id_fields = ['template']
+    readonly_fields = ['template', 'day', 'downloads', 'bytes_sent']
+    date_hierarchy = 'day'
+    
+    def has_add_permission(self, request):
+        return False
@@ -1,27 +1,35 @@
+import time
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.utils import timezone
-from .models import Order
+from core.fieldsets import SparseFieldsetMixin
+from core.idempotency import idempotent
+from core.pagination import KeysetPagination
+from .models import Order, prefetch_items
 from .serializers import OrderSerializer, CreateOrderSerializer
+from .signing import build_download_url, get_ttl
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing orders
     """
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return Order.objects.filter(user=self.request.user).select_related(
+            'user', 'template', 'template__category'
+        ).prefetch_related(prefetch_items())
     
     def get_serializer_class(self):
         if self.action == 'create':
             return CreateOrderSerializer
         return OrderSerializer
     
+    @idempotent
     def create(self, request, *args, **kwargs):
         """
         Create a new order
@@ -30,7 +38,8 @@ class OrderViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         order = serializer.save(user=request.user)
         
-        # Return order data
+        # Return order data, reloaded with its templates and items
+        order = self.get_queryset().get(pk=order.pk)
         response_serializer = OrderSerializer(order)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
     
@@ -56,7 +65,8 @@ class OrderViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def download(self, request, pk=None):
         """
-        Generate download link for completed order
+        Generate download link for completed order, one per item for
+        cart orders
         """
         order = self.get_object()
         
@@ -66,19 +76,31 @@ class OrderViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Generate download token (would normally be a secure token)
-        download_token = order.generate_download_token()
+        if order.template_id is not None:
+            download_url, expires_at = build_download_url(order)
+            return Response({
+                'download_url': request.build_absolute_uri(download_url),
+                'expires_at': expires_at
+            })
         
-        return Response({
-            'download_url': f'/orders/{order.id}/download/{download_token}/',
-            'expires_at': timezone.now() + timezone.timedelta(hours=24)
-        })
+        # Cart orders have no file of their own: sign one link per item,
+        # all expiring together
+        expires = int(time.time() + get_ttl())
+        items = []
+        for item in order.items.all():
+            download_url, expires_at = build_download_url(order, expires, item)
+            items.append({
+                'id': item.pk,
+                'template': item.template_id,
+                'download_url': request.build_absolute_uri(download_url)
+            })
+        return Response({'items': items, 'expires_at': expires_at})
     
     @action(detail=False, methods=['get'])
     def my_orders(self, request):
         """
         Get current user's orders
         """
-        orders = self.get_queryset()
+        orders = self.narrow_queryset(self.get_queryset())
         serializer = self.get_serializer(orders, many=True)
         return Response(serializer.data)
\ No newline at end of file
@@ -0,0 +1,64 @@
+"""
+Session cart of templates to buy in one checkout.
+
+The cart only stores template ids; prices are read from the templates at
+checkout, when `Order.create_for_templates` turns the cart into a single
+order paid with one payment.
+"""
+from django.conf import settings
+
+SESSION_KEY = 'cart'
+
+
+def get_max_items():
+    return getattr(settings, 'CART_MAX_ITEMS', 50)
+
+
+class Cart:
+    """
+    Template ids kept in the session, in the order they were added
+    """
+    
+    def __init__(self, request):
+        self.session = request.session
+        self.template_ids = list(self.session.get(SESSION_KEY, []))
+    
+    def __len__(self):
+        return len(self.template_ids)
+    
+    def __contains__(self, template_id):
+        return template_id in self.template_ids
+    
+    def add(self, template_id):
+        """Add a template, returning False when the cart is full"""
+        if template_id in self.template_ids:
+            return True
+        if len(self.template_ids) >= get_max_items():
+            return False
+        self.template_ids.append(template_id)
+        self.save()
+        return True
+    
+    def remove(self, template_id):
+        if template_id in self.template_ids:
+            self.template_ids.remove(template_id)
+            self.save()
+    
+    def clear(self):
+        self.template_ids = []
+        self.save()
+    
+    def save(self):
+        self.session[SESSION_KEY] = self.template_ids
+    
+    def get_templates(self, exclude=()):
+        """
+        Return the cart's active templates in cart order, skipping ids in
+        `exclude` (e.g. templates the user already owns)
+        """
+        from templates.models import Template
+        
+        wanted = [pk for pk in self.template_ids if pk not in exclude]
+        templates = Template.objects.filter(pk__in=wanted, active=True).select_related('category')
+        by_id = {template.pk: template for template in templates}
+        return [by_id[pk] for pk in wanted if pk in by_id]
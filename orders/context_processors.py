@@ -0,0 +1,16 @@
+from django.utils.functional import SimpleLazyObject
+from .cart import Cart
+from .ownership import get_owned_template_ids
+
+
+def ownership(request):
+    """
+    Expose `owned_template_ids`, loaded only if a template uses it:
+    {% if template.id in owned_template_ids %}
+    """
+    return {'owned_template_ids': SimpleLazyObject(lambda: get_owned_template_ids(request))}
+
+
+def cart(request):
+    """Expose `cart_count`, the number of templates in the session cart"""
+    return {'cart_count': SimpleLazyObject(lambda: len(Cart(request)))}
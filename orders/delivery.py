@@ -0,0 +1,238 @@
+"""
+Template archive delivery.
+
+Archives are streamed from storage in fixed-size chunks with support for
+single byte-range requests, so interrupted downloads can resume. With
+`TEMPLATE_DOWNLOAD_OFFLOAD` set, Django only authorizes the request and
+the front server sends the file (nginx X-Accel-Redirect or Apache/lighttpd
+X-Sendfile), which also handles Range requests itself.
+
+Bundles of several archives are zipped on the fly while streaming, see
+iter_bundle.
+"""
+import hashlib
+import io
+import os
+import re
+import zipfile
+from urllib.parse import quote
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+
+CHUNK_SIZE = 64 * 1024
+
+OFFLOAD_ACCEL_REDIRECT = 'x-accel-redirect'
+OFFLOAD_SENDFILE = 'x-sendfile'
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """
+    Return the `(start, end)` byte positions (inclusive) requested by a
+    Range header, or None to send the whole file.
+    
+    Multiple ranges are answered with the whole file, which RFC 9110
+    allows. Raises RangeNotSatisfiable for ranges outside the file.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or (last and int(last) < start):
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def file_etag(name, size):
+    # Stored names are unique per upload, so name and size identify the content
+    return '"%s-%d"' % (hashlib.sha1(name.encode()).hexdigest()[:16], size)
+
+
+def iter_file(file, start, length, chunk_size=CHUNK_SIZE):
+    """Yield `length` bytes of `file` from `start`, then close it"""
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def get_offload_mode():
+    return getattr(settings, 'TEMPLATE_DOWNLOAD_OFFLOAD', None)
+
+
+def get_requested_range(request, field_file):
+    """
+    Return the byte range a request asks for, honouring If-Range; see
+    parse_range. Raises FileNotFoundError when the file is missing.
+    """
+    header = request.META.get('HTTP_RANGE')
+    if not header:
+        return None
+    size = field_file.size
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != file_etag(field_file.name, size):
+        # The client's partial copy is of another file version
+        return None
+    return parse_range(header, size)
+
+
+def build_download_response(field_file, filename, byte_range=None):
+    """
+    Return a response delivering `field_file` as an attachment named
+    `filename`, limited to `byte_range` from get_requested_range. Raises
+    FileNotFoundError when the file is missing.
+    """
+    mode = get_offload_mode()
+    if mode:
+        response = offload_response(field_file, mode)
+    else:
+        response = stream_response(field_file, byte_range)
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    response['Cache-Control'] = 'private, no-transform'
+    return response
+
+
+def stream_response(field_file, byte_range=None):
+    size = field_file.size
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+    
+    file = field_file.storage.open(field_file.name, 'rb')
+    response = StreamingHttpResponse(
+        iter_file(file, start, length),
+        status=206 if byte_range else 200,
+        content_type='application/zip',
+    )
+    response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = file_etag(field_file.name, size)
+    if byte_range:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+def offload_response(field_file, mode):
+    if mode == OFFLOAD_ACCEL_REDIRECT:
+        prefix = getattr(settings, 'TEMPLATE_DOWNLOAD_ACCEL_PREFIX', '/protected/')
+        header, value = 'X-Accel-Redirect', prefix.rstrip('/') + '/' + quote(field_file.name)
+    elif mode == OFFLOAD_SENDFILE:
+        # Needs local storage; raises NotImplementedError otherwise
+        path = field_file.storage.path(field_file.name)
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        header, value = 'X-Sendfile', path
+    else:
+        raise ValueError(f'Unknown TEMPLATE_DOWNLOAD_OFFLOAD mode {mode!r}')
+    
+    # The front server fills in the body, length and range headers
+    response = HttpResponse(content_type='application/zip')
+    response[header] = value
+    return response
+
+
+def range_not_satisfiable(field_file):
+    response = HttpResponse(status=416)
+    response['Content-Range'] = f'bytes */{field_file.size}'
+    return response
+
+
+class ZipSink(io.RawIOBase):
+    """
+    Write-only, unseekable target for zipfile that hands each written
+    block back to the caller instead of keeping it
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+        self.offset = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self.offset
+    
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def get_zip_date_time(storage, name):
+    try:
+        modified = timezone.localtime(storage.get_modified_time(name))
+    except (NotImplementedError, OSError):
+        modified = timezone.localtime()
+    # ZIP timestamps cannot predate 1980
+    return max(modified.timetuple()[:6], (1980, 1, 1, 0, 0, 0))
+
+
+def iter_bundle(files, chunk_size=CHUNK_SIZE):
+    """
+    Yield a ZIP archive of `files`, `(arcname, storage, name)` tuples, as
+    it is written.
+    
+    Members are stored uncompressed (they are archives already), and each
+    is copied `chunk_size` bytes at a time, so memory use stays constant
+    whatever the bundle size and nothing is written to disk. Sizes and
+    CRCs follow each member in data descriptors; ZIP64 records are added
+    when a member or the bundle passes 4 GiB.
+    """
+    sink = ZipSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as bundle:
+        for arcname, storage, name in files:
+            info = zipfile.ZipInfo(arcname, date_time=get_zip_date_time(storage, name))
+            info.compress_type = zipfile.ZIP_STORED
+            # A known size lets zipfile choose ZIP64 headers up front
+            info.file_size = storage.size(name)
+            info.external_attr = 0o644 << 16
+            with storage.open(name, 'rb') as source, bundle.open(info, 'w') as member:
+                while True:
+                    chunk = source.read(chunk_size)
+                    if not chunk:
+                        break
+                    member.write(chunk)
+                    yield sink.take()
+            yield sink.take()
+    # The central directory, written when the archive closes
+    yield sink.take()
+
+
+def bundle_response(files, filename):
+    """
+    Return a streaming response delivering `files` (see iter_bundle) as a
+    ZIP attachment named `filename`
+    """
+    response = StreamingHttpResponse(iter_bundle(files), content_type='application/zip')
+    response['Content-Disposition'] = content_disposition_header(True, filename)
+    response['Cache-Control'] = 'private, no-transform'
+    return response
@@ -0,0 +1,252 @@
+"""
+Append-only log of template downloads.
+
+Download views call `record` for every slot they claim. Events are only
+buffered there; the buffer is written with one bulk_create once
+DOWNLOAD_LOG_BATCH_SIZE events are waiting or DOWNLOAD_LOG_FLUSH_INTERVAL
+seconds have passed, checked when a request finishes (after its response
+was sent) and at exit. The request path itself writes nothing but the
+quota claim. Events still buffered when a process is killed are lost, and
+a buffer the database keeps refusing is capped at DOWNLOAD_LOG_MAX_BUFFER.
+
+`roll_up` (run by the rollup_download_events command) folds the logged
+events into Template.download_count, the trending scores, the site
+statistics and the daily DownloadStat rows. Each batch marks its events
+`rolled_up` in the same transaction that updates the totals, so every
+event is counted exactly once however late or out of order it was
+written. Concurrent rollups skip each other's locked events.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, IntegerField, Value, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT_LENGTH = 255
+
+# Templates updated per rollup UPDATE
+UPDATE_BATCH_SIZE = 500
+
+
+def get_batch_size():
+    return getattr(settings, 'DOWNLOAD_LOG_BATCH_SIZE', 200)
+
+
+def get_flush_interval():
+    return getattr(settings, 'DOWNLOAD_LOG_FLUSH_INTERVAL', 5)
+
+
+def get_max_buffer():
+    return getattr(settings, 'DOWNLOAD_LOG_MAX_BUFFER', 10000)
+
+
+def get_rollup_batch_size():
+    return getattr(settings, 'DOWNLOAD_ROLLUP_BATCH_SIZE', 1000)
+
+
+class DownloadLogBuffer:
+    """
+    Thread-safe in-process buffer of unsaved DownloadEvent instances
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.events = []
+        self.last_flush = time.monotonic()
+    
+    def __len__(self):
+        return len(self.events)
+    
+    def add(self, event):
+        with self.lock:
+            overflow = len(self.events) + 1 - get_max_buffer()
+            if overflow > 0:
+                del self.events[:overflow]
+                logger.warning('Download log buffer full, dropped %d events', overflow)
+            self.events.append(event)
+    
+    def is_due(self):
+        return bool(self.events) and (
+            len(self.events) >= get_batch_size()
+            or time.monotonic() - self.last_flush >= get_flush_interval()
+        )
+    
+    def flush(self):
+        """Write every buffered event, returning how many were written"""
+        from .models import DownloadEvent
+        
+        with self.lock:
+            events, self.events = self.events, []
+            self.last_flush = time.monotonic()
+        if not events:
+            return 0
+        
+        try:
+            DownloadEvent.objects.bulk_create(events, batch_size=get_batch_size())
+        except Exception:
+            logger.exception('Could not write %d download events', len(events))
+            # Keep them for the next flush, oldest first
+            with self.lock:
+                self.events[:0] = events[-get_max_buffer():]
+            return 0
+        return len(events)
+
+
+buffer = DownloadLogBuffer()
+
+
+def get_client_ip(request):
+    return request.META.get('REMOTE_ADDR') or None
+
+
+def record(request, line, bytes_sent):
+    """
+    Buffer a download event for `line` (an Order or OrderItem whose slot
+    was just claimed) served to `request`
+    """
+    from .models import DownloadEvent, Order
+    
+    if isinstance(line, Order):
+        order_id, item_id = line.pk, None
+    else:
+        order_id, item_id = line.order_id, line.pk
+    buffer.add(DownloadEvent(
+        order_id=order_id,
+        item_id=item_id,
+        template_id=line.template_id,
+        user_id=request.user.pk,
+        bytes_sent=bytes_sent,
+        client_ip=get_client_ip(request),
+        user_agent=request.META.get('HTTP_USER_AGENT', '')[:USER_AGENT_LENGTH],
+        created_at=timezone.now()
+    ))
+
+
+def flush():
+    return buffer.flush()
+
+
+def flush_if_due():
+    if buffer.is_due():
+        buffer.flush()
+
+
+atexit.register(flush)
+
+
+def roll_up(batch_size=None):
+    """
+    Count every event not rolled up yet, DOWNLOAD_ROLLUP_BATCH_SIZE events
+    per transaction. Returns the number of events counted.
+    """
+    batch_size = batch_size or get_rollup_batch_size()
+    counted = 0
+    while True:
+        processed, batch_counted = roll_up_batch(batch_size)
+        counted += batch_counted
+        if processed < batch_size:
+            return counted
+
+
+def roll_up_batch(batch_size):
+    """
+    Fold up to `batch_size` pending events into the template totals,
+    trending scores, site statistics and daily stats in one transaction.
+    Returns how many events were processed and how many were counted.
+    """
+    from core.models import SiteStatistics
+    from templates.cache import bump_generation_later
+    from templates.models import Template, TemplateEvent
+    from templates.trending import add_scores, add_scores_expression, event_score, get_half_life
+    from .models import DownloadEvent
+    
+    half_life = get_half_life()
+    with transaction.atomic():
+        events = list(
+            DownloadEvent.objects.select_for_update(skip_locked=True)
+            .filter(rolled_up=False)
+            .order_by('pk')
+            .values_list('pk', 'template_id', 'bytes_sent', 'created_at')[:batch_size]
+        )
+        if not events:
+            return 0, 0
+        
+        downloads = Counter()
+        scores = defaultdict(float)
+        daily = defaultdict(lambda: [0, 0])
+        for _, template_id, bytes_sent, created_at in events:
+            downloads[template_id] += 1
+            scores[template_id] = add_scores(
+                scores[template_id], event_score(TemplateEvent.DOWNLOAD, created_at, half_life)
+            )
+            stat = daily[template_id, timezone.localdate(created_at)]
+            stat[0] += 1
+            stat[1] += bytes_sent
+        
+        # Events of deleted templates stay in the log but count nowhere
+        existing = set(
+            Template.objects.filter(pk__in=list(downloads)).values_list('pk', flat=True)
+        )
+        counted = sum(count for pk, count in downloads.items() if pk in existing)
+        if existing:
+            ids = sorted(existing)
+            for start in range(0, len(ids), UPDATE_BATCH_SIZE):
+                batch = ids[start:start + UPDATE_BATCH_SIZE]
+                Template.objects.filter(pk__in=batch).update(
+                    download_count=F('download_count') + Case(
+                        *[When(pk=pk, then=Value(downloads[pk])) for pk in batch],
+                        default=Value(0),
+                        output_field=IntegerField()
+                    ),
+                    trending_score=add_scores_expression(Case(
+                        *[When(pk=pk, then=Value(scores[pk])) for pk in batch],
+                        output_field=FloatField()
+                    ))
+                )
+            TemplateEvent.objects.bulk_create(
+                [
+                    TemplateEvent(template_id=template_id, kind=TemplateEvent.DOWNLOAD, created_at=at)
+                    for _, template_id, _, at in events if template_id in existing
+                ],
+                batch_size=1000
+            )
+            update_daily_stats({key: value for key, value in daily.items() if key[0] in existing})
+            SiteStatistics.adjust(total_downloads=counted)
+            transaction.on_commit(bump_generation_later)
+        
+        DownloadEvent.objects.filter(pk__in=[event[0] for event in events]).update(rolled_up=True)
+    return len(events), counted
+
+
+def update_daily_stats(daily):
+    """Add `{(template_id, day): [downloads, bytes_sent]}` to the DownloadStat rows"""
+    from .models import DownloadStat
+    
+    # Locked so a concurrent rollup cannot overwrite these increments; two
+    # rollups inserting the same row fail one transaction, whose events are
+    # simply counted by the next run
+    stats = {
+        (stat.template_id, stat.day): stat
+        for stat in DownloadStat.objects.select_for_update().filter(
+            template_id__in={template_id for template_id, _ in daily},
+            day__in={day for _, day in daily}
+        )
+    }
+    changed = []
+    added = []
+    for key, (count, bytes_sent) in daily.items():
+        stat = stats.get(key)
+        if stat is None:
+            added.append(DownloadStat(template_id=key[0], day=key[1], downloads=count, bytes_sent=bytes_sent))
+        else:
+            stat.downloads += count
+            stat.bytes_sent += bytes_sent
+            changed.append(stat)
+    DownloadStat.objects.bulk_update(changed, ['downloads', 'bytes_sent'], batch_size=1000)
+    DownloadStat.objects.bulk_create(added, batch_size=1000)
@@ -0,0 +1,72 @@
+import resource
+import shutil
+import tempfile
+import time
+import tracemalloc
+import zlib
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from orders.delivery import CHUNK_SIZE, iter_bundle
+
+
+class Command(BaseCommand):
+    help = (
+        'Stream a synthetic multi-gigabyte template bundle through iter_bundle '
+        'and report throughput and peak memory. The archives are sparse files '
+        'in a temporary directory, removed afterwards.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--files', type=int, default=5)
+        parser.add_argument('--size-mb', type=int, default=1024, help='Size of each archive')
+        parser.add_argument('--chunk-kb', type=int, default=CHUNK_SIZE // 1024)
+    
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp(prefix='bundle-benchmark-')
+        try:
+            storage = FileSystemStorage(location=directory)
+            files = self.populate(storage, options['files'], options['size_mb'] * 1024 * 1024)
+            self.run(files, options['chunk_kb'] * 1024)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    
+    def populate(self, storage, count, size):
+        files = []
+        for i in range(count):
+            name = f'template-{i}.zip'
+            # Sparse: only the marker at the end takes disk space
+            with open(storage.path(name), 'wb') as file:
+                file.truncate(size - 8)
+                file.seek(size - 8)
+                file.write(i.to_bytes(8, 'big'))
+            files.append((name, storage, name))
+        self.stdout.write(f'Created {count} archives of {size / 2 ** 20:.0f} MiB')
+        return files
+    
+    def run(self, files, chunk_size):
+        total = sum(storage.size(name) for _, storage, name in files)
+        written = chunks = largest = 0
+        crc = 0
+        
+        tracemalloc.start()
+        start = time.perf_counter()
+        for chunk in iter_bundle(files, chunk_size=chunk_size):
+            written += len(chunk)
+            chunks += 1
+            largest = max(largest, len(chunk))
+            crc = zlib.crc32(chunk, crc)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        # ru_maxrss is in KiB on Linux
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(
+            f'Streamed {written / 2 ** 30:.2f} GiB ({total / 2 ** 30:.2f} GiB of archives, '
+            f'{written - total} bytes of ZIP structure) in {chunks} chunks, '
+            f'largest {largest / 1024:.0f} KiB, crc32 {crc:08x}'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{elapsed:.2f}s, {written / 2 ** 20 / elapsed:.0f} MiB/s; '
+            f'peak traced memory {peak / 2 ** 20:.2f} MiB, max RSS {max_rss:.0f} MiB'
+        ))
@@ -0,0 +1,38 @@
+import time
+from django.core.management.base import BaseCommand
+from orders.download_log import roll_up
+
+
+class Command(BaseCommand):
+    help = (
+        'Fold new download events into template download counts, trending '
+        'scores, site statistics and daily download stats'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep rolling up every --interval seconds'
+        )
+        parser.add_argument('--interval', type=float, default=60)
+    
+    def handle(self, *args, **options):
+        if not options['loop']:
+            self.run()
+            return
+        
+        try:
+            while True:
+                self.run()
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped')
+    
+    def run(self):
+        start = time.perf_counter()
+        counted = roll_up()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rolled up {counted} download events ({time.perf_counter() - start:.2f}s)'
+        ))
+        return counted
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_purchase_summaries(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    PurchaseSummary = apps.get_model('orders', 'PurchaseSummary')
+    
+    rows = (
+        Order.objects.filter(status='completed')
+        .values('user_id', 'currency')
+        .annotate(
+            completed_count=Count('id'),
+            total_spent=Sum('amount'),
+            last_purchase_at=Max(Coalesce('completed_at', 'created_at')),
+        )
+        .order_by()
+    )
+    PurchaseSummary.objects.bulk_create(
+        (PurchaseSummary(**row) for row in rows.iterator()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_keyset_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PurchaseSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(max_length=3)),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('total_spent', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('last_purchase_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='purchase_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Purchase summaries',
+                'constraints': [models.UniqueConstraint(fields=('user', 'currency'), name='unique_purchase_summary')],
+            },
+        ),
+        migrations.RunPython(backfill_purchase_summaries, migrations.RunPython.noop),
+    ]
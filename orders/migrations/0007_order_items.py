@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:09
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_expiry'),
+        ('templates', '0009_review_histogram_and_pagination'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='template',
+            field=models.ForeignKey(blank=True, help_text='Empty for multi-template orders, see items', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='orders', to='templates.template'),
+        ),
+        migrations.CreateModel(
+            name='OrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(0)])),
+                ('download_count', models.PositiveIntegerField(default=0)),
+                ('max_downloads', models.PositiveIntegerField(default=5)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='orders.order')),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_items', to='templates.template')),
+            ],
+            options={
+                'ordering': ['id'],
+                'constraints': [models.UniqueConstraint(fields=('order', 'template'), name='unique_order_item')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0008_download_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='last_claimed_at',
+            field=models.DateTimeField(blank=True, help_text='When a download slot was last used; Range resumes are allowed for a while after', null=True),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='last_claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_counted_events(apps, schema_editor):
+    # Events logged before the old watermark were already counted
+    DownloadEvent = apps.get_model('orders', 'DownloadEvent')
+    DownloadRollupState = apps.get_model('orders', 'DownloadRollupState')
+    
+    state = DownloadRollupState.objects.first()
+    if state and state.rolled_up_to:
+        DownloadEvent.objects.filter(logged_at__lt=state.rolled_up_to).update(rolled_up=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_last_claimed_at'),
+        ('templates', '0010_trending_score_log2'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+    
+    operations = [
+        migrations.AddField(
+            model_name='downloadevent',
+            name='rolled_up',
+            field=models.BooleanField(default=False, help_text='Set by the rollup that counted this event'),
+        ),
+        migrations.RunPython(mark_counted_events, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='DownloadRollupState',
+        ),
+        migrations.RemoveField(
+            model_name='downloadevent',
+            name='logged_at',
+        ),
+        migrations.AddIndex(
+            model_name='downloadevent',
+            index=models.Index(condition=models.Q(('rolled_up', False)), fields=['id'], name='download_event_pending'),
+        ),
+    ]
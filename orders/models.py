@@ -1,4 +1,10 @@
-from django.db import models
+from datetime import timedelta
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, F, Max, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.core.validators import MinValueValidator
@@ -10,7 +16,12 @@ User = get_user_model()
 
 class Order(models.Model):
     """
-    Order model for tracking template purchases
+    Order model for tracking template purchases.
+    
+    An order either sells one `template` itself or, for cart checkouts,
+    leaves `template` empty and sells its `items`, one per template, paid
+    with the order's single Payment. `lines` lists the downloadable
+    purchases either way.
     """
     STATUS_CHOICES = [
         ('created', 'Created'),
@@ -19,8 +30,12 @@ class Order(models.Model):
         ('completed', 'Completed'),
         ('failed', 'Failed'),
         ('refunded', 'Refunded'),
+        ('expired', 'Expired'),
     ]
     
+    # Unpaid states that the expire_stale_orders command sweeps
+    STALE_STATUSES = ('created', 'pending')
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(
         User, 
@@ -30,7 +45,10 @@ class Order(models.Model):
     template = models.ForeignKey(
         'templates.Template', 
         on_delete=models.CASCADE, 
-        related_name='orders'
+        related_name='orders',
+        blank=True,
+        null=True,
+        help_text="Empty for multi-template orders, see items"
     )
     amount = models.DecimalField(
         max_digits=10, 
@@ -51,13 +69,25 @@ class Order(models.Model):
     )
     download_count = models.PositiveIntegerField(default=0)
     max_downloads = models.PositiveIntegerField(default=5)
+    last_claimed_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When a download slot was last used; Range resumes are allowed for a while after"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(blank=True, null=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id']),
+            # Stale order sweeps
+            models.Index(fields=['status', 'created_at']),
+        ]
     
     def __str__(self):
+        if self.template_id is None:
+            return f"Order {self.id} - multiple templates"
         return f"Order {self.id} - {self.template.title}"
     
     def save(self, *args, **kwargs):
@@ -68,16 +98,375 @@ class Order(models.Model):
     def get_absolute_url(self):
         return reverse('orders:detail', kwargs={'pk': self.pk})
     
+    @classmethod
+    def create_for_templates(cls, user, templates):
+        """
+        Create one unpaid order for `templates`: a single-template order
+        for one, otherwise an order with one item per template, written
+        with a single bulk_create
+        """
+        templates = list({template.pk: template for template in templates}.values())
+        if len(templates) == 1:
+            return cls.objects.create(
+                user=user,
+                template=templates[0],
+                amount=templates[0].price,
+                status='created'
+            )
+        
+        with transaction.atomic():
+            order = cls.objects.create(
+                user=user,
+                amount=sum(template.price for template in templates),
+                status='created'
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, template=template, amount=template.price)
+                for template in templates
+            ])
+        return order
+    
+    @cached_property
+    def lines(self):
+        """
+        The downloadable purchases of this order: the order itself or its
+        items, each with `template`, `amount`, `can_download`, `download_url`
+        and `claim_download()`
+        """
+        if self.template_id is not None:
+            return [self]
+        return list(self.items.all())
+    
+    def complete(self, completed_at=None):
+        """
+        Mark the order paid, enabling downloads of every line at once; run
+        it in the same transaction as the payment update
+        """
+        self.status = 'completed'
+        self.completed_at = completed_at or timezone.now()
+        self.save()
+    
+    @property
+    def download_url(self):
+        """Signed download link, valid for ORDER_DOWNLOAD_URL_TTL seconds"""
+        from .signing import build_download_url
+        return build_download_url(self)[0]
+    
+    def revoke_download_links(self):
+        """Invalidate every download link handed out for this order"""
+        self.download_token = secrets.token_urlsafe(32)
+        self.save(update_fields=['download_token'])
+    
     @property
     def can_download(self):
-        """Check if user can still download the template"""
-        return (
+        """
+        Check if user can still download the template; for multi-template
+        orders each item keeps its own quota
+        """
+        return bool(
             self.status == 'completed' and 
-            self.download_count < self.max_downloads and
+            (self.template_id is None or self.download_count < self.max_downloads) and
             self.download_token
         )
     
-    def increment_download_count(self):
-        """Increment download count"""
-        self.download_count += 1
-        self.save(update_fields=['download_count'])
+    @property
+    def can_resume(self):
+        """
+        Check if a Range request may continue a download of this order that
+        was already counted
+        """
+        return bool(
+            self.status == 'completed' and
+            self.download_token and
+            claimed_recently(self.last_claimed_at)
+        )
+    
+    def claim_download(self):
+        """
+        Use one download slot, returning whether one was left.
+        
+        The quota check and the counter are one conditional UPDATE, so
+        concurrent downloads cannot exceed `max_downloads`. Template totals
+        are rolled up later from the download log (see orders.download_log).
+        """
+        return bool(claim_downloads([self]))
+
+
+class OrderItem(models.Model):
+    """
+    One template bought through a multi-template order, with its own
+    download quota. Downloads open when the order completes.
+    """
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='items'
+    )
+    template = models.ForeignKey(
+        'templates.Template',
+        on_delete=models.CASCADE,
+        related_name='order_items'
+    )
+    amount = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        validators=[MinValueValidator(0)]
+    )
+    download_count = models.PositiveIntegerField(default=0)
+    max_downloads = models.PositiveIntegerField(default=5)
+    last_claimed_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'template'], name='unique_order_item'),
+        ]
+    
+    def __str__(self):
+        return f"{self.template} in order {self.order_id}"
+    
+    @property
+    def download_url(self):
+        """Signed download link, valid for ORDER_DOWNLOAD_URL_TTL seconds"""
+        from .signing import build_download_url
+        return build_download_url(self.order, item=self)[0]
+    
+    @property
+    def can_download(self):
+        return self.download_count < self.max_downloads and self.order.can_download
+    
+    @property
+    def can_resume(self):
+        return bool(
+            self.order.status == 'completed' and
+            self.order.download_token and
+            claimed_recently(self.last_claimed_at)
+        )
+    
+    def claim_download(self):
+        """Use one download slot, as Order.claim_download does"""
+        return bool(claim_downloads([self]))
+
+
+def get_resume_window():
+    return timedelta(seconds=getattr(settings, 'ORDER_DOWNLOAD_RESUME_WINDOW', 60 * 60))
+
+
+def claimed_recently(claimed_at):
+    """Whether a slot claimed at `claimed_at` may still be resumed"""
+    return claimed_at is not None and claimed_at > timezone.now() - get_resume_window()
+
+
+def claim_downloads(lines):
+    """
+    Use one download slot on each of `lines` (see Order.lines) in a single
+    transaction, returning the lines that had one left
+    """
+    from .signals import download_claimed
+    
+    now = timezone.now()
+    granted = []
+    with transaction.atomic():
+        for line in lines:
+            if isinstance(line, Order):
+                lookup = {'status': 'completed'}
+            else:
+                lookup = {'order__status': 'completed'}
+            if type(line).objects.filter(
+                pk=line.pk,
+                download_count__lt=F('max_downloads'),
+                **lookup
+            ).update(download_count=F('download_count') + 1, last_claimed_at=now):
+                granted.append(line)
+    
+    for line in granted:
+        # Other requests may have claimed slots too, so this is a lower bound
+        line.download_count += 1
+        line.last_claimed_at = now
+        order = line if isinstance(line, Order) else line.order
+        download_claimed.send(sender=type(line), order=order, template_id=line.template_id)
+    return granted
+
+
+def prefetch_items(prefix=''):
+    """Prefetch order items with their templates, e.g. for `Order.lines`"""
+    return models.Prefetch(
+        f'{prefix}items',
+        queryset=OrderItem.objects.select_related('template', 'template__category')
+    )
+
+
+def purchase_totals(user_id):
+    """
+    Aggregate a user's completed orders per currency in one query; the
+    rows have the PurchaseSummary field names
+    """
+    return (
+        Order.objects.filter(user_id=user_id, status='completed')
+        .values('currency')
+        .annotate(
+            completed_count=Count('id'),
+            total_spent=Sum('amount'),
+            last_purchase_at=Max(Coalesce('completed_at', 'created_at')),
+        )
+        .order_by('currency')
+    )
+
+
+class PurchaseSummary(models.Model):
+    """
+    A user's completed-order totals in one currency.
+    
+    Shifted by orders.signals as orders complete; rows are rebuilt from
+    purchase_totals when an order leaves 'completed' or its previous state
+    is unknown.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='purchase_summaries'
+    )
+    currency = models.CharField(max_length=3)
+    completed_count = models.PositiveIntegerField(default=0)
+    total_spent = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    last_purchase_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        verbose_name_plural = "Purchase summaries"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'currency'], name='unique_purchase_summary'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user} - {self.currency}"
+    
+    @classmethod
+    def record_purchase(cls, order):
+        """Add a newly completed order in a single UPDATE"""
+        completed_at = order.completed_at or timezone.now()
+        updated = cls.objects.filter(user_id=order.user_id, currency=order.currency).update(
+            completed_count=F('completed_count') + 1,
+            total_spent=F('total_spent') + order.amount,
+            last_purchase_at=Greatest(Coalesce('last_purchase_at', Value(completed_at)), Value(completed_at)),
+        )
+        if not updated:
+            cls.rebuild(order.user_id)
+    
+    @classmethod
+    def rebuild(cls, user_id):
+        """Overwrite a user's rows with freshly aggregated ones"""
+        with transaction.atomic():
+            totals = list(purchase_totals(user_id))
+            cls.objects.filter(user_id=user_id).exclude(
+                currency__in=[row['currency'] for row in totals]
+            ).delete()
+            for row in totals:
+                cls.objects.update_or_create(
+                    user_id=user_id,
+                    currency=row.pop('currency'),
+                    defaults=row
+                )
+    
+    @classmethod
+    def for_user(cls, user_id):
+        """
+        Return a user's purchase summary as a dict, from the stored rows or,
+        for users without any, the aggregate query
+        """
+        rows = list(
+            cls.objects.filter(user_id=user_id, completed_count__gt=0)
+            .order_by('currency')
+            .values('currency', 'completed_count', 'total_spent', 'last_purchase_at')
+        )
+        if not rows:
+            rows = list(purchase_totals(user_id))
+        return {
+            'completed_count': sum(row['completed_count'] for row in rows),
+            'spent_by_currency': {row['currency']: row['total_spent'] for row in rows},
+            'last_purchase_at': max(
+                (row['last_purchase_at'] for row in rows if row['last_purchase_at']),
+                default=None
+            ),
+        }
+
+
+class DownloadEvent(models.Model):
+    """
+    One claimed template download, appended by orders.download_log. Only
+    `rolled_up` changes afterwards, when the rollup counts the event.
+    
+    The references skip database constraints so the log outlives deleted
+    orders, users and templates.
+    """
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    item = models.ForeignKey(
+        OrderItem,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        blank=True,
+        null=True,
+        related_name='+'
+    )
+    template = models.ForeignKey(
+        'templates.Template',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    bytes_sent = models.PositiveBigIntegerField(default=0)
+    client_ip = models.GenericIPAddressField(blank=True, null=True)
+    user_agent = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    rolled_up = models.BooleanField(
+        default=False,
+        help_text="Set by the rollup that counted this event"
+    )
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['template', 'created_at']),
+            # The rollup's queue of uncounted events
+            models.Index(
+                fields=['id'],
+                condition=models.Q(rolled_up=False),
+                name='download_event_pending'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.template_id} downloaded by {self.user_id} at {self.created_at:%Y-%m-%d %H:%M}"
+
+
+class DownloadStat(models.Model):
+    """
+    Downloads of a template on one day, rolled up from DownloadEvent
+    """
+    template = models.ForeignKey(
+        'templates.Template',
+        on_delete=models.CASCADE,
+        related_name='download_stats'
+    )
+    day = models.DateField()
+    downloads = models.PositiveIntegerField(default=0)
+    bytes_sent = models.PositiveBigIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(fields=['template', 'day'], name='unique_download_stat'),
+        ]
+    
+    def __str__(self):
+        return f"{self.template_id} on {self.day}: {self.downloads}"
@@ -0,0 +1,82 @@
+"""
+Per-user sets of owned template ids.
+
+A user owns a template once an order for it, or an order with an item
+for it, is completed. The set is loaded with one query, cached under a
+per-user version and memoized on the request, so a page or API response
+can mark any number of owned templates without further queries. Order changes bump
+the version (see orders.signals), which also covers a stale set written
+by a request that read the orders just before the change committed.
+"""
+import time
+from django.conf import settings
+from django.core.cache import caches
+
+VERSION_KEY = 'owned:version:{user_id}'
+SET_KEY = 'owned:{user_id}:{version}'
+
+
+def get_cache():
+    return caches[getattr(settings, 'OWNERSHIP_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'OWNERSHIP_CACHE_TIMEOUT', 60 * 60)
+
+
+def get_version(user_id):
+    cache = get_cache()
+    key = VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted version never rewinds to one
+        # that still has a set cached under it
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_owned_templates(user_id):
+    cache = get_cache()
+    key = VERSION_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        get_version(user_id)
+        cache.incr(key)
+
+
+def get_owned_template_ids(request):
+    """Return the frozenset of template ids the requesting user has bought"""
+    user = getattr(request, 'user', None)
+    if not getattr(user, 'is_authenticated', False):
+        return frozenset()
+    
+    owned = getattr(request, '_owned_template_ids', None)
+    if owned is not None:
+        return owned
+    
+    from .models import Order, OrderItem
+    
+    cache = get_cache()
+    key = SET_KEY.format(user_id=user.pk, version=get_version(user.pk))
+    owned = cache.get(key)
+    if owned is None:
+        # Single-template orders and items of multi-template ones, in one query
+        owned = frozenset(
+            Order.objects.filter(user_id=user.pk, status='completed', template__isnull=False)
+            .order_by()
+            .values_list('template_id', flat=True)
+            .union(
+                OrderItem.objects.filter(order__user_id=user.pk, order__status='completed')
+                .order_by()
+                .values_list('template_id', flat=True)
+            )
+        )
+        cache.set(key, owned, get_timeout())
+    request._owned_template_ids = owned
+    return owned
+
+
+def user_owns_template(request, template_id):
+    return template_id in get_owned_template_ids(request)
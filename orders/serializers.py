@@ -1,39 +1,81 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Order
+from core.fieldsets import DynamicFieldsMixin
+from .models import Order, OrderItem
 from templates.serializers import TemplateListSerializer
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     template = TemplateListSerializer(read_only=True)
+    can_download = serializers.ReadOnlyField()
+    
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'template', 'amount', 'download_count', 'max_downloads', 'can_download']
+        field_dependencies = {
+            # Also reads the order, which the items prefetch attaches
+            'can_download': ['download_count', 'max_downloads']
+        }
+
+
+class OrderSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    """
+    An order with its `template`, or with `items` (and no template) for
+    multi-template orders
+    """
+    template = TemplateListSerializer(read_only=True)
+    items = OrderItemSerializer(many=True, read_only=True)
     user = serializers.StringRelatedField(read_only=True)
     can_download = serializers.ReadOnlyField()
     
     class Meta:
         model = Order
         fields = [
-            'id', 'user', 'template', 'amount', 'currency', 'status',
+            'id', 'user', 'template', 'items', 'amount', 'currency', 'status',
             'download_count', 'max_downloads', 'created_at', 'completed_at',
             'can_download'
         ]
+        field_dependencies = {
+            'can_download': ['status', 'template', 'download_count', 'max_downloads', 'download_token']
+        }
 
 
 class CreateOrderSerializer(serializers.ModelSerializer):
-    template_id = serializers.IntegerField(write_only=True)
+    """
+    Create an order for one `template_id`, or for several `template_ids`
+    paid together
+    """
+    template_id = serializers.IntegerField(write_only=True, required=False)
+    template_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        write_only=True,
+        required=False,
+        allow_empty=False,
+        max_length=getattr(settings, 'CART_MAX_ITEMS', 50)
+    )
     
     class Meta:
         model = Order
-        fields = ['template_id']
-        
-    def create(self, validated_data):
+        fields = ['template_id', 'template_ids']
+    
+    def validate(self, attrs):
         from templates.models import Template
         
-        template_id = validated_data.pop('template_id')
-        template = Template.objects.get(id=template_id, active=True)
+        if ('template_id' in attrs) == ('template_ids' in attrs):
+            raise serializers.ValidationError('Send either template_id or template_ids')
         
-        order = Order.objects.create(
-            user=self.context['request'].user,
-            template=template,
-            amount=template.price,
-            status='created'
+        wanted = attrs.get('template_ids') or [attrs['template_id']]
+        templates = Template.objects.in_bulk(set(wanted))
+        missing = [pk for pk in wanted if pk not in templates or not templates[pk].active]
+        if missing:
+            field = 'template_ids' if 'template_ids' in attrs else 'template_id'
+            raise serializers.ValidationError(
+                {field: f'Templates not available: {", ".join(map(str, missing))}'}
+            )
+        attrs['templates'] = [templates[pk] for pk in wanted]
+        return attrs
+    
+    def create(self, validated_data):
+        return Order.create_for_templates(
+            self.context['request'].user, validated_data['templates']
         )
-        return order
\ No newline at end of file
@@ -0,0 +1,87 @@
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import Signal, receiver
+from .download_log import flush_if_due
+from .models import Order, PurchaseSummary
+from .ownership import invalidate_owned_templates
+
+# Sent after an order is created or its status changes.
+# Arguments: order, previous_status (None when created or unknown), created
+order_status_changed = Signal()
+
+# Sent for every download slot granted by claim_downloads (and so by
+# Order.claim_download and OrderItem.claim_download).
+# Arguments: order, template_id
+download_claimed = Signal()
+
+
+@receiver(post_init, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    instance._stored_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Order)
+def notify_order_status_change(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    
+    previous_status = None if created else instance._stored_status
+    if created or previous_status != instance.status:
+        order_status_changed.send(
+            sender=Order,
+            order=instance,
+            previous_status=previous_status,
+            created=created
+        )
+    instance._stored_status = instance.status
+
+
+@receiver(order_status_changed)
+def record_purchase_event(sender, order, previous_status, created, **kwargs):
+    """Feed completed purchases into the trending score"""
+    from templates.models import TemplateEvent
+    from templates.trending import record_event
+    
+    if order.status == 'completed' and previous_status != 'completed':
+        for line in order.lines:
+            record_event(line.template_id, TemplateEvent.PURCHASE)
+
+
+@receiver(order_status_changed)
+def invalidate_owned_on_status_change(sender, order, previous_status, created, **kwargs):
+    # previous_status is None when unknown, so treat that as a change too
+    if (order.status == 'completed') != (previous_status == 'completed'):
+        user_id = order.user_id
+        transaction.on_commit(lambda: invalidate_owned_templates(user_id))
+
+
+@receiver(post_delete, sender=Order)
+def invalidate_owned_on_delete(sender, instance, **kwargs):
+    if instance.status == 'completed':
+        user_id = instance.user_id
+        transaction.on_commit(lambda: invalidate_owned_templates(user_id))
+
+
+@receiver(order_status_changed)
+def update_purchase_summary(sender, order, previous_status, created, **kwargs):
+    is_completed = order.status == 'completed'
+    if is_completed and (created or previous_status not in (None, 'completed')):
+        PurchaseSummary.record_purchase(order)
+    elif previous_status is None and not created:
+        # Saved from a deferred instance, so the previous status is unknown
+        PurchaseSummary.rebuild(order.user_id)
+    elif previous_status == 'completed' and not is_completed:
+        PurchaseSummary.rebuild(order.user_id)
+
+
+@receiver(post_delete, sender=Order)
+def update_purchase_summary_on_delete(sender, instance, **kwargs):
+    if instance.status == 'completed':
+        PurchaseSummary.rebuild(instance.user_id)
+
+
+@receiver(request_finished)
+def flush_download_log(sender, **kwargs):
+    # Runs once the response has been sent, off the request's critical path
+    flush_if_due()
@@ -0,0 +1,86 @@
+"""
+Signed, expiring download links.
+
+A link token carries the order id (plus the item id for an item of a
+multi-template order), an expiry time and the order's download nonce (a
+prefix of `Order.download_token`), signed with HMAC-SHA256, so
+forged, altered and expired links are rejected without touching the
+database. Links are signed with the first of ORDER_DOWNLOAD_SIGNING_KEYS
+(SECRET_KEY by default) and verified against all of them, or against
+SECRET_KEY_FALLBACKS, which allows rotating keys without breaking links
+already handed out. Regenerating `download_token` revokes an order's links.
+"""
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.core.signing import BadSignature, SignatureExpired, Signer
+from django.urls import reverse
+from django.utils.http import base36_to_int, int_to_base36
+
+SALT = 'orders.download'
+
+NONCE_LENGTH = 16
+
+
+def get_signing_keys():
+    keys = getattr(settings, 'ORDER_DOWNLOAD_SIGNING_KEYS', None)
+    return list(keys or [settings.SECRET_KEY, *settings.SECRET_KEY_FALLBACKS])
+
+
+def get_signer():
+    keys = get_signing_keys()
+    return Signer(key=keys[0], fallback_keys=keys[1:], salt=SALT, algorithm='sha256')
+
+
+def get_ttl():
+    return getattr(settings, 'ORDER_DOWNLOAD_URL_TTL', 24 * 60 * 60)
+
+
+def get_nonce(order):
+    return (order.download_token or '')[:NONCE_LENGTH]
+
+
+def make_download_token(order, expires=None, item=None):
+    """
+    Return a signed token for `order`, or its OrderItem `item`, valid until
+    `expires` (a Unix time), TTL seconds from now by default
+    """
+    expires = int(expires or time.time() + get_ttl())
+    target = order.pk.hex
+    if item is not None:
+        target = f'{target}-{int_to_base36(item.pk)}'
+    value = f'{target}.{int_to_base36(expires)}.{get_nonce(order)}'
+    return get_signer().sign(value)
+
+
+def read_download_token(token, now=None):
+    """
+    Return `(order_id, item_id, nonce, expires)` from a signed token;
+    `item_id` is None for links to a single-template order.
+    
+    Raises BadSignature for malformed or forged tokens and its subclass
+    SignatureExpired for expired ones.
+    """
+    value = get_signer().unsign(token)
+    try:
+        target, expires, nonce = value.split('.', 2)
+        order_hex, _, item = target.partition('-')
+        order_id = uuid.UUID(hex=order_hex)
+        item_id = base36_to_int(item) if item else None
+        expires = base36_to_int(expires)
+    except ValueError:
+        raise BadSignature('Malformed download token')
+    if expires < (now or time.time()):
+        raise SignatureExpired('Download link expired')
+    return order_id, item_id, nonce, expires
+
+
+def build_download_url(order, expires=None, item=None):
+    """Return `(url, expires_at)` for a signed download link"""
+    expires = int(expires or time.time() + get_ttl())
+    token = make_download_token(order, expires, item)
+    return (
+        reverse('orders:download', kwargs={'token': token}),
+        datetime.fromtimestamp(expires, tz=dt_timezone.utc)
+    )
@@ -1,3 +1,505 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.core.cache import caches
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.testing import QueryBudgetMixin, create_template
+from payments.models import Payment
+from templates.cache import get_generation
+from templates.models import Template
+from users.models import User
+from . import download_log
+from .models import DownloadEvent, DownloadStat, Order, claim_downloads
 
-# Create your tests here.
+
+@contextmanager
+def separate_connections():
+    """
+    Let threads opening new connections in this block each get a real one.
+    
+    Threads cannot have their own connections to the in-memory SQLite test
+    database, so they are pointed at a file copy of it instead; writes made
+    there are discarded afterwards.
+    """
+    if not (connection.vendor == 'sqlite' and connection.is_in_memory_db()):
+        yield
+        return
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'db.sqlite3')
+        connection.ensure_connection()
+        copy = sqlite3.connect(path)
+        try:
+            connection.connection.backup(copy)
+        finally:
+            copy.close()
+        name = connection.settings_dict['NAME']
+        connection.settings_dict['NAME'] = path
+        try:
+            yield
+        finally:
+            connection.settings_dict['NAME'] = name
+
+
+class DownloadQuotaTests(TransactionTestCase):
+    """
+    Download slots are claimed with one conditional UPDATE
+    """
+    
+    def setUp(self):
+        self.template = create_template(1)
+        user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+        self.order = Order.objects.create(
+            user=user,
+            template=self.template,
+            amount=10,
+            status='completed',
+            max_downloads=5
+        )
+    
+    def test_claims_stop_at_quota(self):
+        results = [self.order.claim_download() for _ in range(7)]
+        
+        self.assertEqual(results, [True] * 5 + [False] * 2)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.download_count, 5)
+    
+    def test_stale_instance_cannot_overshoot(self):
+        stale = Order.objects.get(pk=self.order.pk)
+        Order.objects.filter(pk=self.order.pk).update(download_count=5)
+        
+        self.assertTrue(stale.can_download)
+        self.assertFalse(stale.claim_download())
+    
+    def test_incomplete_order_cannot_claim(self):
+        Order.objects.filter(pk=self.order.pk).update(status='refunded')
+        
+        self.assertFalse(self.order.claim_download())
+    
+    def test_bundle_claims_only_lines_with_slots(self):
+        spent = Order.objects.create(
+            user=self.order.user,
+            template=self.template,
+            amount=10,
+            status='completed',
+            max_downloads=0
+        )
+        
+        self.assertEqual(claim_downloads([self.order, spent]), [self.order])
+        self.assertEqual(self.order.download_count, 1)
+        spent.refresh_from_db()
+        self.assertEqual(spent.download_count, 0)
+    
+    def test_parallel_claims_do_not_overshoot(self):
+        workers = 20
+        rounds = 5
+        # Every worker starts from the same snapshot, as concurrent
+        # requests loading the order at once would
+        orders = [Order.objects.get(pk=self.order.pk) for _ in range(workers)]
+        barrier = threading.Barrier(workers)
+        granted = []
+        errors = []
+        
+        def claim(order):
+            try:
+                barrier.wait()
+                for _ in range(rounds):
+                    if order.claim_download():
+                        granted.append(order)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+        
+        def read_count():
+            try:
+                counts.append(Order.objects.get(pk=self.order.pk).download_count)
+            finally:
+                connection.close()
+        
+        counts = []
+        with separate_connections():
+            threads = [threading.Thread(target=claim, args=(order,)) for order in orders]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            # Read back through a connection of the same database
+            reader = threading.Thread(target=read_count)
+            reader.start()
+            reader.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(len(granted), self.order.max_downloads)
+        self.assertEqual(counts, [self.order.max_downloads])
+
+
+class DownloadResumeTests(TestCase):
+    """
+    Range requests resume a counted download only for a while after the
+    slot was claimed, and never past the quota otherwise
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+    
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(self.settings(MEDIA_ROOT=media_root))
+        self.addCleanup(download_log.buffer.events.clear)
+        
+        self.template = create_template(1)
+        self.template.file.save('resume-bot.zip', ContentFile(b'PK' + b'x' * 998))
+        self.order = Order.objects.create(
+            user=self.user,
+            template=self.template,
+            amount=10,
+            status='completed',
+            max_downloads=1
+        )
+        self.client.force_login(self.user)
+    
+    def download(self, **headers):
+        response = self.client.get(self.order.download_url, **headers)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+    
+    def test_range_cannot_bypass_quota(self):
+        self.assertEqual(self.download().status_code, 200)
+        self.assertEqual(self.download().status_code, 302)
+        
+        # Resuming the counted download works within the window...
+        self.assertEqual(self.download(HTTP_RANGE='bytes=1-').status_code, 206)
+        Order.objects.filter(pk=self.order.pk).update(
+            last_claimed_at=timezone.now() - timedelta(days=1)
+        )
+        # ...but not once it has passed
+        self.assertEqual(self.download(HTTP_RANGE='bytes=1-').status_code, 302)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.download_count, 1)
+    
+    def test_range_needs_a_claimed_download(self):
+        self.assertEqual(self.download(HTTP_RANGE='bytes=1-').status_code, 302)
+        self.assertEqual(self.download(HTTP_RANGE='bytes=0-9').status_code, 206)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.download_count, 1)
+
+
+class OrderApiQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Order listings load in a fixed number of queries: the orders, their
+    items, and the user's owned-template set until it is cached.
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+    
+    def setUp(self):
+        # Start every test with the owned-template set uncached
+        caches['default'].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.add_orders(2)
+    
+    def add_templates(self, count):
+        start = Template.objects.count()
+        return [create_template(number) for number in range(start, start + count)]
+    
+    def add_orders(self, count=5):
+        # Run the on_commit hooks that invalidate the owned-template set
+        with self.captureOnCommitCallbacks(execute=True):
+            for template in self.add_templates(count):
+                Order.objects.create(
+                    user=self.user,
+                    template=template,
+                    amount=10,
+                    status='completed'
+                )
+    
+    def add_multi_template_orders(self, count=3):
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(count):
+                order = Order.create_for_templates(self.user, self.add_templates(3))
+                order.complete()
+    
+    def test_list(self):
+        self.assertQueryBudget(
+            self.client, reverse('orders_api:order-list'), 3, self.add_orders
+        )
+    
+    def test_list_with_items(self):
+        self.assertQueryBudget(
+            self.client, reverse('orders_api:order-list'), 3, self.add_multi_template_orders
+        )
+    
+    def test_my_orders(self):
+        self.assertQueryBudget(
+            self.client, reverse('orders_api:order-my-orders'), 3, self.add_orders
+        )
+    
+    def test_sparse_list(self):
+        url = reverse('orders_api:order-list')
+        self.assertQueryBudget(self.client, f'{url}?expand=none', 2, self.add_multi_template_orders)
+        self.assertQueryBudget(
+            self.client, f'{url}?fields=id,template.title,template.category.name', 1
+        )
+    
+    def test_detail(self):
+        order = Order.objects.filter(user=self.user).first()
+        self.assertQueryBudget(self.client, reverse('orders_api:order-detail', args=[order.pk]), 3)
+
+
+class OrderIdempotencyTests(TestCase):
+    """
+    Retried order creates with the same Idempotency-Key replay the first
+    response instead of creating another order
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.template = create_template(1)
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse('orders_api:order-list')
+    
+    def create_order(self, key, **data):
+        data.setdefault('template_id', self.template.pk)
+        return self.client.post(self.url, data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+    
+    def test_retry_replays_first_response(self):
+        first = self.create_order('retry-1')
+        with self.assertNumQueries(1):
+            retry = self.create_order('retry-1')
+        
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 1)
+    
+    def test_key_reused_for_other_request(self):
+        self.create_order('retry-2')
+        response = self.create_order('retry-2', template_id=self.template.pk + 1)
+        
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 1)
+    
+    def test_failed_request_releases_key(self):
+        response = self.create_order('retry-3', template_id='')
+        self.assertEqual(response.status_code, 400)
+        
+        self.assertEqual(self.create_order('retry-3').status_code, 201)
+
+
+class MultiTemplateOrderTests(TestCase):
+    """
+    Several templates bought with one order and one payment
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.templates = [create_template(number, price=10 + number) for number in range(3)]
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def test_create_with_template_ids(self):
+        ids = [template.pk for template in self.templates]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('orders_api:order-list'), {'template_ids': ids}, format='json'
+            )
+        
+        self.assertEqual(response.status_code, 201)
+        # Every item is written by a single bulk_create
+        inserts = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('INSERT') and 'orders_orderitem' in query['sql']
+        ]
+        self.assertEqual(len(inserts), 1)
+        order = Order.objects.get(user=self.user)
+        self.assertIsNone(order.template_id)
+        self.assertEqual(order.amount, 33)
+        self.assertEqual([line.template_id for line in order.lines], ids)
+        self.assertEqual([item['template']['id'] for item in response.json()['items']], ids)
+    
+    def test_completion_opens_every_line(self):
+        order = Order.create_for_templates(self.user, self.templates)
+        self.assertFalse(any(line.can_download for line in order.lines))
+        
+        order.complete()
+        order = Order.objects.get(pk=order.pk)
+        
+        self.assertTrue(all(line.can_download for line in order.lines))
+        self.assertTrue(order.lines[0].claim_download())
+        self.assertEqual(order.items.get(pk=order.lines[0].pk).download_count, 1)
+    
+    def test_download_every_line(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(self.settings(MEDIA_ROOT=media_root))
+        self.addCleanup(download_log.buffer.events.clear)
+        for template in self.templates:
+            template.file.save(f'{template.slug}.zip', ContentFile(template.slug.encode()))
+        order = Order.create_for_templates(self.user, self.templates)
+        order.complete()
+        
+        response = self.client.get(reverse('orders_api:order-download', args=[order.pk]))
+        
+        self.assertEqual(response.status_code, 200)
+        items = response.json()['items']
+        self.assertEqual([item['template'] for item in items], [t.pk for t in self.templates])
+        self.client.force_login(self.user)
+        for item, template in zip(items, self.templates):
+            download = self.client.get(item['download_url'])
+            self.assertEqual(download.status_code, 200)
+            self.assertEqual(b''.join(download.streaming_content), template.slug.encode())
+        self.assertEqual(sum(order.items.values_list('download_count', flat=True)), 3)
+    
+    def test_rejects_unavailable_templates(self):
+        response = self.client.post(
+            reverse('orders_api:order-list'),
+            {'template_ids': [self.templates[0].pk, 0]},
+            format='json'
+        )
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+
+class DownloadLogTests(TestCase):
+    """
+    Downloads are buffered in process, written in batches and rolled up
+    into the template totals
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.template = create_template(1)
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+        cls.order = Order.objects.create(
+            user=cls.user,
+            template=cls.template,
+            amount=10,
+            status='completed'
+        )
+    
+    def setUp(self):
+        self.addCleanup(download_log.buffer.events.clear)
+        self.request = RequestFactory().get('/', HTTP_USER_AGENT='test-agent')
+        self.request.user = self.user
+    
+    def test_record_only_buffers(self):
+        with self.assertNumQueries(0):
+            download_log.record(self.request, self.order, 100)
+            download_log.record(self.request, self.order, 50)
+        
+        with self.assertNumQueries(1):
+            self.assertEqual(download_log.flush(), 2)
+        event = DownloadEvent.objects.order_by('id').first()
+        self.assertEqual(event.order_id, self.order.pk)
+        self.assertEqual(event.bytes_sent, 100)
+        self.assertEqual(event.user_agent, 'test-agent')
+    
+    def test_roll_up_counts_each_event_once(self):
+        download_log.record(self.request, self.order, 100)
+        download_log.record(self.request, self.order, 50)
+        download_log.flush()
+        
+        self.assertEqual(download_log.roll_up(batch_size=1), 2)
+        self.assertEqual(download_log.roll_up(), 0)
+        
+        self.template.refresh_from_db()
+        self.assertEqual(self.template.download_count, 2)
+        self.assertGreater(self.template.trending_score, 0)
+        stat = DownloadStat.objects.get(template=self.template)
+        self.assertEqual((stat.downloads, stat.bytes_sent), (2, 150))
+    
+    def test_late_event_is_still_counted(self):
+        download_log.record(self.request, self.order, 100)
+        download_log.flush()
+        download_log.roll_up()
+        
+        # Written after the rollup but stamped before it, as a slow process
+        # or a skewed clock would
+        DownloadEvent.objects.create(
+            order=self.order,
+            template=self.template,
+            user=self.user,
+            created_at=timezone.now() - timedelta(hours=1)
+        )
+        caches['default'].clear()
+        generation = get_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(download_log.roll_up(), 1)
+        
+        self.template.refresh_from_db()
+        self.assertEqual(self.template.download_count, 2)
+        self.assertFalse(DownloadEvent.objects.filter(rolled_up=False).exists())
+        with self.settings(CATALOG_COUNTER_DEBOUNCE=0):
+            self.assertEqual(get_generation(), generation + 1)
+
+
+class ExpireStaleOrdersTests(TestCase):
+    """
+    expire_stale_orders expires unpaid orders in batches and cancels their
+    open payments
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.template = create_template(1)
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+    
+    def create_order(self, status, age_hours):
+        order = Order.objects.create(user=self.user, template=self.template, amount=10, status=status)
+        Order.objects.filter(pk=order.pk).update(
+            created_at=timezone.now() - timedelta(hours=age_hours)
+        )
+        return order
+    
+    def test_expires_stale_orders_in_batches(self):
+        stale = [self.create_order('created', 48) for _ in range(3)]
+        pending = [self.create_order('pending', 48) for _ in range(2)]
+        for order in pending:
+            Payment.objects.create(order=order, amount=10, payment_method='telegram')
+        fresh = self.create_order('created', 1)
+        paid = self.create_order('completed', 48)
+        
+        out = io.StringIO()
+        call_command(
+            'expire_stale_orders', '--max-age', '24', '--batch-size', '2', '--pause', '0',
+            stdout=out
+        )
+        
+        self.assertIn('Expired 5 orders and cancelled 2 payments in 3 batches', out.getvalue())
+        self.assertEqual(
+            set(Order.objects.filter(status='expired').values_list('pk', flat=True)),
+            {order.pk for order in stale + pending}
+        )
+        self.assertEqual(Order.objects.get(pk=fresh.pk).status, 'created')
+        self.assertEqual(Order.objects.get(pk=paid.pk).status, 'completed')
+        for payment in Payment.objects.all():
+            self.assertEqual(payment.status, 'cancelled')
+            self.assertIsNotNone(payment.processed_at)
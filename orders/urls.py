@@ -7,5 +7,10 @@ urlpatterns = [
     path('', views.OrderListView.as_view(), name='list'),
     path('<uuid:pk>/', views.OrderDetailView.as_view(), name='detail'),
     path('create/', views.CreateOrderView.as_view(), name='create'),
+    path('cart/', views.CartView.as_view(), name='cart'),
+    path('cart/add/', views.CartAddView.as_view(), name='cart_add'),
+    path('cart/remove/', views.CartRemoveView.as_view(), name='cart_remove'),
+    path('cart/checkout/', views.CheckoutView.as_view(), name='checkout'),
+    path('download/bundle/', views.DownloadBundleView.as_view(), name='bundle'),
     path('download/<str:token>/', views.DownloadTemplateView.as_view(), name='download'),
 ]
\ No newline at end of file
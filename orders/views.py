@@ -1,13 +1,25 @@
+import os
 from django.shortcuts import render, get_object_or_404, redirect
-from django.views.generic import ListView, DetailView, CreateView, View
+from django.views.generic import ListView, DetailView, CreateView, TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.http import JsonResponse, HttpResponse, Http404
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
+from django.core.exceptions import ValidationError
+from django.core.signing import BadSignature, SignatureExpired
+from django.utils.crypto import constant_time_compare
 from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from .models import Order
+from .delivery import (
+    RangeNotSatisfiable, build_download_response, bundle_response, get_requested_range,
+    range_not_satisfiable
+)
+from . import download_log
+from .cart import Cart
+from .models import Order, OrderItem, claim_downloads, prefetch_items
+from .ownership import get_owned_template_ids, user_owns_template
+from .signing import get_nonce, read_download_token
 from .serializers import OrderSerializer, CreateOrderSerializer
 from templates.models import Template
 from payments.models import Payment
@@ -25,7 +37,9 @@ class OrderListView(LoginRequiredMixin, ListView):
     def get_queryset(self):
         return Order.objects.filter(
             user=self.request.user
-        ).select_related('template', 'template__category').order_by('-created_at')
+        ).select_related('template', 'template__category').prefetch_related(
+            prefetch_items()
+        ).order_by('-created_at')
 
 
 class OrderDetailView(LoginRequiredMixin, DetailView):
@@ -39,7 +53,7 @@ class OrderDetailView(LoginRequiredMixin, DetailView):
     def get_queryset(self):
         return Order.objects.filter(user=self.request.user).select_related(
             'template', 'template__category'
-        )
+        ).prefetch_related(prefetch_items())
 
 
 class CreateOrderView(LoginRequiredMixin, View):
@@ -54,12 +68,7 @@ class CreateOrderView(LoginRequiredMixin, View):
         
         template = get_object_or_404(Template, id=template_id, active=True)
         
-        # Check if user already owns this template
-        if Order.objects.filter(
-            user=request.user, 
-            template=template, 
-            status='completed'
-        ).exists():
+        if user_owns_template(request, template.pk):
             messages.info(request, 'You already own this template')
             return redirect('templates:detail', slug=template.slug)
         
@@ -75,31 +84,194 @@ class CreateOrderView(LoginRequiredMixin, View):
         return redirect('payments:process') + f'?order_id={order.id}'
 
 
+class CartView(LoginRequiredMixin, TemplateView):
+    """
+    Templates waiting in the cart
+    """
+    template_name = 'orders/cart.html'
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        templates = Cart(self.request).get_templates(
+            exclude=get_owned_template_ids(self.request)
+        )
+        context['cart_templates'] = templates
+        context['cart_total'] = sum(template.price for template in templates)
+        return context
+
+
+class CartAddView(LoginRequiredMixin, View):
+    """
+    Add a template to the cart
+    """
+    def post(self, request):
+        try:
+            template_id = int(request.POST.get('template_id'))
+        except (TypeError, ValueError):
+            raise Http404('Template not specified')
+        template = get_object_or_404(Template, id=template_id, active=True)
+        
+        if user_owns_template(request, template.pk):
+            messages.info(request, 'You already own this template')
+        elif Cart(request).add(template.pk):
+            messages.success(request, f'{template.title} added to your cart')
+        else:
+            messages.error(request, 'Your cart is full')
+        return redirect('orders:cart')
+
+
+class CartRemoveView(LoginRequiredMixin, View):
+    """
+    Remove a template from the cart
+    """
+    def post(self, request):
+        try:
+            template_id = int(request.POST.get('template_id'))
+        except (TypeError, ValueError):
+            raise Http404('Template not specified')
+        
+        Cart(request).remove(template_id)
+        return redirect('orders:cart')
+
+
+class CheckoutView(LoginRequiredMixin, View):
+    """
+    Turn the cart into one order, paid with a single payment
+    """
+    def post(self, request):
+        cart = Cart(request)
+        templates = cart.get_templates(exclude=get_owned_template_ids(request))
+        if not templates:
+            messages.error(request, 'Your cart is empty')
+            return redirect('orders:cart')
+        
+        order = Order.create_for_templates(request.user, templates)
+        cart.clear()
+        
+        messages.success(request, 'Order created! Proceed to payment.')
+        return redirect(reverse('payments:process') + f'?order_id={order.id}')
+
+
 class DownloadTemplateView(LoginRequiredMixin, View):
     """
-    Download purchased template
+    Download purchased template through a signed link
     """
+    def dispatch(self, request, *args, **kwargs):
+        # Check the signature before the session or user is loaded
+        try:
+            self.order_id, self.item_id, self.nonce, _ = read_download_token(kwargs['token'])
+        except SignatureExpired:
+            messages.error(request, 'This download link has expired, please request a new one')
+            return redirect('orders:list')
+        except BadSignature:
+            raise Http404('Invalid download link')
+        return super().dispatch(request, *args, **kwargs)
+    
     def get(self, request, token):
-        order = get_object_or_404(
-            Order, 
-            download_token=token, 
-            user=request.user, 
-            status='completed'
-        )
+        if self.item_id is None:
+            # Multi-template orders are downloaded through their items
+            line = order = get_object_or_404(
+                Order.objects.select_related('template'),
+                pk=self.order_id,
+                user=request.user, 
+                status='completed',
+                template__isnull=False
+            )
+        else:
+            line = get_object_or_404(
+                OrderItem.objects.select_related('order', 'template'),
+                pk=self.item_id,
+                order_id=self.order_id,
+                order__user=request.user,
+                order__status='completed'
+            )
+            order = line.order
+        if not constant_time_compare(get_nonce(order), self.nonce):
+            # The order's links were revoked
+            raise Http404('Invalid download link')
+        field_file = line.template.file
+        
+        try:
+            byte_range = get_requested_range(request, field_file)
+        except RangeNotSatisfiable:
+            return range_not_satisfiable(field_file)
+        except FileNotFoundError:
+            raise Http404('Template file is missing')
         
-        if not order.can_download:
+        # Resuming a transfer continues a download that was already counted,
+        # so it is only allowed shortly after the line's last claim
+        resuming = byte_range is not None and byte_range[0] > 0
+        if not field_file or not field_file.storage.exists(field_file.name):
+            raise Http404('Template file is missing')
+        
+        if resuming:
+            allowed = line.can_resume
+        elif request.method == 'GET':
+            allowed = line.claim_download()
+            if allowed:
+                if byte_range is None:
+                    size = field_file.size
+                else:
+                    size = byte_range[1] - byte_range[0] + 1
+                download_log.record(request, line, size)
+        else:
+            allowed = line.can_download
+        if not allowed:
             messages.error(request, 'Download limit exceeded or order not completed')
             return redirect('orders:detail', pk=order.pk)
         
-        # Increment download count
-        order.increment_download_count()
+        extension = os.path.splitext(field_file.name)[1] or '.zip'
+        try:
+            return build_download_response(
+                field_file, f'{line.template.slug}{extension}', byte_range
+            )
+        except FileNotFoundError:
+            raise Http404('Template file is missing')
+
+
+class DownloadBundleView(LoginRequiredMixin, View):
+    """
+    Download several purchased templates as one ZIP, streamed as it is built
+    
+    All completed orders are bundled unless `?order=<id>` picks some. Every
+    template in the bundle uses one download slot of its order or item.
+    """
+    def get(self, request):
+        orders = Order.objects.filter(
+            user=request.user, status='completed'
+        ).select_related('template').prefetch_related(
+            prefetch_items()
+        ).order_by('created_at')
+        
+        selected = request.GET.getlist('order')
+        if selected:
+            try:
+                orders = orders.filter(pk__in=selected)
+            except ValidationError:
+                raise Http404('Invalid order')
         
-        # TODO: Implement actual file download
-        # For now, return a simple response
-        response = HttpResponse(
-            f"Download link for {order.template.title}. "
-            f"Downloads remaining: {order.max_downloads - order.download_count}",
-            content_type="text/plain"
-        )
-        response['Content-Disposition'] = f'attachment; filename="{order.template.slug}.txt"'
-        return response
+        lines = {}
+        for order in orders:
+            for line in order.lines:
+                field_file = line.template.file
+                if (
+                    line.template_id in lines
+                    or not line.can_download
+                    or not field_file
+                    or not field_file.storage.exists(field_file.name)
+                ):
+                    continue
+                lines[line.template_id] = line
+        
+        granted = claim_downloads(lines.values())
+        if not granted:
+            messages.error(request, 'No downloads left for the selected orders')
+            return redirect('orders:list')
+        
+        files = []
+        for line in granted:
+            field_file = line.template.file
+            extension = os.path.splitext(field_file.name)[1] or '.zip'
+            files.append((f'{line.template.slug}{extension}', field_file.storage, field_file.name))
+            download_log.record(request, line, field_file.size)
+        return bundle_response(files, 'templates.zip')
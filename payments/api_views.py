@@ -2,20 +2,28 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db import transaction
 from django.utils import timezone
+from core.fieldsets import SparseFieldsetMixin
+from core.idempotency import idempotent
+from core.pagination import KeysetPagination
+from orders.models import Order, prefetch_items
 from .models import Payment
 from .serializers import PaymentSerializer, CreatePaymentSerializer, PaymentStatusSerializer
 
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing payments
     """
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
-        return Payment.objects.filter(order__user=self.request.user)
+        return Payment.objects.filter(order__user=self.request.user).select_related(
+            'order', 'order__user', 'order__template', 'order__template__category'
+        ).prefetch_related(prefetch_items('order__'))
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -24,6 +32,7 @@ class PaymentViewSet(viewsets.ModelViewSet):
             return PaymentStatusSerializer
         return PaymentSerializer
     
+    @idempotent
     def create(self, request, *args, **kwargs):
         """
         Create a new payment
@@ -46,16 +55,22 @@ class PaymentViewSet(viewsets.ModelViewSet):
         
         if serializer.is_valid():
             # If marking as completed, update processed_at
-            if serializer.validated_data.get('status') == 'completed':
-                serializer.validated_data['processed_at'] = timezone.now()
+            with transaction.atomic():
+                # Locked so expire_stale_orders skips the order until the
+                # payment is settled
+                order = Order.objects.select_for_update().get(pk=payment.order_id)
+                if serializer.validated_data.get('status') == 'completed':
+                    if order.status == 'expired':
+                        return Response(
+                            {'error': 'Order has expired'},
+                            status=status.HTTP_400_BAD_REQUEST
+                        )
+                    serializer.validated_data['processed_at'] = timezone.now()
+                    
+                    # Update order status, enabling all of its downloads
+                    order.complete()
                 
-                # Update order status
-                order = payment.order
-                order.status = 'completed'
-                order.completed_at = timezone.now()
-                order.save()
-            
-            serializer.save()
+                serializer.save()
             return Response(serializer.data)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -65,6 +80,6 @@ class PaymentViewSet(viewsets.ModelViewSet):
         """
         Get current user's payments
         """
-        payments = self.get_queryset()
+        payments = self.narrow_queryset(self.get_queryset())
         serializer = self.get_serializer(payments, many=True)
         return Response(serializer.data)
\ No newline at end of file
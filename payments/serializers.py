@@ -1,9 +1,11 @@
+from django.db import transaction
 from rest_framework import serializers
+from core.fieldsets import DynamicFieldsMixin
 from .models import Payment
 from orders.serializers import OrderSerializer
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Serializer for Payment model
     """
@@ -40,18 +42,23 @@ class CreatePaymentSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         from orders.models import Order
         order_id = validated_data.pop('order_id')
-        order = Order.objects.get(id=order_id)
-        
-        payment = Payment.objects.create(
-            order=order,
-            amount=order.amount,
-            currency=order.currency,
-            **validated_data
-        )
-        
-        # Update order status
-        order.status = 'pending'
-        order.save()
+        with transaction.atomic():
+            # Locked, and checked again, so expire_stale_orders cannot
+            # expire the order under the new payment
+            order = Order.objects.select_for_update().get(id=order_id)
+            if order.status != 'created':
+                raise serializers.ValidationError({'order_id': "Order not found or already processed"})
+            
+            payment = Payment.objects.create(
+                order=order,
+                amount=order.amount,
+                currency=order.currency,
+                **validated_data
+            )
+            
+            # Update order status
+            order.status = 'pending'
+            order.save()
         
         return payment
 
@@ -1,3 +1,100 @@
+from django.core.cache import caches
 from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from core.testing import QueryBudgetMixin, create_template
+from orders.models import Order
+from templates.models import Template
+from users.models import User
+from .models import Payment
 
-# Create your tests here.
+
+class PaymentApiQueryBudgetTests(QueryBudgetMixin, TestCase):
+    """
+    Payment listings load in a fixed number of queries: the payments, the
+    items of their orders, and the user's owned-template set until it is
+    cached.
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+    
+    def setUp(self):
+        # Start every test with the owned-template set uncached
+        caches['default'].clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.add_payments(2)
+    
+    def add_payments(self, count=5):
+        start = Template.objects.count()
+        # Run the on_commit hooks that invalidate the owned-template set
+        with self.captureOnCommitCallbacks(execute=True):
+            for number in range(start, start + count):
+                template = create_template(number)
+                order = Order.objects.create(
+                    user=self.user,
+                    template=template,
+                    amount=10,
+                    status='completed'
+                )
+                Payment.objects.create(order=order, amount=10, payment_method='telegram')
+    
+    def test_list(self):
+        self.assertQueryBudget(self.client, reverse('payment-list'), 3, self.add_payments)
+    
+    def test_my_payments(self):
+        self.assertQueryBudget(self.client, reverse('payment-my-payments'), 3, self.add_payments)
+    
+    def test_sparse_list(self):
+        url = reverse('payment-list')
+        self.assertQueryBudget(self.client, f'{url}?expand=order', 2, self.add_payments)
+        self.assertQueryBudget(self.client, f'{url}?fields=id,order.template.title', 1)
+    
+    def test_detail(self):
+        payment = Payment.objects.filter(order__user=self.user).first()
+        self.assertQueryBudget(self.client, reverse('payment-detail', args=[payment.pk]), 3)
+
+
+class PaymentOrderLockTests(TestCase):
+    """
+    Payments only move orders the expiry sweep has not expired
+    """
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+        cls.template = create_template(1)
+    
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.order = Order.objects.create(user=self.user, template=self.template, amount=10)
+    
+    def test_create_payment_moves_order_to_pending(self):
+        response = self.client.post(
+            reverse('payment-list'),
+            {'order_id': str(self.order.pk), 'payment_method': 'telegram'},
+            format='json'
+        )
+        
+        self.assertEqual(response.status_code, 201)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'pending')
+    
+    def test_expired_order_cannot_complete(self):
+        payment = Payment.objects.create(order=self.order, amount=10, payment_method='telegram')
+        Order.objects.filter(pk=self.order.pk).update(status='expired')
+        
+        response = self.client.patch(
+            reverse('payment-update-status', args=[payment.pk]),
+            {'status': 'completed'},
+            format='json'
+        )
+        
+        self.assertEqual(response.status_code, 400)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'expired')
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'pending')
@@ -6,6 +6,7 @@ from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.urls import reverse
+from django.db import transaction
 from .models import Payment
 from orders.models import Order
 import json
@@ -42,48 +43,50 @@ class ProcessPaymentView(LoginRequiredMixin, TemplateView):
             messages.error(request, 'Invalid payment data')
             return redirect('templates:list')
         
-        order = get_object_or_404(
-            Order, 
-            id=order_id, 
-            user=request.user, 
-            status='created'
-        )
-        
-        # Create payment record
-        payment = Payment.objects.create(
-            order=order,
-            payment_method=payment_method,
-            amount=order.amount,
-            currency=order.currency,
-            status='pending'
-        )
-        
-        # Update order status
-        order.status = 'pending'
-        order.save()
-        
-        # TODO: Integrate with actual payment gateways
-        # For demo purposes, simulate successful payment
-        if payment_method == 'telegram':
-            return self._simulate_telegram_payment(payment)
-        else:
-            return self._simulate_crypto_payment(payment)
+        # The order stays locked until the payment is settled, so
+        # expire_stale_orders skips it meanwhile
+        with transaction.atomic():
+            order = get_object_or_404(
+                Order.objects.select_for_update(), 
+                id=order_id, 
+                user=request.user, 
+                status='created'
+            )
+            
+            # Create payment record
+            payment = Payment.objects.create(
+                order=order,
+                payment_method=payment_method,
+                amount=order.amount,
+                currency=order.currency,
+                status='pending'
+            )
+            
+            # Update order status
+            order.status = 'pending'
+            order.save()
+            
+            # TODO: Integrate with actual payment gateways
+            # For demo purposes, simulate successful payment
+            if payment_method == 'telegram':
+                return self._simulate_telegram_payment(payment)
+            else:
+                return self._simulate_crypto_payment(payment)
     
     def _simulate_telegram_payment(self, payment):
         """
         Simulate Telegram payment (for demo)
         """
         # In real implementation, redirect to Telegram payment
-        payment.status = 'completed'
-        payment.transaction_id = f'tg_{payment.id}'
-        payment.processed_at = datetime.now()
-        payment.save()
-        
-        # Complete order
-        order = payment.order
-        order.status = 'completed'
-        order.completed_at = datetime.now()
-        order.save()
+        with transaction.atomic():
+            payment.status = 'completed'
+            payment.transaction_id = f'tg_{payment.id}'
+            payment.processed_at = datetime.now()
+            payment.save()
+            
+            # Complete order, enabling the downloads of all its templates
+            order = payment.order
+            order.complete()
         
         messages.success(self.request, 'Payment completed successfully!')
         return redirect('payments:success', order_id=order.id)
@@ -93,16 +96,15 @@ class ProcessPaymentView(LoginRequiredMixin, TemplateView):
         Simulate crypto payment (for demo)
         """
         # In real implementation, generate crypto address and wait for payment
-        payment.status = 'completed'
-        payment.transaction_id = f'crypto_{payment.id}'
-        payment.processed_at = datetime.now()
-        payment.save()
-        
-        # Complete order
-        order = payment.order
-        order.status = 'completed'
-        order.completed_at = datetime.now()
-        order.save()
+        with transaction.atomic():
+            payment.status = 'completed'
+            payment.transaction_id = f'crypto_{payment.id}'
+            payment.processed_at = datetime.now()
+            payment.save()
+            
+            # Complete order, enabling the downloads of all its templates
+            order = payment.order
+            order.complete()
         
         messages.success(self.request, 'Payment completed successfully!')
         return redirect('payments:success', order_id=order.id)
@@ -139,21 +141,22 @@ class PaymentCancelView(LoginRequiredMixin, TemplateView):
         order_id = self.kwargs['order_id']
         
         try:
-            order = Order.objects.get(id=order_id, user=self.request.user)
-            context['order'] = order
-            
-            # Update order status if it was pending
-            if order.status == 'pending':
-                order.status = 'failed'
-                order.save()
+            with transaction.atomic():
+                order = Order.objects.select_for_update().get(id=order_id, user=self.request.user)
+                context['order'] = order
                 
-                # Update payment status
-                try:
-                    payment = order.payment
-                    payment.status = 'cancelled'
-                    payment.save()
-                except Payment.DoesNotExist:
-                    pass
+                # Update order status if it was pending
+                if order.status == 'pending':
+                    order.status = 'failed'
+                    order.save()
+                    
+                    # Update payment status
+                    try:
+                        payment = order.payment
+                        payment.status = 'cancelled'
+                        payment.save()
+                    except Payment.DoesNotExist:
+                        pass
         except Order.DoesNotExist:
             pass
         
@@ -149,29 +149,121 @@ function initializeFilters() {
 // Search initialization
 function initializeSearch() {
     const searchInput = document.getElementById('searchInput');
-    if (searchInput) {
-        let searchTimeout;
-        searchInput.addEventListener('input', function() {
-            clearTimeout(searchTimeout);
-            searchTimeout = setTimeout(() => {
-                const query = this.value.trim();
-                if (query.length >= 3 || query.length === 0) {
-                    performSearch(query);
-                }
-            }, 500);
+    const menu = document.getElementById('searchSuggestions');
+    if (!searchInput || !menu || !searchInput.dataset.suggestUrl) {
+        return;
+    }
+    
+    const limit = 8;
+    const cache = new Map();
+    let debounceTimer;
+    let controller;
+    let activeIndex = -1;
+    
+    // Reuse an earlier response: a shorter prefix that returned fewer than
+    // `limit` results already holds every match for longer queries
+    function fromCache(query) {
+        if (cache.has(query)) {
+            return cache.get(query);
+        }
+        for (let length = query.length - 1; length > 0; length--) {
+            const results = cache.get(query.slice(0, length));
+            if (results && results.length < limit) {
+                // Same rule as the server: the query prefixes the label
+                // from one of its words onwards
+                return results.filter(item => {
+                    return (' ' + normalizeQuery(item.label)).includes(' ' + query);
+                });
+            }
+        }
+        return null;
+    }
+    
+    function render(results) {
+        activeIndex = -1;
+        menu.innerHTML = '';
+        results.forEach(item => {
+            const link = document.createElement('a');
+            link.className = 'dropdown-item d-flex justify-content-between';
+            link.href = item.url;
+            const label = document.createElement('span');
+            label.textContent = item.label;
+            const type = document.createElement('small');
+            type.className = 'text-muted ms-2';
+            type.textContent = item.type;
+            link.append(label, type);
+            menu.appendChild(link);
         });
+        menu.classList.toggle('show', results.length > 0);
     }
-}
-
-// Perform search
-function performSearch(query) {
-    const url = new URL(window.location);
-    if (query) {
-        url.searchParams.set('search', query);
-    } else {
-        url.searchParams.delete('search');
+    
+    function fetchSuggestions(query) {
+        const cached = fromCache(query);
+        if (cached) {
+            render(cached);
+            return;
+        }
+        if (controller) {
+            controller.abort();
+        }
+        controller = new AbortController();
+        const url = new URL(searchInput.dataset.suggestUrl, window.location.origin);
+        url.searchParams.set('q', query);
+        url.searchParams.set('limit', limit);
+        fetch(url, {signal: controller.signal, headers: {'Accept': 'application/json'}})
+            .then(response => response.json())
+            .then(data => {
+                cache.set(query, data.results);
+                if (normalizeQuery(searchInput.value) === query) {
+                    render(data.results);
+                }
+            })
+            .catch(error => {
+                if (error.name !== 'AbortError') {
+                    console.error('Suggestion error:', error);
+                }
+            });
+    }
+    
+    function normalizeQuery(value) {
+        return value.toLowerCase().replace(/[^\p{L}\p{N}_]+/gu, ' ').trim();
     }
-    window.location.href = url.toString();
+    
+    searchInput.addEventListener('input', function() {
+        clearTimeout(debounceTimer);
+        const query = normalizeQuery(this.value);
+        if (!query) {
+            render([]);
+            return;
+        }
+        debounceTimer = setTimeout(() => fetchSuggestions(query), 150);
+    });
+    
+    searchInput.addEventListener('keydown', function(e) {
+        const items = menu.querySelectorAll('.dropdown-item');
+        if (!menu.classList.contains('show') || !items.length) {
+            return;
+        }
+        if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+            e.preventDefault();
+            activeIndex = (activeIndex + (e.key === 'ArrowDown' ? 1 : -1) + items.length) % items.length;
+            items.forEach((item, index) => item.classList.toggle('active', index === activeIndex));
+        } else if (e.key === 'Enter' && activeIndex >= 0) {
+            e.preventDefault();
+            window.location.href = items[activeIndex].href;
+        } else if (e.key === 'Escape') {
+            render([]);
+        }
+    });
+    
+    // Keep focus in the input so picking a suggestion does not first
+    // trigger the filter form's change-to-submit
+    menu.addEventListener('mousedown', e => e.preventDefault());
+    
+    searchInput.addEventListener('blur', function() {
+        // Let clicks on a suggestion land before hiding the menu
+        setTimeout(() => menu.classList.remove('show'), 150);
+    });
 }
 
 // Utility functions
@@ -68,6 +68,8 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'orders.context_processors.ownership',
+                'orders.context_processors.cart',
             ],
         },
     },
@@ -151,6 +153,81 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 12
 }
 
+# Serve the HTML catalog with cursor links instead of page numbers
+CATALOG_KEYSET_PAGINATION = False
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Swap in 'django.core.cache.backends.filebased.FileBasedCache' with a
+# LOCATION directory to share the catalog cache between worker processes.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Responsive thumbnail variants (see templates.thumbnails). Variant files
+# are content-hashed, so the front server can serve
+# MEDIA_URL/templates/thumbnails/variants/ with
+# "Cache-Control: public, max-age=31536000, immutable"
+THUMBNAIL_VARIANT_WIDTHS = (320, 640, 960)
+THUMBNAIL_VARIANTS_ASYNC = True
+
+# Trending score decay (see templates.trending); run
+# recompute_trending_scores after changing either value
+TRENDING_HALF_LIFE_HOURS = 72
+TRENDING_EVENT_WEIGHTS = {'download': 1.0, 'purchase': 5.0}
+
+# Reviews per page on template pages and the reviews API
+REVIEWS_PAGE_SIZE = 10
+
+# Template archive downloads (see orders.delivery). Set to
+# 'x-accel-redirect' (nginx, with an `internal` location at
+# TEMPLATE_DOWNLOAD_ACCEL_PREFIX aliased to MEDIA_ROOT) or 'x-sendfile'
+# (Apache mod_xsendfile, lighttpd) to have the front server send the bytes
+TEMPLATE_DOWNLOAD_OFFLOAD = None
+TEMPLATE_DOWNLOAD_ACCEL_PREFIX = '/protected/'
+
+# Lifetime of signed download links in seconds (see orders.signing). Links
+# are signed with SECRET_KEY and also accepted under SECRET_KEY_FALLBACKS;
+# set ORDER_DOWNLOAD_SIGNING_KEYS (newest first) to use dedicated keys
+ORDER_DOWNLOAD_URL_TTL = 24 * 60 * 60
+
+# Seconds after a download slot is used during which Range requests may
+# resume that download without using another slot
+ORDER_DOWNLOAD_RESUME_WINDOW = 60 * 60
+
+# Unpaid orders older than this are expired by expire_stale_orders
+ORDER_STALE_AFTER_HOURS = 24
+
+# Most templates the session cart holds (see orders.cart)
+CART_MAX_ITEMS = 50
+
+# Idempotency-Key replay window for API creates (see core.idempotency), and
+# how long an unfinished request holds its key before a retry may take over
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# Download event log (see orders.download_log): buffered events are written
+# once this many are waiting or this many seconds have passed, and
+# rollup_download_events counts DOWNLOAD_ROLLUP_BATCH_SIZE events per
+# transaction
+DOWNLOAD_LOG_BATCH_SIZE = 200
+DOWNLOAD_LOG_FLUSH_INTERVAL = 5
+DOWNLOAD_LOG_MAX_BUFFER = 10000
+DOWNLOAD_ROLLUP_BATCH_SIZE = 1000
+
+# Cache holding each user's set of owned template ids (see orders.ownership)
+OWNERSHIP_CACHE_ALIAS = 'default'
+OWNERSHIP_CACHE_TIMEOUT = 60 * 60
+
+# Anonymous catalog response cache (see templates.cache). Counter writes
+# (download counts, trending scores) invalidate it at most once per
+# CATALOG_COUNTER_DEBOUNCE seconds
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = 300
+CATALOG_COUNTER_DEBOUNCE = 10
+
 # Telegram Bot Settings
 TELEGRAM_BOT_TOKEN = ''
 TELEGRAM_WEBHOOK_URL = ''
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Category, Template, Review
+from .models import Category, Template, Review, TemplateEvent
 
 
 @admin.register(Category)
@@ -27,7 +27,12 @@ class TemplateAdmin(admin.ModelAdmin):
     ]
     search_fields = ['title', 'description', 'short_description']
     prepopulated_fields = {'slug': ('title',)}
-    readonly_fields = ['download_count', 'created_at', 'updated_at', 'thumbnail_preview']
+    readonly_fields = [
+        'download_count', 'review_count', 'average_rating', 'trending_score',
+        'rating_1_count', 'rating_2_count', 'rating_3_count',
+        'rating_4_count', 'rating_5_count',
+        'created_at', 'updated_at', 'thumbnail_preview', 'thumbnail_variants'
+    ]
     
     fieldsets = (
         ('Basic Information', {
@@ -37,13 +42,18 @@ class TemplateAdmin(admin.ModelAdmin):
             'fields': ('price', 'active')
         }),
         ('Files & Media', {
-            'fields': ('file', 'thumbnail', 'thumbnail_preview')
+            'fields': ('file', 'thumbnail', 'thumbnail_preview', 'thumbnail_variants')
         }),
         ('Features & Demo', {
             'fields': ('features', 'demo_available', 'demo_bot_token')
         }),
         ('Statistics', {
-            'fields': ('download_count', 'created_at', 'updated_at'),
+            'fields': (
+                'download_count', 'review_count', 'average_rating',
+                'rating_1_count', 'rating_2_count', 'rating_3_count',
+                'rating_4_count', 'rating_5_count',
+                'trending_score', 'created_at', 'updated_at'
+            ),
             'classes': ('collapse',)
         })
     )
@@ -67,3 +77,14 @@ class ReviewAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('user', 'template')
+
+
+@admin.register(TemplateEvent)
+class TemplateEventAdmin(admin.ModelAdmin):
+    list_display = ['template', 'kind', 'created_at']
+    list_filter = ['kind', 'created_at']
+    search_fields = ['template__title']
+    raw_id_fields = ['template']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('template')
@@ -1,40 +1,141 @@
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework import viewsets, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from .models import Template, Category, Review
-from .serializers import TemplateSerializer, CategorySerializer, ReviewSerializer
+from .search import TemplateSearchFilter
+from .filters import filter_templates
+from .reviews import ReviewPagination
+from .facets import compute_facets
+from .suggest import suggest
+from .trending import decayed_score
+from .cache import CatalogCacheMixin, CATALOG_PARAMS
+from .conditional import CatalogViewSetConditionalMixin
+from core.fieldsets import SparseFieldsetMixin
+from core.pagination import KeysetPagination
+from .serializers import (
+    TemplateSerializer, TemplateListSerializer, CategorySerializer, ReviewSerializer
+)
 
 
-class TemplateViewSet(viewsets.ReadOnlyModelViewSet):
+class TemplateViewSet(
+    CatalogViewSetConditionalMixin, CatalogCacheMixin, SparseFieldsetMixin,
+    viewsets.ReadOnlyModelViewSet
+):
     """
     ViewSet for templates (read-only)
     """
     queryset = Template.objects.filter(active=True)
     serializer_class = TemplateSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'description']
-    ordering_fields = ['name', 'price', 'created_at', 'download_count']
+    pagination_class = KeysetPagination
+    catalog_cache_params = CATALOG_PARAMS + ('ordering', 'format', 'limit', 'fields', 'expand')
+    filter_backends = [filters.OrderingFilter, TemplateSearchFilter]
+    ordering_fields = ['title', 'price', 'created_at', 'download_count']
     ordering = ['-created_at']
     
+    def get_queryset(self):
+        queryset = Template.objects.filter(active=True).select_related('category')
+        # Search is applied by TemplateSearchFilter
+        return filter_templates(queryset, self.request.query_params, search=False)
+    
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Get category, price-bucket and demo counts for the current filters
+        """
+        queryset = filter_templates(
+            Template.objects.filter(active=True), request.query_params, category=False
+        )
+        return Response(compute_facets(
+            queryset, selected_category=request.query_params.get('category') or None
+        ))
+    
+    @action(detail=False, methods=['get'], url_path=r'(?P<slug>[-\w]+)/related')
+    def related(self, request, slug=None):
+        """
+        Get precomputed related templates for a template slug
+        """
+        template = get_object_or_404(self.get_queryset(), slug=slug)
+        serializer = TemplateListSerializer(
+            template.get_related_templates(limit=6), many=True, context={'request': request}
+        )
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'], url_path=r'(?P<slug>[-\w]+)/reviews')
+    def reviews(self, request, slug=None):
+        """
+        Get reviews for a template slug, newest first, paginated by cursor
+        """
+        template = get_object_or_404(self.get_queryset(), slug=slug)
+        paginator = ReviewPagination()
+        reviews = paginator.paginate_reviews(template.pk, request, view=self)
+        for review in reviews:
+            # Spare the serializer a template query per review
+            review.template = template
+        serializer = ReviewSerializer(reviews, many=True)
+        return paginator.get_paginated_response(serializer.data)
+    
     @action(detail=False, methods=['get'])
     def featured(self, request):
         """
         Get featured templates
         """
-        featured_templates = self.get_queryset().filter(featured=True)[:6]
+        featured_templates = self.narrow_queryset(self.get_queryset().filter(featured=True))[:6]
         serializer = self.get_serializer(featured_templates, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def popular(self, request):
         """
-        Get popular templates by download count
+        Get popular templates by time-decayed download and purchase activity
         """
-        popular_templates = self.get_queryset().order_by('-download_count')[:10]
+        popular_templates = self.narrow_queryset(
+            self.get_queryset().order_by('-trending_score', '-download_count')
+        )[:10]
         serializer = self.get_serializer(popular_templates, many=True)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """
+        Get typeahead suggestions for a search prefix
+        """
+        query = request.query_params.get('q', '').strip()[:100]
+        try:
+            limit = min(max(int(request.query_params.get('limit', 8)), 1), 20)
+        except ValueError:
+            limit = 8
+        
+        results = [suggestion._asdict() for suggestion in suggest(query, limit)] if query else []
+        response = Response({'query': query, 'results': results})
+        response['Cache-Control'] = 'public, max-age=60'
+        return response
+    
+    @action(detail=False, methods=['get'])
+    def trending(self, request):
+        """
+        Get trending templates with their current decayed score
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            limit = 10
+        
+        trending_templates = (
+            self.get_queryset()
+            .exclude(trending_score=0)
+            .order_by('-trending_score')[:limit]
+        )
+        now = timezone.now()
+        data = []
+        for template in trending_templates:
+            item = TemplateListSerializer(template, context={'request': request}).data
+            item['trending_score'] = round(decayed_score(template.trending_score, now), 4)
+            data.append(item)
+        return Response(data)
 
 
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TemplatesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'templates'
+    
+    def ready(self):
+        from . import signals  # noqa: F401
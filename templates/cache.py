@@ -0,0 +1,221 @@
+"""
+Versioned response cache for anonymous catalog pages and API responses.
+
+Every key embeds a catalog generation number. Saving or deleting a
+Template, Category or Review bumps the generation, so entries written
+before the change can never be served again and simply age out.
+
+Counters written with queryset updates on every download or purchase
+(`download_count`, `trending_score`) call `bump_generation_later`
+instead. It marks the catalog stale, and the first `get_generation`
+call CATALOG_COUNTER_DEBOUNCE seconds later bumps the generation once for
+every change in between.
+"""
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.http import urlencode
+
+GENERATION_KEY = 'catalog:generation'
+PENDING_KEY = 'catalog:pending'
+MODIFIED_KEY = 'catalog:modified'
+HITS_KEY = 'catalog:hits'
+MISSES_KEY = 'catalog:misses'
+
+# Query parameters that select catalog content; requests carrying any other
+# parameter bypass the cache rather than risk serving the wrong variant
+CATALOG_PARAMS = ('search', 'category', 'min_price', 'max_price', 'sort', 'page', 'cursor')
+
+
+def get_cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 300)
+
+
+def get_counter_debounce():
+    return getattr(settings, 'CATALOG_COUNTER_DEBOUNCE', 10)
+
+
+def _incr(key):
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def get_generation():
+    """
+    Return the current catalog generation, initialising it if missing and
+    applying a pending counter bump that is due
+    """
+    cache = get_cache()
+    values = cache.get_many([GENERATION_KEY, PENDING_KEY])
+    pending = values.get(PENDING_KEY)
+    # Only the process that deletes the marker bumps
+    if (
+        pending is not None
+        and time.time() - pending >= get_counter_debounce()
+        and cache.delete(PENDING_KEY)
+    ):
+        return bump_generation()
+    
+    generation = values.get(GENERATION_KEY)
+    if generation is None:
+        # Seed from the clock so an evicted counter never rewinds to a
+        # generation that still has entries cached under it
+        cache.add(GENERATION_KEY, int(time.time() * 1000), timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    """Invalidate every cached catalog entry"""
+    cache = get_cache()
+    cache.set(MODIFIED_KEY, time.time(), timeout=None)
+    try:
+        return cache.incr(GENERATION_KEY)
+    except ValueError:
+        get_generation()
+        return cache.incr(GENERATION_KEY)
+
+
+def bump_generation_later():
+    """
+    Invalidate the catalog within CATALOG_COUNTER_DEBOUNCE seconds, folding
+    frequent counter updates into one bump
+    """
+    get_cache().add(PENDING_KEY, time.time(), timeout=None)
+
+
+def get_last_modified():
+    """
+    Return the Unix time of the last catalog change. If it is unknown the
+    current time is recorded, which errs on the side of a full response.
+    """
+    cache = get_cache()
+    modified = cache.get(MODIFIED_KEY)
+    if modified is None:
+        cache.add(MODIFIED_KEY, time.time(), timeout=None)
+        modified = cache.get(MODIFIED_KEY)
+    return modified
+
+
+def get_stats():
+    cache = get_cache()
+    values = cache.get_many([GENERATION_KEY, HITS_KEY, MISSES_KEY])
+    return {
+        'generation': values.get(GENERATION_KEY),
+        'hits': values.get(HITS_KEY, 0),
+        'misses': values.get(MISSES_KEY, 0),
+    }
+
+
+def reset_stats():
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
+
+
+def normalize_params(query_params, allowed):
+    """
+    Return the catalog parameters as a sorted tuple, or None if the request
+    carries parameters outside `allowed`
+    """
+    if set(query_params) - set(allowed):
+        return None
+    normalized = []
+    for name in sorted(query_params):
+        value = query_params.get(name, '').strip()
+        if not value or (name == 'page' and value == '1'):
+            continue
+        normalized.append((name, value))
+    return tuple(normalized)
+
+
+def make_key(request, params, generation):
+    digest = hashlib.sha1(
+        '|'.join([
+            request.path,
+            urlencode(params),
+            request.META.get('HTTP_ACCEPT', ''),
+        ]).encode()
+    ).hexdigest()
+    return f'catalog:{generation}:{digest}'
+
+
+def get_or_compute(namespace, params, compute):
+    """
+    Return a cached value for `params` under the current generation,
+    computing and storing it on a miss
+    """
+    cache = get_cache()
+    digest = hashlib.sha1(urlencode(sorted(params)).encode()).hexdigest()
+    key = f'catalog:{get_generation()}:{namespace}:{digest}'
+    value = cache.get(key)
+    if value is None:
+        _incr(MISSES_KEY)
+        value = compute()
+        cache.set(key, value, get_timeout())
+    else:
+        _incr(HITS_KEY)
+    return value
+
+
+class CatalogCacheMixin:
+    """
+    Serve GET requests from anonymous users out of the versioned catalog
+    cache. Works with both Django views and DRF views.
+    """
+    catalog_cache_params = CATALOG_PARAMS
+    
+    def is_catalog_cacheable(self, request):
+        return (
+            request.method == 'GET' and
+            not request.user.is_authenticated and
+            # Pending flash messages must be rendered, not skipped
+            'messages' not in request.COOKIES
+        )
+    
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_catalog_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+        params = normalize_params(request.GET, self.catalog_cache_params)
+        if params is None:
+            return super().dispatch(request, *args, **kwargs)
+        
+        cache = get_cache()
+        key = make_key(request, params, get_generation())
+        cached = cache.get(key)
+        if cached is not None:
+            _incr(HITS_KEY)
+            response = HttpResponse(
+                cached['content'],
+                status=cached['status'],
+                content_type=cached['content_type']
+            )
+            response['X-Catalog-Cache'] = 'HIT'
+            return response
+        
+        _incr(MISSES_KEY)
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code != 200 or response.has_header('Set-Cookie'):
+            return response
+        
+        def store(rendered):
+            cache.set(key, {
+                'content': rendered.content,
+                'status': rendered.status_code,
+                'content_type': rendered['Content-Type'],
+            }, get_timeout())
+        
+        if hasattr(response, 'add_post_render_callback') and not response.is_rendered:
+            response.add_post_render_callback(store)
+        else:
+            store(response)
+        response['X-Catalog-Cache'] = 'MISS'
+        return response
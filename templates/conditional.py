@@ -0,0 +1,118 @@
+"""
+Conditional GET support for catalog pages and API responses.
+
+Validators are derived from the catalog generation (see templates.cache)
+and, for single-template views, the template's `updated_at`, so a
+request carrying If-None-Match or If-Modified-Since is answered with a
+304 before the view queries or renders anything else.
+"""
+import hashlib
+from django.core.exceptions import ValidationError
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from .cache import get_generation, get_last_modified
+
+
+class CatalogConditionalMixin:
+    """
+    Send strong ETag and Last-Modified headers and short-circuit matching
+    conditional requests. Works with both Django views and DRF views.
+    """
+    
+    def is_conditional_allowed(self, request):
+        # Rendered pages differ for logged-in users and pending messages
+        return (
+            request.method in ('GET', 'HEAD') and
+            not request.user.is_authenticated and
+            'messages' not in request.COOKIES
+        )
+    
+    def get_conditional_lookup(self):
+        """
+        Return the lookup of the single template this view shows, or None
+        for list views
+        """
+        return None
+    
+    def get_validators(self, request):
+        from .models import Template
+        
+        parts = [
+            get_generation(),
+            request.get_host(),
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+            # The browsable API shows the logged-in user
+            request.user.pk,
+        ]
+        last_modified = get_last_modified()
+        
+        lookup = self.get_conditional_lookup()
+        if lookup is not None:
+            try:
+                row = (
+                    Template.objects.filter(active=True, **lookup)
+                    .values_list('pk', 'updated_at')
+                    .first()
+                )
+            except (ValueError, ValidationError):
+                row = None
+            if row is None:
+                # Let the view produce its own 404
+                return None, None
+            # updated_at also catches edits made in processes whose cache
+            # generation this one has not seen
+            parts.extend(row)
+            last_modified = max(last_modified, row[1].timestamp())
+        
+        digest = hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+        return f'"{digest}"', int(last_modified)
+    
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_conditional_allowed(request):
+            return super().dispatch(request, *args, **kwargs)
+        
+        etag, last_modified = self.get_validators(request)
+        if etag is None:
+            return super().dispatch(request, *args, **kwargs)
+        
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+        if response.status_code not in (200, 304):
+            return response
+        
+        if not response.has_header('ETag'):
+            response['ETag'] = etag
+        if not response.has_header('Last-Modified'):
+            response['Last-Modified'] = http_date(last_modified)
+        # Stored copies must be revalidated, which the validators make cheap
+        patch_cache_control(response, no_cache=True)
+        return response
+
+
+class CatalogViewSetConditionalMixin(CatalogConditionalMixin):
+    """
+    Conditional GET for the list and retrieve actions of a template viewset
+    """
+    conditional_actions = ('list', 'retrieve')
+    
+    def get_conditional_action(self):
+        # dispatch() runs before DRF resolves self.action
+        return self.action_map.get('get')
+    
+    def is_conditional_allowed(self, request):
+        # Serialized templates flag the ones the user owns. DRF has not
+        # authenticated the request yet, so skip any that carry credentials
+        return (
+            request.method in ('GET', 'HEAD') and
+            self.get_conditional_action() in self.conditional_actions and
+            not request.user.is_authenticated and
+            'HTTP_AUTHORIZATION' not in request.META
+        )
+    
+    def get_conditional_lookup(self):
+        if self.get_conditional_action() != 'retrieve':
+            return None
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return {self.lookup_field: self.kwargs[lookup_url_kwarg]}
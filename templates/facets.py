@@ -0,0 +1,79 @@
+"""
+Catalog facet counts computed in a single grouped query
+"""
+from decimal import Decimal
+from django.db.models import Case, When, Value, CharField, Count, Q
+
+# (key, label, min price inclusive, max price exclusive)
+PRICE_BUCKETS = (
+    ('under-20', 'Under $20', None, 20),
+    ('20-50', '$20 - $50', 20, 50),
+    ('50-100', '$50 - $100', 50, 100),
+    ('100-plus', '$100+', 100, None),
+)
+
+
+def price_bucket_expression():
+    whens = []
+    for key, _, low, high in PRICE_BUCKETS:
+        condition = Q()
+        if low is not None:
+            condition &= Q(price__gte=low)
+        if high is not None:
+            condition &= Q(price__lt=high)
+        whens.append(When(condition, then=Value(key)))
+    return Case(*whens, output_field=CharField())
+
+
+def compute_facets(queryset, selected_category=None):
+    """
+    Count category, price-bucket and demo facets for a filtered queryset.
+
+    `queryset` should carry every active filter except the category, so the
+    category facet can list the alternatives. Price and demo counts are
+    narrowed to `selected_category` (a slug) in Python from the same rows.
+    """
+    rows = (
+        queryset.order_by()
+        .annotate(price_bucket=price_bucket_expression())
+        .values('category_id', 'category__slug', 'category__name',
+                'price_bucket', 'demo_available')
+        .annotate(count=Count('id'))
+    )
+    
+    categories = {}
+    buckets = dict.fromkeys((bucket[0] for bucket in PRICE_BUCKETS), 0)
+    demo_available = 0
+    total = 0
+    for row in rows:
+        category = categories.setdefault(row['category_id'], {
+            'id': row['category_id'],
+            'slug': row['category__slug'],
+            'name': row['category__name'],
+            'count': 0,
+        })
+        category['count'] += row['count']
+        
+        if selected_category and row['category__slug'] != selected_category:
+            continue
+        total += row['count']
+        buckets[row['price_bucket']] += row['count']
+        if row['demo_available']:
+            demo_available += row['count']
+    
+    return {
+        'total': total,
+        'categories': sorted(categories.values(), key=lambda category: category['name']),
+        'price_buckets': [
+            {
+                'key': key,
+                'label': label,
+                'min_price': low,
+                # Inclusive bound for the max_price filter (prices have cents)
+                'max_price': Decimal(high) - Decimal('0.01') if high is not None else None,
+                'count': buckets[key],
+            }
+            for key, label, low, high in PRICE_BUCKETS
+        ],
+        'demo_available': demo_available,
+    }
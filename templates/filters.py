@@ -0,0 +1,41 @@
+"""
+Catalog filters shared by the HTML catalog and the templates API
+"""
+from decimal import Decimal, InvalidOperation
+from .search import search_templates
+
+
+def parse_price(value):
+    """Return a price filter value as Decimal, or None if blank or invalid"""
+    try:
+        return Decimal(value) if value else None
+    except (InvalidOperation, TypeError):
+        return None
+
+
+def filter_templates(queryset, params, search=True, category=True):
+    """
+    Apply the search, category and price parameters of a catalog request.
+
+    `search` and `category` can be switched off for callers that handle
+    them elsewhere, such as the DRF search filter or category facets.
+    """
+    # Search functionality
+    query = params.get('search', '').strip()
+    if search and query:
+        queryset = search_templates(queryset, query)
+    
+    # Category filter
+    category_slug = params.get('category')
+    if category and category_slug:
+        queryset = queryset.filter(category__slug=category_slug)
+    
+    # Price filter
+    min_price = parse_price(params.get('min_price'))
+    max_price = parse_price(params.get('max_price'))
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+    if max_price is not None:
+        queryset = queryset.filter(price__lte=max_price)
+    
+    return queryset
@@ -0,0 +1,177 @@
+"""
+Bulk template import from a manifest of ZIP archives.
+
+A manifest is a JSON list, a JSON Lines file or a CSV file with one row
+per template; see `read_manifest` for the columns. Archives are hashed and
+checked by `inspect_archive`, which streams them and is safe to run in a
+worker process, and rows are inserted with `bulk_create`. Rows whose slug
+already exists are skipped, so an interrupted import can simply be rerun.
+"""
+import csv
+import hashlib
+import json
+import os
+import zipfile
+from decimal import Decimal, InvalidOperation
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.utils.text import slugify
+
+MANIFEST_NAMES = ('manifest.json', 'manifest.jsonl', 'manifest.csv')
+
+CHUNK_SIZE = 1024 * 1024
+
+# Limits that keep a malformed or hostile archive from being accepted
+MAX_ARCHIVE_SIZE = 100 * 1024 * 1024
+MAX_UNCOMPRESSED_SIZE = 500 * 1024 * 1024
+MAX_ENTRIES = 10000
+
+
+class ImportRowError(Exception):
+    """A manifest row that cannot be imported"""
+
+
+def find_manifest(path):
+    """Return the manifest file for `path`, which may be a directory"""
+    if not os.path.isdir(path):
+        return path
+    for name in MANIFEST_NAMES:
+        candidate = os.path.join(path, name)
+        if os.path.exists(candidate):
+            return candidate
+    raise FileNotFoundError(f'No {", ".join(MANIFEST_NAMES)} in {path}')
+
+
+def read_manifest(path):
+    """
+    Yield `(line, row)` for each manifest row.
+    
+    Rows have `title`, `category` (slug), `price`, `file` (relative to the
+    manifest) and optionally `slug`, `short_description`, `description`,
+    `features`, `thumbnail`, `demo_available`, `active` and `sha256`, the
+    expected archive checksum. In CSV files `features` is separated by `|`.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline='', encoding='utf-8') as manifest:
+        if extension == '.csv':
+            # Line 1 is the header
+            for line, row in enumerate(csv.DictReader(manifest), start=2):
+                yield line, row
+        elif extension == '.jsonl':
+            for line, text in enumerate(manifest, start=1):
+                if text.strip():
+                    yield line, json.loads(text)
+        else:
+            for index, row in enumerate(json.load(manifest), start=1):
+                yield index, row
+
+
+def parse_bool(value, default):
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'y')
+
+
+def parse_features(value):
+    if value in (None, ''):
+        return []
+    if isinstance(value, str):
+        return [feature.strip() for feature in value.split('|') if feature.strip()]
+    if not isinstance(value, list):
+        raise ImportRowError('features must be a list')
+    return [str(feature).strip() for feature in value if str(feature).strip()]
+
+
+def build_template(row, categories, base_dir):
+    """
+    Return an unsaved Template for a manifest row plus the absolute
+    archive and thumbnail paths; raise ImportRowError if it is invalid
+    """
+    from .models import Template
+    
+    title = (row.get('title') or '').strip()
+    if not title:
+        raise ImportRowError('title is required')
+    
+    category = categories.get((row.get('category') or '').strip())
+    if category is None:
+        raise ImportRowError(f'unknown category {row.get("category")!r}')
+    
+    try:
+        price = Decimal(str(row.get('price', '')).strip())
+    except InvalidOperation:
+        raise ImportRowError(f'invalid price {row.get("price")!r}')
+    
+    if not row.get('file'):
+        raise ImportRowError('file is required')
+    archive = os.path.join(base_dir, row['file'])
+    thumbnail = os.path.join(base_dir, row['thumbnail']) if row.get('thumbnail') else None
+    
+    description = (row.get('description') or '').strip()
+    template = Template(
+        title=title,
+        slug=(row.get('slug') or '').strip() or slugify(title),
+        category=category,
+        price=price,
+        description=description or title,
+        short_description=(row.get('short_description') or '').strip() or description[:300] or title,
+        features=parse_features(row.get('features')),
+        demo_available=parse_bool(row.get('demo_available'), False),
+        active=parse_bool(row.get('active'), True),
+    )
+    try:
+        # The category came from `categories` and slugs are checked for the
+        # whole batch at once, which saves two queries per row
+        template.full_clean(exclude=['category', 'file', 'thumbnail'], validate_unique=False)
+    except ValidationError as exc:
+        raise ImportRowError('; '.join(
+            f'{field}: {" ".join(messages)}' for field, messages in exc.message_dict.items()
+        ))
+    return template, archive, thumbnail
+
+
+def inspect_archive(path):
+    """
+    Hash and validate one ZIP archive.
+    
+    Returns `(sha256, None)` or `(None, error)`. Runs in worker processes,
+    so it only touches the filesystem.
+    """
+    try:
+        size = os.path.getsize(path)
+        if size > MAX_ARCHIVE_SIZE:
+            return None, f'archive is larger than {MAX_ARCHIVE_SIZE} bytes'
+        
+        digest = hashlib.sha256()
+        with open(path, 'rb') as archive:
+            for chunk in iter(lambda: archive.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+        
+        with zipfile.ZipFile(path) as archive:
+            entries = archive.infolist()
+            if not entries:
+                return None, 'archive is empty'
+            if len(entries) > MAX_ENTRIES:
+                return None, f'archive has more than {MAX_ENTRIES} entries'
+            if sum(entry.file_size for entry in entries) > MAX_UNCOMPRESSED_SIZE:
+                return None, f'archive expands to more than {MAX_UNCOMPRESSED_SIZE} bytes'
+            for entry in entries:
+                name = entry.filename.replace('\\', '/')
+                if name.startswith('/') or '..' in name.split('/'):
+                    return None, f'unsafe path {entry.filename!r} in archive'
+            # Decompresses every entry in chunks and checks its CRC
+            broken = archive.testzip()
+            if broken is not None:
+                return None, f'corrupt entry {broken!r} in archive'
+    except (OSError, zipfile.BadZipFile, zipfile.LargeZipFile, NotImplementedError) as exc:
+        return None, str(exc) or exc.__class__.__name__
+    return digest.hexdigest(), None
+
+
+def store_file(field, path):
+    """Save a local file through a FileField's storage and upload_to"""
+    name = field.generate_filename(None, os.path.basename(path))
+    with open(path, 'rb') as source:
+        return field.storage.save(name, File(source), max_length=field.max_length)
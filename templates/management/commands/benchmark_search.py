@@ -0,0 +1,113 @@
+import random
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from templates.models import Category, Template
+from templates.search import get_search_backend, search_templates
+
+WORDS = [
+    'shop', 'cart', 'payment', 'order', 'support', 'ticket', 'quiz', 'game',
+    'music', 'weather', 'currency', 'schedule', 'task', 'team', 'course',
+    'lesson', 'analytics', 'crm', 'booking', 'delivery', 'notification',
+    'subscription', 'survey', 'poll', 'translate', 'reminder', 'news',
+    'crypto', 'wallet', 'invoice', 'marketing', 'channel', 'moderation',
+]
+QUERIES = ['payment', 'quiz game', 'weather currency', 'subscr', 'crypto wallet invoice']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the indexed catalog search with the icontains scan on a '
+        'synthetic dataset. All rows are rolled back afterwards.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--templates', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=12)
+    
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.populate(options['templates'])
+                self.run(options['repeat'], options['page_size'])
+                raise Rollback
+        except Rollback:
+            pass
+    
+    def populate(self, count):
+        rng = random.Random(42)
+        # Long-tail vocabulary so the topical words stay reasonably selective
+        vocabulary = WORDS + [
+            ''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(4, 9)))
+            for _ in range(20000)
+        ]
+        category, _ = Category.objects.get_or_create(
+            slug='benchmark', defaults={'name': 'Benchmark'}
+        )
+        
+        start = time.perf_counter()
+        batch = []
+        for i in range(count):
+            title_words = rng.sample(WORDS, 3)
+            batch.append(Template(
+                title=' '.join(title_words).title() + f' Bot {i}',
+                slug=f'benchmark-{i}',
+                short_description=' '.join(rng.choices(vocabulary, k=12)),
+                description=' '.join(rng.choices(vocabulary, k=60)),
+                price=Decimal(rng.randint(5, 100)),
+                category=category,
+                file='templates/files/benchmark.zip',
+                features=rng.sample(WORDS, 4),
+            ))
+            if len(batch) == 2000:
+                Template.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Template.objects.bulk_create(batch)
+        
+        get_search_backend().rebuild()
+        self.stdout.write(
+            f'Inserted and indexed {count} templates in {time.perf_counter() - start:.1f}s'
+        )
+    
+    def run(self, repeat, page_size):
+        base = Template.objects.filter(active=True).select_related('category')
+        backend_name = get_search_backend().__class__.__name__
+        
+        for query in QUERIES:
+            def scan():
+                queryset = base.filter(
+                    Q(title__icontains=query) |
+                    Q(description__icontains=query) |
+                    Q(short_description__icontains=query)
+                ).order_by('-created_at')
+                return queryset.count(), list(queryset[:page_size])
+            
+            def indexed():
+                queryset = search_templates(base, query)
+                return queryset.count(), list(queryset[:page_size])
+            
+            scan_time, scan_count = self.time(scan, repeat)
+            index_time, index_count = self.time(indexed, repeat)
+            self.stdout.write(
+                f'{query!r:28} icontains {scan_time * 1000:8.1f}ms ({scan_count} hits)  '
+                f'{backend_name} {index_time * 1000:8.1f}ms ({index_count} hits)  '
+                f'x{scan_time / index_time:.1f}'
+            )
+    
+    @staticmethod
+    def time(func, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            count, _ = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, count
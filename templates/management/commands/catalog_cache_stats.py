@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from templates import cache as catalog_cache
+
+
+class Command(BaseCommand):
+    help = (
+        'Show catalog response cache hit/miss counts. Counters live in the '
+        'catalog cache, so use a shared backend to see totals across processes.'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters')
+        parser.add_argument(
+            '--invalidate',
+            action='store_true',
+            help='Bump the catalog generation, dropping every cached entry'
+        )
+    
+    def handle(self, *args, **options):
+        if options['invalidate']:
+            catalog_cache.bump_generation()
+        
+        stats = catalog_cache.get_stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total * 100 if total else 0
+        self.stdout.write(
+            f"Generation: {stats['generation']}\n"
+            f"Hits: {stats['hits']}\n"
+            f"Misses: {stats['misses']}\n"
+            f"Hit ratio: {ratio:.1f}%"
+        )
+        
+        if options['reset']:
+            catalog_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
@@ -0,0 +1,65 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from templates.cache import bump_generation
+from templates.models import Template, RelatedTemplate
+from templates.similarity import DEFAULT_WEIGHTS, iter_related
+
+
+class Command(BaseCommand):
+    help = 'Precompute the top-N related templates for every active template'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=6, help='Related templates kept per template')
+        parser.add_argument('--batch-size', type=int, default=512)
+        parser.add_argument('--max-terms', type=int, default=2048)
+        for name, weight in DEFAULT_WEIGHTS.items():
+            parser.add_argument(
+                f'--{name}-weight',
+                type=float,
+                default=weight,
+                help=f'Weight of {name} similarity (default {weight})'
+            )
+    
+    def handle(self, *args, **options):
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            raise CommandError('NumPy is required: pip install numpy')
+        
+        start = time.perf_counter()
+        templates = list(
+            Template.objects.filter(active=True).order_by('pk').values(
+                'id', 'category_id', 'title', 'short_description',
+                'description', 'features'
+            )
+        )
+        weights = {name: options[f'{name}_weight'] for name in DEFAULT_WEIGHTS}
+        
+        entries = []
+        for template_id, related in iter_related(
+            templates,
+            top_n=options['top'],
+            weights=weights,
+            max_terms=options['max_terms'],
+            batch_size=options['batch_size']
+        ):
+            entries.extend(
+                RelatedTemplate(
+                    template_id=template_id,
+                    related_id=related_id,
+                    rank=rank,
+                    score=score
+                )
+                for rank, (related_id, score) in enumerate(related)
+            )
+        
+        with transaction.atomic():
+            RelatedTemplate.objects.all().delete()
+            RelatedTemplate.objects.bulk_create(entries, batch_size=1000)
+            transaction.on_commit(bump_generation)
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {len(entries)} related entries for {len(templates)} templates '
+            f'in {time.perf_counter() - start:.1f}s'
+        ))
@@ -0,0 +1,85 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from django.core.management.base import BaseCommand
+from templates.cache import bump_generation
+from templates.models import Template
+from templates.thumbnails import (
+    get_widths, has_current_variants, render_variants, save_variants, store_variants
+)
+
+
+class Command(BaseCommand):
+    help = 'Generate responsive thumbnail variants for existing templates'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes used for resizing (default: CPU count)'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate variants that are already up to date'
+        )
+    
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        workers = max(options['workers'], 1)
+        widths = get_widths()
+        
+        templates = (
+            Template.objects.exclude(thumbnail='').exclude(thumbnail__isnull=True)
+            .only('pk', 'thumbnail', 'thumbnail_variants')
+            .order_by('pk')
+        )
+        pending = [
+            template for template in templates.iterator()
+            if options['force'] or not has_current_variants(template)
+        ]
+        
+        self.processed = self.failed = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Bound the number of source images held in memory at once
+            in_flight = {}
+            for template in pending:
+                if len(in_flight) >= workers * 2:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self.finish(future, in_flight.pop(future))
+                try:
+                    with template.thumbnail.open('rb') as image_file:
+                        data = image_file.read()
+                except OSError as exc:
+                    self.fail(template, exc)
+                    continue
+                in_flight[pool.submit(render_variants, data, widths)] = template
+            
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.finish(future, in_flight.pop(future))
+        
+        if self.processed:
+            bump_generation()
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated variants for {self.processed} templates '
+            f'({self.failed} failed) in {time.perf_counter() - start:.1f}s'
+        ))
+    
+    def finish(self, future, template):
+        try:
+            rendered = future.result()
+        except Exception as exc:
+            self.fail(template, exc)
+            return
+        variants = store_variants(template.thumbnail.name, rendered)
+        if save_variants(template.pk, variants):
+            self.processed += 1
+    
+    def fail(self, template, exc):
+        self.failed += 1
+        self.stderr.write(f'Template {template.pk} ({template.thumbnail.name}): {exc}')
@@ -0,0 +1,166 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from core.models import SiteStatistics
+from templates.cache import bump_generation
+from templates.importer import (
+    ImportRowError, build_template, find_manifest, inspect_archive, read_manifest, store_file
+)
+from templates.models import Category, Template
+from templates.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Import templates from a manifest (JSON, JSON Lines or CSV) of ZIP archives'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'source',
+            help='Manifest file, or a directory containing manifest.json/.jsonl/.csv'
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Worker processes used for hashing and validating archives (default: CPU count)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate the manifest and archives without storing anything'
+        )
+    
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            manifest = find_manifest(options['source'])
+        except FileNotFoundError as exc:
+            raise CommandError(str(exc))
+        if not os.path.isfile(manifest):
+            raise CommandError(f'Manifest {manifest} does not exist')
+        
+        self.dry_run = options['dry_run']
+        self.workers = max(options['workers'], 1)
+        self.base_dir = os.path.dirname(os.path.abspath(manifest))
+        self.categories = {category.slug: category for category in Category.objects.all()}
+        self.file_field = Template._meta.get_field('file')
+        self.thumbnail_field = Template._meta.get_field('thumbnail')
+        # Storage names of archives stored by this run, by checksum, so
+        # identical archives are stored once
+        self.stored = {}
+        self.imported = self.skipped = self.failed = 0
+        
+        batch_size = max(options['batch_size'], 1)
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            batch = []
+            try:
+                for line, row in read_manifest(manifest):
+                    batch.append((line, row))
+                    if len(batch) >= batch_size:
+                        self.import_batch(batch, pool)
+                        batch = []
+            except json.JSONDecodeError as exc:
+                # Malformed JSON; rows read so far are still imported
+                self.stderr.write(f'{manifest}: {exc}')
+                self.failed += 1
+            if batch:
+                self.import_batch(batch, pool)
+        
+        if self.imported and not self.dry_run:
+            # bulk_create bypasses the post_save receivers
+            with transaction.atomic():
+                get_search_backend().rebuild()
+            bump_generation()
+        
+        action = 'Validated' if self.dry_run else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {self.imported} templates, skipped {self.skipped} existing, '
+            f'{self.failed} failed in {time.perf_counter() - start:.1f}s'
+        ))
+        if self.imported and not self.dry_run:
+            self.stdout.write(
+                'Run generate_thumbnail_variants and compute_related_templates '
+                'to finish preparing the new templates'
+            )
+    
+    def import_batch(self, batch, pool):
+        built = []
+        for line, row in batch:
+            try:
+                built.append((line, row) + build_template(row, self.categories, self.base_dir))
+            except ImportRowError as exc:
+                self.fail(line, exc)
+        
+        # Slugs present in the database were imported by an earlier run
+        existing = set(
+            Template.objects.filter(slug__in=[item[2].slug for item in built])
+            .values_list('slug', flat=True)
+        )
+        pending = []
+        for item in built:
+            if item[2].slug in existing:
+                self.skipped += 1
+                continue
+            existing.add(item[2].slug)
+            pending.append(item)
+        if not pending:
+            return
+        
+        archives = [item[3] for item in pending]
+        chunksize = max(1, len(archives) // (self.workers * 4))
+        valid = []
+        for (line, row, template, archive, thumbnail), (digest, error) in zip(
+            pending, pool.map(inspect_archive, archives, chunksize=chunksize)
+        ):
+            expected = (row.get('sha256') or '').strip().lower()
+            if error is None and expected and expected != digest:
+                error = f'checksum mismatch (got {digest})'
+            if error is None and thumbnail and not os.path.isfile(thumbnail):
+                error = f'thumbnail {thumbnail} does not exist'
+            if error is not None:
+                self.fail(line, f'{archive}: {error}')
+                continue
+            valid.append((template, archive, thumbnail, digest))
+        
+        if not self.dry_run and valid:
+            self.save_batch(valid)
+        self.imported += len(valid)
+        self.stdout.write(
+            f'{self.imported} imported, {self.skipped} skipped, {self.failed} failed'
+        )
+    
+    def save_batch(self, valid):
+        new_names = []
+        new_digests = []
+        try:
+            for template, archive, thumbnail, digest in valid:
+                if digest not in self.stored:
+                    self.stored[digest] = store_file(self.file_field, archive)
+                    new_names.append((self.file_field.storage, self.stored[digest]))
+                    new_digests.append(digest)
+                template.file = self.stored[digest]
+                if thumbnail:
+                    template.thumbnail = store_file(self.thumbnail_field, thumbnail)
+                    new_names.append((self.thumbnail_field.storage, template.thumbnail.name))
+            
+            with transaction.atomic():
+                Template.objects.bulk_create([item[0] for item in valid], batch_size=len(valid))
+                # bulk_create skips the signal that keeps this total
+                SiteStatistics.adjust(
+                    total_templates=sum(1 for item in valid if item[0].active)
+                )
+        except Exception:
+            # Leave no files behind for rows that were not inserted
+            for storage, name in new_names:
+                storage.delete(name)
+            for digest in new_digests:
+                self.stored.pop(digest, None)
+            raise
+    
+    def fail(self, line, error):
+        self.failed += 1
+        self.stderr.write(f'Row {line}: {error}')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from templates.models import Template
+
+
+class Command(BaseCommand):
+    help = 'Recompute stored rating sum/count/average for every template'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of templates aggregated and written per batch'
+        )
+    
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = Template.rebuild_rating_aggregates(
+                batch_size=options['batch_size']
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt rating aggregates for {updated} templates'
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from templates.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the catalog full-text search index from the templates table'
+    
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        with transaction.atomic():
+            backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt search index with {backend.__class__.__name__}'
+        ))
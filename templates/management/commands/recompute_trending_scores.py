@@ -0,0 +1,59 @@
+from collections import defaultdict
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from templates.cache import bump_generation
+from templates.models import Template, TemplateEvent
+from templates.trending import add_scores, event_score, get_half_life
+
+
+class Command(BaseCommand):
+    help = 'Rebuild trending scores from the template event log'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window',
+            type=int,
+            default=20,
+            help='Only replay events from the last N half-lives (default 20)'
+        )
+        parser.add_argument(
+            '--prune',
+            action='store_true',
+            help='Delete events older than the window afterwards'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+    
+    def handle(self, *args, **options):
+        half_life = get_half_life()
+        cutoff = timezone.now() - half_life * options['window']
+        
+        scores = defaultdict(float)
+        events = (
+            TemplateEvent.objects.filter(created_at__gte=cutoff)
+            .order_by()
+            .values_list('template_id', 'kind', 'created_at')
+        )
+        replayed = 0
+        for template_id, kind, created_at in events.iterator(chunk_size=5000):
+            scores[template_id] = add_scores(
+                scores[template_id], event_score(kind, created_at, half_life)
+            )
+            replayed += 1
+        
+        with transaction.atomic():
+            Template.objects.exclude(trending_score=0).update(trending_score=0)
+            Template.objects.bulk_update(
+                [Template(pk=pk, trending_score=score) for pk, score in scores.items()],
+                ['trending_score'],
+                batch_size=options['batch_size']
+            )
+            pruned = 0
+            if options['prune']:
+                pruned, _ = TemplateEvent.objects.filter(created_at__lt=cutoff).delete()
+            transaction.on_commit(bump_generation)
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'Replayed {replayed} events into {len(scores)} trending scores '
+            f'(half-life {half_life}, pruned {pruned})'
+        ))
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:27
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Template = apps.get_model('templates', 'Template')
+    Review = apps.get_model('templates', 'Review')
+    
+    rows = Review.objects.values('template_id').annotate(
+        total=Sum('rating'), count=Count('id')
+    ).order_by()
+    for row in rows:
+        Template.objects.filter(pk=row['template_id']).update(
+            rating_sum=row['total'],
+            review_count=row['count'],
+            average_rating=row['total'] / row['count']
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('templates', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='template',
+            name='average_rating',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='template',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='template',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS templates_template_fts USING fts5("
+    "title, short_description, description, "
+    "tokenize = 'unicode61 remove_diacritics 2')",
+    "INSERT INTO templates_template_fts (rowid, title, short_description, description) "
+    "SELECT id, title, short_description, description FROM templates_template",
+]
+SQLITE_BACKWARD = [
+    "DROP TABLE IF EXISTS templates_template_fts",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE INDEX IF NOT EXISTS templates_template_search_gin ON templates_template "
+    "USING GIN (("
+    "setweight(to_tsvector('english'::regconfig, COALESCE((title)::text, '')), 'A') || "
+    "setweight(to_tsvector('english'::regconfig, COALESCE((short_description)::text, '')), 'B') || "
+    "setweight(to_tsvector('english'::regconfig, COALESCE((description)::text, '')), 'C')"
+    "))",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS templates_template_search_gin",
+]
+
+
+def run_statements(statements):
+    def run(apps, schema_editor):
+        vendor_statements = statements.get(schema_editor.connection.vendor, [])
+        for statement in vendor_statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('templates', '0003_template_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_statements({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run_statements({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('templates', '0004_template_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='template',
+            index=models.Index(fields=['created_at', 'id'], name='templates_t_created_7d2c2a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='template',
+            index=models.Index(fields=['price', 'id'], name='templates_t_price_5d04ba_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='template',
+            index=models.Index(fields=['title', 'id'], name='templates_t_title_040732_idx'),
+        ),
+    ]
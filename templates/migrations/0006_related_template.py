@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('templates', '0005_template_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='templates.template')),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_entries', to='templates.template')),
+            ],
+            options={
+                'ordering': ['template', 'rank'],
+                'unique_together': {('template', 'rank')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('templates', '0006_related_template'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='template',
+            name='trending_score',
+            field=models.FloatField(db_index=True, default=0),
+        ),
+        migrations.CreateModel(
+            name='TemplateEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('download', 'Download'), ('purchase', 'Purchase')], max_length=20)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='templates.template')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
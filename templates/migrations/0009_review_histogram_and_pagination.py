@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:46
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_rating_histogram(apps, schema_editor):
+    Template = apps.get_model('templates', 'Template')
+    Review = apps.get_model('templates', 'Review')
+    
+    rows = Review.objects.values('template_id', 'rating').annotate(count=Count('id')).order_by()
+    for row in rows:
+        Template.objects.filter(pk=row['template_id']).update(
+            **{f"rating_{row['rating']}_count": row['count']}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('templates', '0008_template_thumbnail_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='template',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='template',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='template',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='template',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='template',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['template', 'created_at', 'id'], name='templates_r_templat_fc374f_idx'),
+        ),
+        migrations.RunPython(backfill_rating_histogram, migrations.RunPython.noop),
+    ]
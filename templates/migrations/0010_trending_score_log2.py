@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:31
+
+import math
+from django.db import migrations
+
+
+def scores_to_log2(apps, schema_editor):
+    # Scores were stored as sum(w * 2 ** ((t - ORIGIN) / half_life)); store
+    # their base-2 logarithm instead (see templates.trending)
+    Template = apps.get_model('templates', 'Template')
+    
+    templates = list(Template.objects.filter(trending_score__gt=0).only('pk', 'trending_score'))
+    for template in templates:
+        template.trending_score = math.log2(template.trending_score)
+    Template.objects.bulk_update(templates, ['trending_score'], batch_size=1000)
+
+
+def scores_from_log2(apps, schema_editor):
+    Template = apps.get_model('templates', 'Template')
+    
+    templates = list(Template.objects.exclude(trending_score=0).only('pk', 'trending_score'))
+    for template in templates:
+        template.trending_score = 2 ** min(template.trending_score, 1000)
+    Template.objects.bulk_update(templates, ['trending_score'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('templates', '0009_review_histogram_and_pagination'),
+    ]
+
+    operations = [
+        migrations.RunPython(scores_to_log2, scores_from_log2),
+    ]
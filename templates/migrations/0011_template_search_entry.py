@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('templates', '0010_trending_score_log2'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TemplateSearchEntry',
+            fields=[
+                ('template', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='templates.template')),
+                ('document', models.TextField(db_column='templates_template_fts')),
+                ('title', models.TextField()),
+                ('short_description', models.TextField()),
+                ('description', models.TextField()),
+            ],
+            options={
+                'db_table': 'templates_template_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -1,12 +1,19 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db.models import F, Q, Case, When, Value, Sum, Count
+from django.db.models.functions import Cast
 import uuid
 import os
 
 User = get_user_model()
 
+RATING_VALUES = (1, 2, 3, 4, 5)
+RATING_COUNT_FIELDS = [f'rating_{rating}_count' for rating in RATING_VALUES]
+
 
 def template_upload_path(instance, filename):
     """Generate upload path for template files"""
@@ -74,6 +81,8 @@ class Template(models.Model):
         null=True,
         help_text="Thumbnail image for the template"
     )
+    # Resized WebP/JPEG copies of the thumbnail, maintained by templates.thumbnails
+    thumbnail_variants = models.JSONField(default=dict, blank=True, editable=False)
     features = models.JSONField(
         default=list,
         help_text="List of template features"
@@ -92,8 +101,28 @@ class Template(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     download_count = models.PositiveIntegerField(default=0)
     
+    # Denormalized review aggregates, maintained by templates.signals
+    rating_sum = models.PositiveIntegerField(default=0)
+    review_count = models.PositiveIntegerField(default=0)
+    average_rating = models.FloatField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    
+    # log2 of the time-decayed download/purchase score, maintained by
+    # templates.trending
+    trending_score = models.FloatField(default=0, db_index=True)
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination keys for the catalog sorts
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['price', 'id']),
+            models.Index(fields=['title', 'id']),
+        ]
     
     def __str__(self):
         return self.title
@@ -101,18 +130,133 @@ class Template(models.Model):
     def get_absolute_url(self):
         return reverse('templates:detail', kwargs={'slug': self.slug})
     
-    @property
-    def average_rating(self):
-        """Calculate average rating from reviews"""
-        reviews = self.reviews.all()
-        if reviews:
-            return sum(review.rating for review in reviews) / len(reviews)
-        return 0
+    @cached_property
+    def thumbnail_srcset(self):
+        """srcset strings for the thumbnail variants, keyed by format"""
+        from .thumbnails import build_srcsets
+        return build_srcsets(self)
+    
+    @cached_property
+    def thumbnail_src(self):
+        """Fallback `<img src>` for the thumbnail"""
+        from .thumbnails import get_fallback_url
+        return get_fallback_url(self)
+    
+    def get_related_templates(self, limit=3):
+        """
+        Return related templates from the precomputed index, falling back to
+        the newest templates in the same category if none are stored yet
+        """
+        entries = (
+            RelatedTemplate.objects
+            .filter(template=self, related__active=True)
+            .select_related('related__category')
+            .order_by('rank')[:limit]
+        )
+        related = [entry.related for entry in entries]
+        if related:
+            return related
+        return list(
+            Template.objects.filter(category_id=self.category_id, active=True)
+            .select_related('category')
+            .exclude(id=self.id)[:limit]
+        )
     
     @property
-    def review_count(self):
-        """Get total number of reviews"""
-        return self.reviews.count()
+    def rating_histogram(self):
+        """Review counts per star rating, highest rating first"""
+        histogram = []
+        for rating in reversed(RATING_VALUES):
+            count = getattr(self, f'rating_{rating}_count')
+            histogram.append({
+                'rating': rating,
+                'count': count,
+                'percent': round(100 * count / self.review_count) if self.review_count else 0,
+            })
+        return histogram
+    
+    @classmethod
+    def apply_rating_change(cls, template_id, added=None, removed=None):
+        """
+        Add and/or remove one rating from the stored aggregates of a template
+        in a single UPDATE
+        """
+        if added == removed:
+            return 0
+        
+        rating_delta = (added or 0) - (removed or 0)
+        count_delta = (added is not None) - (removed is not None)
+        new_sum = F('rating_sum') + rating_delta
+        new_count = F('review_count') + count_delta
+        
+        updates = {}
+        for rating, delta in ((added, 1), (removed, -1)):
+            if rating is not None:
+                field = f'rating_{rating}_count'
+                updates[field] = F(field) + delta
+        
+        return cls.objects.filter(pk=template_id).update(
+            rating_sum=new_sum,
+            review_count=new_count,
+            average_rating=Case(
+                When(
+                    review_count__gt=-count_delta,
+                    then=Cast(new_sum, models.FloatField()) / new_count
+                ),
+                default=Value(0.0),
+                output_field=models.FloatField()
+            ),
+            **updates
+        )
+    
+    @classmethod
+    def rebuild_rating_aggregates(cls, queryset=None, batch_size=500):
+        """
+        Recompute rating aggregates from the reviews table in one grouped
+        query per batch. Returns the number of templates written.
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+        
+        updated = 0
+        template_ids = list(queryset.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(template_ids), batch_size):
+            batch_ids = template_ids[start:start + batch_size]
+            totals = {
+                row['template_id']: row
+                for row in Review.objects.filter(template_id__in=batch_ids)
+                .values('template_id')
+                .annotate(
+                    total=Sum('rating'),
+                    count=Count('id'),
+                    **{
+                        f'rating_{rating}_count': Count('id', filter=Q(rating=rating))
+                        for rating in RATING_VALUES
+                    }
+                )
+                .order_by()
+            }
+            
+            templates = []
+            for pk in batch_ids:
+                row = totals.get(pk)
+                total = row['total'] if row else 0
+                count = row['count'] if row else 0
+                templates.append(cls(
+                    pk=pk,
+                    rating_sum=total,
+                    review_count=count,
+                    average_rating=total / count if count else 0,
+                    **{field: row[field] if row else 0 for field in RATING_COUNT_FIELDS}
+                ))
+            
+            cls.objects.bulk_update(
+                templates,
+                ['rating_sum', 'review_count', 'average_rating', *RATING_COUNT_FIELDS]
+            )
+            updated += len(templates)
+        
+        return updated
 
 
 class Review(models.Model):
@@ -138,6 +282,89 @@ class Review(models.Model):
     class Meta:
         unique_together = ['user', 'template']
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of a template's reviews
+            models.Index(fields=['template', 'created_at', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.template.title} ({self.rating}/5)"
+
+
+class TemplateEvent(models.Model):
+    """
+    Download and purchase events feeding the trending score
+    """
+    DOWNLOAD = 'download'
+    PURCHASE = 'purchase'
+    KIND_CHOICES = [
+        (DOWNLOAD, 'Download'),
+        (PURCHASE, 'Purchase'),
+    ]
+    
+    template = models.ForeignKey(
+        Template,
+        on_delete=models.CASCADE,
+        related_name='events'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.template_id} {self.kind} at {self.created_at:%Y-%m-%d %H:%M}"
+
+
+class RelatedTemplate(models.Model):
+    """
+    Precomputed "related templates" entry, rebuilt offline by the
+    compute_related_templates command
+    """
+    template = models.ForeignKey(
+        Template,
+        on_delete=models.CASCADE,
+        related_name='related_entries'
+    )
+    related = models.ForeignKey(
+        Template,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    
+    class Meta:
+        ordering = ['template', 'rank']
+        unique_together = ['template', 'rank']
+    
+    def __str__(self):
+        return f"{self.template_id} -> {self.related_id} ({self.score:.3f})"
+
+
+class TemplateSearchEntry(models.Model):
+    """
+    Row of the SQLite FTS5 search index, kept in sync by the search signals.
+    
+    The virtual table is created by a migration; this model only lets the
+    ORM join it to templates.
+    """
+    template = models.OneToOneField(
+        Template,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search_entry'
+    )
+    # FTS5 hidden column named after the table: comparing it with a query
+    # runs a MATCH, and bm25() takes it as its first argument
+    document = models.TextField(db_column='templates_template_fts')
+    title = models.TextField()
+    short_description = models.TextField()
+    description = models.TextField()
+    
+    class Meta:
+        managed = False
+        db_table = 'templates_template_fts'
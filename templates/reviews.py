@@ -0,0 +1,73 @@
+"""
+Paginated review listings.
+
+Reviews are paged by keyset on `(created_at, id)` within a template. The
+newest page is what almost every visitor sees, so it is cached per
+template and dropped whenever one of that template's reviews changes.
+"""
+from django.conf import settings
+from core.pagination import KeysetPage, KeysetPagination, KeysetPaginator
+from .cache import get_cache, get_timeout
+from .models import Review
+
+REVIEW_ORDERING = '-created_at'
+
+
+def get_page_size():
+    return getattr(settings, 'REVIEWS_PAGE_SIZE', 10)
+
+
+def get_review_queryset(template_id):
+    """Reviews of one template with just the columns listings show"""
+    return (
+        Review.objects.filter(template_id=template_id)
+        .select_related('user')
+        .only(
+            'id', 'template_id', 'rating', 'comment', 'created_at',
+            'user__username', 'user__email'
+        )
+        .order_by(REVIEW_ORDERING)
+    )
+
+
+def first_page_key(template_id):
+    return f'reviews:first:{template_id}'
+
+
+def get_first_review_page(template_id):
+    """Return the newest reviews of a template as a KeysetPage"""
+    cache = get_cache()
+    key = first_page_key(template_id)
+    cached = cache.get(key)
+    if cached is None:
+        page = KeysetPaginator(
+            get_review_queryset(template_id), get_page_size(), REVIEW_ORDERING
+        ).page()
+        cached = (page.object_list, page.next_cursor)
+        cache.set(key, cached, get_timeout())
+    reviews, next_cursor = cached
+    return KeysetPage(reviews, next_cursor, None)
+
+
+def invalidate_first_review_page(*template_ids):
+    get_cache().delete_many([first_page_key(template_id) for template_id in template_ids])
+
+
+class ReviewPagination(KeysetPagination):
+    """
+    Cursor pagination for review listings; the first page is served from
+    the per-template cache
+    """
+    keyset_orderings = (REVIEW_ORDERING,)
+    
+    def get_page_size(self, request):
+        return get_page_size()
+    
+    def paginate_reviews(self, template_id, request, view=None):
+        if (self.cursor_query_param in request.query_params or
+                self.page_query_param in request.query_params):
+            return self.paginate_queryset(get_review_queryset(template_id), request, view)
+        
+        self.request = request
+        self.keyset_page = get_first_review_page(template_id)
+        return list(self.keyset_page)
@@ -0,0 +1,175 @@
+"""
+Full-text search backends for the template catalog
+"""
+import re
+from abc import ABC, abstractmethod
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, FloatField, Func, Q, Value
+from django.utils.module_loading import import_string
+
+# Fields that feed the search index, in order of relevance weight
+INDEXED_FIELDS = ('title', 'short_description', 'description')
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class BaseSearchBackend(ABC):
+    """
+    Interface for catalog search backends.
+
+    `search` must return the queryset narrowed to matching templates with a
+    `search_rank` annotation, where a lower value means a better match.
+    """
+
+    @abstractmethod
+    def search(self, queryset, query):
+        """Narrow `queryset` to templates matching `query`, annotated with `search_rank`"""
+
+    def index(self, template):
+        """Add or refresh one template in the index"""
+
+    def remove(self, template_id):
+        """Drop one template from the index"""
+
+    def rebuild(self):
+        """Rebuild the whole index from the templates table"""
+
+
+class IContainsSearchBackend(BaseSearchBackend):
+    """
+    Unindexed fallback that scans the table with icontains lookups
+    """
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(short_description__icontains=query)
+        ).annotate(search_rank=Value(0.0))
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """
+    SQLite FTS5 backend using a standalone virtual table keyed by template id
+    """
+    table = 'templates_template_fts'
+    # bm25 column weights for title, short_description and description
+    weights = (10.0, 4.0, 1.0)
+
+    @staticmethod
+    def build_match(query):
+        """Turn free text into an FTS5 expression of quoted prefix terms"""
+        tokens = TOKEN_RE.findall(query)
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    def search(self, queryset, query):
+        match = self.build_match(query)
+        if not match:
+            return IContainsSearchBackend().search(queryset, query)
+
+        # Join the index once: the MATCH on its hidden column drives the
+        # query and bm25() ranks the same rows
+        rank = Func(
+            F('search_entry__document'),
+            *[Value(weight) for weight in self.weights],
+            function='bm25',
+            output_field=FloatField()
+        )
+        return queryset.filter(search_entry__document=match).annotate(search_rank=rank)
+
+    def index(self, template):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [template.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, {", ".join(INDEXED_FIELDS)}) '
+                f'VALUES (%s, %s, %s, %s)',
+                [template.pk] + [getattr(template, field) or '' for field in INDEXED_FIELDS]
+            )
+
+    def remove(self, template_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [template_id])
+
+    def rebuild(self):
+        columns = ', '.join(INDEXED_FIELDS)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, {columns}) '
+                f'SELECT id, {columns} FROM templates_template'
+            )
+            cursor.execute(f"INSERT INTO {self.table} ({self.table}) VALUES ('optimize')")
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    PostgreSQL backend ranking a weighted tsvector over the indexed fields.
+
+    The vector is computed from the row itself and backed by the GIN
+    expression index created in the search migration, so there is nothing
+    to maintain on save.
+    """
+    config = 'english'
+
+    def get_vector(self):
+        from django.contrib.postgres.search import SearchVector
+        return (
+            SearchVector('title', weight='A', config=self.config) +
+            SearchVector('short_description', weight='B', config=self.config) +
+            SearchVector('description', weight='C', config=self.config)
+        )
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+        from django.db.models import F
+
+        search_query = SearchQuery(query, search_type='websearch', config=self.config)
+        vector = self.get_vector()
+        return queryset.annotate(
+            search_vector=vector,
+            search_rank=-SearchRank(F('search_vector'), search_query),
+        ).filter(search_vector=search_query)
+
+
+def get_search_backend():
+    """
+    Return the configured search backend, defaulting by database vendor
+    """
+    backend_path = getattr(settings, 'TEMPLATE_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    if connection.vendor == 'sqlite':
+        return SQLiteFTSBackend()
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    return IContainsSearchBackend()
+
+
+def search_templates(queryset, query, order_by_rank=True):
+    """
+    Filter a template queryset by a free-text query, best matches first
+    """
+    queryset = get_search_backend().search(queryset, query)
+    if order_by_rank:
+        queryset = queryset.order_by('search_rank', '-created_at')
+    return queryset
+
+
+class TemplateSearchFilter:
+    """
+    DRF filter backend for `?search=` on the templates API.
+
+    Results are ordered by relevance unless the client asked for an
+    explicit `?ordering=`.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        from rest_framework.settings import api_settings
+
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        explicit_ordering = api_settings.ORDERING_PARAM in request.query_params
+        return search_templates(queryset, query, order_by_rank=not explicit_ordering)
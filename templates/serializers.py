@@ -1,29 +1,55 @@
 from rest_framework import serializers
-from .models import Template, Category, Review
+from core.fieldsets import DynamicFieldsMixin
+from .models import RATING_COUNT_FIELDS, Template, Category, Review
+from .thumbnails import build_srcsets
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name', 'slug', 'description', 'icon']
 
 
-class TemplateSerializer(serializers.ModelSerializer):
+class ThumbnailSrcsetMixin(serializers.Serializer):
+    """Expose the responsive thumbnail variants as absolute srcset strings"""
+    thumbnail_srcset = serializers.SerializerMethodField()
+    
+    def get_thumbnail_srcset(self, obj):
+        request = self.context.get('request')
+        return build_srcsets(obj, request.build_absolute_uri if request else None)
+
+
+class OwnedMixin(serializers.Serializer):
+    """Flag templates the requesting user has bought"""
+    owned = serializers.SerializerMethodField()
+    
+    def get_owned(self, obj):
+        from orders.ownership import user_owns_template
+        request = self.context.get('request')
+        return user_owns_template(request, obj.pk) if request else False
+
+
+class TemplateSerializer(DynamicFieldsMixin, ThumbnailSrcsetMixin, OwnedMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
-    average_rating = serializers.ReadOnlyField()
-    review_count = serializers.ReadOnlyField()
+    rating_histogram = serializers.ReadOnlyField()
     
     class Meta:
         model = Template
         fields = [
             'id', 'title', 'slug', 'description', 'short_description', 
-            'price', 'category', 'thumbnail', 'features', 'demo_available',
-            'active', 'created_at', 'updated_at', 'download_count',
-            'average_rating', 'review_count'
+            'price', 'category', 'thumbnail', 'thumbnail_srcset', 'features',
+            'demo_available', 'active', 'created_at', 'updated_at', 'download_count',
+            'average_rating', 'review_count', 'rating_histogram', 'owned'
         ]
+        read_only_fields = ['average_rating', 'review_count']
+        field_dependencies = {
+            'thumbnail_srcset': ['thumbnail', 'thumbnail_variants'],
+            'rating_histogram': ['review_count', *RATING_COUNT_FIELDS],
+            'owned': ['id'],
+        }
 
 
-class TemplateListSerializer(serializers.ModelSerializer):
+class TemplateListSerializer(DynamicFieldsMixin, ThumbnailSrcsetMixin, OwnedMixin, serializers.ModelSerializer):
     """Simplified serializer for template lists"""
     category = CategorySerializer(read_only=True)
     
@@ -31,8 +57,13 @@ class TemplateListSerializer(serializers.ModelSerializer):
         model = Template
         fields = [
             'id', 'title', 'slug', 'short_description', 'price', 
-            'category', 'thumbnail', 'demo_available', 'download_count'
+            'category', 'thumbnail', 'thumbnail_srcset', 'demo_available',
+            'download_count', 'owned'
         ]
+        field_dependencies = {
+            'thumbnail_srcset': ['thumbnail', 'thumbnail_variants'],
+            'owned': ['id'],
+        }
 
 
 class ReviewSerializer(serializers.ModelSerializer):
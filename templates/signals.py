@@ -0,0 +1,106 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from .models import Template, Category, Review
+from .cache import bump_generation
+from .reviews import invalidate_first_review_page
+from .search import INDEXED_FIELDS, get_search_backend
+from .thumbnails import has_current_variants, schedule_variants
+
+
+@receiver(post_init, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    """Keep the persisted rating so updates can apply a delta"""
+    loaded = instance.__dict__ if instance.pk else {}
+    instance._stored_rating = loaded.get('rating')
+    instance._stored_template_id = loaded.get('template_id')
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_review_page(sender, instance, raw=False, **kwargs):
+    """Drop the cached first review page of the affected templates"""
+    if raw:
+        return
+    # Runs before the rating receivers reset the stored template id
+    template_ids = {instance.template_id, instance._stored_template_id} - {None}
+    transaction.on_commit(lambda: invalidate_first_review_page(*template_ids))
+
+
+@receiver(post_save, sender=Review)
+def update_rating_on_save(sender, instance, created, raw=False, **kwargs):
+    """Apply a review create/update to the template rating aggregates"""
+    if raw:
+        return
+    
+    if created:
+        Template.apply_rating_change(instance.template_id, added=instance.rating)
+    elif instance._stored_rating is None or instance._stored_template_id is None:
+        # Loaded with deferred fields, so the previous rating is unknown
+        Template.rebuild_rating_aggregates(
+            Template.objects.filter(pk=instance.template_id)
+        )
+    elif instance._stored_template_id != instance.template_id:
+        Template.apply_rating_change(instance._stored_template_id, removed=instance._stored_rating)
+        Template.apply_rating_change(instance.template_id, added=instance.rating)
+    elif instance._stored_rating != instance.rating:
+        Template.apply_rating_change(
+            instance.template_id, added=instance.rating, removed=instance._stored_rating
+        )
+    
+    instance._stored_rating = instance.rating
+    instance._stored_template_id = instance.template_id
+
+
+@receiver(post_delete, sender=Review)
+def update_rating_on_delete(sender, instance, **kwargs):
+    """Remove a deleted review from the template rating aggregates"""
+    if instance._stored_rating is None or instance._stored_template_id is None:
+        Template.rebuild_rating_aggregates(
+            Template.objects.filter(pk=instance.template_id)
+        )
+        return
+    Template.apply_rating_change(instance._stored_template_id, removed=instance._stored_rating)
+
+
+@receiver(post_save, sender=Template)
+def update_search_index_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Refresh the search index entry when indexed text changes"""
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(INDEXED_FIELDS):
+        return
+    get_search_backend().index(instance)
+
+
+@receiver(post_delete, sender=Template)
+def update_search_index_on_delete(sender, instance, **kwargs):
+    """Drop deleted templates from the search index"""
+    get_search_backend().remove(instance.pk)
+
+
+@receiver(post_save, sender=Template)
+def schedule_thumbnail_variants(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Regenerate thumbnail variants when the thumbnail changes"""
+    if raw:
+        return
+    if update_fields is not None and 'thumbnail' not in update_fields:
+        return
+    if has_current_variants(instance):
+        return
+    if not instance.thumbnail and not instance.thumbnail_variants:
+        return
+    schedule_variants(instance.pk)
+
+
+@receiver(post_save, sender=Template)
+@receiver(post_delete, sender=Template)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_catalog_cache(sender, raw=False, **kwargs):
+    """Bump the catalog generation once the change is committed"""
+    if raw:
+        return
+    transaction.on_commit(bump_generation)
@@ -0,0 +1,189 @@
+"""
+Offline similarity scoring for the "related templates" index.
+
+Each template is scored against every other one as a weighted sum of
+TF-IDF cosine similarity over its text, Jaccard overlap of its features
+and a same-category bonus. The term and feature matrices are kept in
+sparse (CSR) form, with vocabularies capped at `max_terms` and
+`max_features`, and only densified `batch_size` rows at a time, into
+reused buffers. Scores are computed with NumPy one row block at a time,
+so beyond the sparse matrices memory stays bounded by
+`batch_size x number of templates`.
+"""
+import re
+from collections import Counter
+
+TOKEN_RE = re.compile(r'[^\W\d_]{3,}', re.UNICODE)
+
+STOPWORDS = frozenset("""
+    and the for with your you are from that this into bot bots can all
+    its has have not but our more most any each also than then them they
+    will who how what when which while use using used
+""".split())
+
+DEFAULT_WEIGHTS = {'text': 0.5, 'features': 0.35, 'category': 0.15}
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+def _vocabulary(documents, max_terms):
+    document_frequency = Counter()
+    for terms in documents:
+        document_frequency.update(set(terms))
+    ranked = document_frequency.most_common(max_terms)
+    vocabulary = {term: index for index, (term, _) in enumerate(ranked)}
+    frequencies = [count for _, count in ranked]
+    return vocabulary, frequencies
+
+
+def _sparse_rows(rows, width, np):
+    """
+    Pack `rows`, a list of `{column: value}` dicts, into CSR arrays
+    `(indptr, indices, values, width)`
+    """
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(row) for row in rows])
+    indices = np.fromiter(
+        (column for row in rows for column in row), dtype=np.int64, count=indptr[-1]
+    )
+    values = np.fromiter(
+        (value for row in rows for value in row.values()), dtype=np.float32, count=indptr[-1]
+    )
+    return indptr, indices, values, width
+
+
+def _scatter_rows(buffer, matrix, start, stop, np):
+    """
+    Write rows `start:stop` of a CSR matrix from `_sparse_rows` into the
+    zeroed `buffer` and return the positions written, so the caller can
+    clear exactly those again
+    """
+    indptr, indices, values, _ = matrix
+    first, last = indptr[start], indptr[stop]
+    positions = (
+        np.repeat(np.arange(stop - start), np.diff(indptr[start:stop + 1])),
+        indices[first:last]
+    )
+    buffer[positions] = values[first:last]
+    return positions
+
+
+def _dense_rows(matrix, start, stop, np):
+    """Rows `start:stop` of a CSR matrix from `_sparse_rows`, as a dense array"""
+    block = np.zeros((stop - start, matrix[3]), dtype=np.float32)
+    _scatter_rows(block, matrix, start, stop, np)
+    return block
+
+
+def text_matrix(documents, max_terms, np):
+    """L2-normalised TF-IDF matrix (templates x terms), in CSR form"""
+    vocabulary, frequencies = _vocabulary(documents, max_terms)
+    indptr, indices, values, width = _sparse_rows([
+        Counter(vocabulary[term] for term in terms if term in vocabulary)
+        for terms in documents
+    ], len(vocabulary), np)
+    
+    idf = np.log((1 + len(documents)) / (1 + np.asarray(frequencies, dtype=np.float32))) + 1
+    values = np.log1p(values) * idf[indices].astype(np.float32)
+    row_ids = np.repeat(np.arange(len(documents)), np.diff(indptr))
+    norms = np.zeros(len(documents), dtype=np.float32)
+    np.add.at(norms, row_ids, values ** 2)
+    norms = np.sqrt(norms)
+    norms[norms == 0] = 1
+    return indptr, indices, values / norms[row_ids], width
+
+
+def feature_matrix(feature_lists, max_features, np):
+    """
+    Binary matrix (templates x features), in CSR form, and per-template
+    feature counts
+    """
+    normalized = [
+        {str(feature).strip().lower() for feature in features if str(feature).strip()}
+        if isinstance(features, list) else set()
+        for features in feature_lists
+    ]
+    vocabulary, _ = _vocabulary(normalized, max_features)
+    matrix = _sparse_rows([
+        {vocabulary[feature]: 1 for feature in features if feature in vocabulary}
+        for features in normalized
+    ], len(vocabulary), np)
+    return matrix, np.diff(matrix[0]).astype(np.float32)
+
+
+def iter_related(templates, top_n=6, weights=None, max_terms=2048,
+                 max_features=1024, batch_size=512):
+    """
+    Yield `(template_id, [(related_id, score), ...])` for every template,
+    best match first.
+    
+    `templates` is a sequence of dicts with id, category_id, title,
+    short_description, description and features.
+    """
+    import numpy as np
+    
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+    count = len(templates)
+    if count < 2:
+        return
+    
+    ids = np.asarray([template['id'] for template in templates])
+    categories = np.asarray([template['category_id'] for template in templates])
+    texts = text_matrix([
+        tokenize(template['title']) * 2 +
+        tokenize(template['short_description']) +
+        tokenize(template['description'])
+        for template in templates
+    ], max_terms, np)
+    features, feature_counts = feature_matrix(
+        [template['features'] for template in templates], max_features, np
+    )
+    
+    top_n = min(top_n, count - 1)
+    text_buffer = np.zeros((min(batch_size, count), texts[3]), dtype=np.float32)
+    feature_buffer = np.zeros((min(batch_size, count), features[3]), dtype=np.float32)
+    for start in range(0, count, batch_size):
+        stop = min(start + batch_size, count)
+        block = slice(start, stop)
+        block_texts = _dense_rows(texts, start, stop, np)
+        block_features = _dense_rows(features, start, stop, np)
+        
+        # Compared against the other templates one block at a time, so no
+        # dense matrix spans every template. Their rows are scattered into
+        # the same buffers and cleared entry by entry afterwards, which
+        # costs as much as reading the stored entries, not a full block.
+        scores = np.empty((stop - start, count), dtype=np.float32)
+        overlap = np.empty((stop - start, count), dtype=np.float32)
+        for other in range(0, count, batch_size):
+            other_stop = min(other + batch_size, count)
+            rows = other_stop - other
+            for matrix, buffer, block_rows, out in (
+                (texts, text_buffer, block_texts, scores),
+                (features, feature_buffer, block_features, overlap),
+            ):
+                positions = _scatter_rows(buffer, matrix, other, other_stop, np)
+                out[:, other:other_stop] = block_rows @ buffer[:rows].T
+                buffer[positions] = 0
+        scores *= weights['text']
+        
+        union = feature_counts[block, None] + feature_counts[None, :] - overlap
+        scores += weights['features'] * np.divide(
+            overlap, union, out=np.zeros_like(overlap), where=union > 0
+        )
+        
+        scores += weights['category'] * (categories[block, None] == categories[None, :])
+        
+        # A template is never related to itself
+        scores[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+        
+        candidates = np.argpartition(-scores, top_n - 1, axis=1)[:, :top_n]
+        for offset, columns in enumerate(candidates):
+            row_scores = scores[offset, columns]
+            order = np.argsort(-row_scores, kind='stable')
+            yield int(ids[start + offset]), [
+                (int(ids[columns[index]]), float(row_scores[index]))
+                for index in order
+                if row_scores[index] > 0
+            ]
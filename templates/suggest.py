@@ -0,0 +1,147 @@
+"""
+Typeahead suggestions served from an in-process prefix index.
+
+The index is a sorted array of normalized keys, one for every word
+position in each template title, category name and feature keyword, so
+a prefix lookup is a binary search plus a short scan. Each process builds
+its own index and rebuilds it after the catalog generation changes.
+"""
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import namedtuple
+from django.urls import reverse
+from django.utils.http import urlencode
+from .cache import get_generation
+
+Suggestion = namedtuple('Suggestion', ['type', 'label', 'url'])
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Upper bound on keys scanned per lookup, which keeps one-letter queries
+# as cheap as long ones
+MAX_SCAN = 500
+
+# Seconds between checks of the catalog generation
+REFRESH_INTERVAL = 1.0
+
+
+def normalize(text):
+    return ' '.join(WORD_RE.findall(text.casefold()))
+
+
+def index_keys(label):
+    """Return the normalized label from each word onwards"""
+    words = normalize(label).split(' ')
+    return [' '.join(words[start:]) for start in range(len(words)) if words[start]]
+
+
+class PrefixIndex:
+    """
+    Immutable prefix index over suggestions given in rank order
+    """
+    
+    def __init__(self, suggestions):
+        self.suggestions = suggestions
+        pairs = sorted(
+            (key, position)
+            for position, suggestion in enumerate(suggestions)
+            for key in index_keys(suggestion.label)
+        )
+        self.keys = [key for key, _ in pairs]
+        self.positions = [position for _, position in pairs]
+    
+    def __len__(self):
+        return len(self.suggestions)
+    
+    def search(self, query, limit=8):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        
+        start = bisect_left(self.keys, prefix)
+        positions = set()
+        for i in range(start, min(start + MAX_SCAN, len(self.keys))):
+            if not self.keys[i].startswith(prefix):
+                break
+            positions.add(self.positions[i])
+        # Positions follow rank order
+        return [self.suggestions[position] for position in sorted(positions)[:limit]]
+
+
+def build_index():
+    """Build a prefix index from the active catalog"""
+    from .models import Category, Template
+    
+    # Resolve the URL patterns once instead of once per row
+    detail_url = reverse('templates:detail', kwargs={'slug': '__slug__'})
+    category_url = reverse('templates:category', kwargs={'slug': '__slug__'})
+    list_url = reverse('templates:list')
+    
+    suggestions = []
+    # Feature keywords by case-folded form: [label as first seen, templates]
+    features = {}
+    templates = (
+        Template.objects.filter(active=True)
+        .order_by('-trending_score', '-download_count', 'title')
+        .values_list('title', 'slug', 'features')
+    )
+    for title, slug, template_features in templates.iterator(chunk_size=2000):
+        suggestions.append(Suggestion('template', title, detail_url.replace('__slug__', slug)))
+        for feature in template_features or []:
+            if isinstance(feature, str) and feature.strip():
+                entry = features.setdefault(feature.strip().casefold(), [feature.strip(), 0])
+                entry[1] += 1
+    
+    for name, slug in Category.objects.order_by('name').values_list('name', 'slug'):
+        suggestions.append(Suggestion('category', name, category_url.replace('__slug__', slug)))
+    
+    for feature, _ in sorted(features.values(), key=lambda entry: -entry[1]):
+        suggestions.append(Suggestion(
+            'feature', feature, f'{list_url}?{urlencode({"search": feature})}'
+        ))
+    return PrefixIndex(suggestions)
+
+
+_index = None
+_generation = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_index():
+    """
+    Return this process's index, rebuilding it if the catalog changed.
+    
+    Only one request rebuilds at a time; the others keep answering from
+    the previous index meanwhile.
+    """
+    global _index, _generation, _checked_at
+    
+    now = time.monotonic()
+    if _index is not None and now - _checked_at < REFRESH_INTERVAL:
+        return _index
+    _checked_at = now
+    
+    generation = get_generation()
+    if _index is None:
+        with _lock:
+            if _index is None:
+                _index, _generation = build_index(), generation
+    elif generation != _generation and _lock.acquire(blocking=False):
+        try:
+            _index, _generation = build_index(), generation
+        finally:
+            _lock.release()
+    return _index
+
+
+def reset_index():
+    """Drop the index so the next lookup rebuilds it"""
+    global _index, _generation
+    _index = _generation = None
+
+
+def suggest(query, limit=8):
+    return get_index().search(query, limit)
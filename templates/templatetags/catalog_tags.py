@@ -0,0 +1,21 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def get_item(mapping, key):
+    """Look up a dictionary value by key in templates"""
+    return mapping.get(key)
+
+
+@register.inclusion_tag('templates/_thumbnail.html')
+def thumbnail_picture(template, sizes='100vw', css_class='', style='', lazy=True):
+    """Render a template thumbnail as a responsive <picture>"""
+    return {
+        'template': template,
+        'sizes': sizes,
+        'css_class': css_class,
+        'style': style,
+        'lazy': lazy,
+    }
@@ -1,3 +1,339 @@
-from django.test import TestCase
+import io
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.management import call_command
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core.testing import create_template
+from users.models import User
+from .cache import bump_generation, bump_generation_later, get_generation
+from .models import RATING_VALUES, Review, Template, TemplateEvent
+from .search import BaseSearchBackend, IContainsSearchBackend, SQLiteFTSBackend, search_templates
+from .trending import decayed_score, record_event
 
-# Create your tests here.
+
+class TrendingScoreTests(TestCase):
+    """
+    Trending scores rank recent activity first and stay finite at any date
+    and half-life
+    """
+    
+    def test_recent_activity_ranks_first(self):
+        busy, recent = create_template(1), create_template(2)
+        now = datetime(2026, 10, 18, tzinfo=dt_timezone.utc)
+        for _ in range(20):
+            record_event(busy.pk, TemplateEvent.DOWNLOAD, at=now - timedelta(days=30))
+        record_event(recent.pk, TemplateEvent.DOWNLOAD, at=now)
+        record_event(recent.pk, TemplateEvent.DOWNLOAD, at=now)
+        
+        ranked = list(Template.objects.order_by('-trending_score').values_list('pk', flat=True))
+        self.assertEqual(ranked, [recent.pk, busy.pk])
+        recent.refresh_from_db()
+        self.assertAlmostEqual(decayed_score(recent.trending_score, now), 2.0, places=6)
+    
+    @override_settings(TRENDING_HALF_LIFE_HOURS=1)
+    def test_short_half_life_far_from_origin(self):
+        template = create_template(1)
+        now = datetime(2040, 1, 1, tzinfo=dt_timezone.utc)
+        record_event(template.pk, TemplateEvent.PURCHASE, at=now - timedelta(hours=1))
+        record_event(template.pk, TemplateEvent.DOWNLOAD, at=now)
+        
+        template.refresh_from_db()
+        # 5 decayed by one half-life, plus 1
+        self.assertAlmostEqual(decayed_score(template.trending_score, now), 3.5, places=6)
+    
+    def test_recompute_matches_incremental_scores(self):
+        template = create_template(1)
+        for kind in (TemplateEvent.DOWNLOAD, TemplateEvent.PURCHASE):
+            record_event(template.pk, kind)
+        template.refresh_from_db()
+        
+        Template.objects.update(trending_score=0)
+        call_command('recompute_trending_scores', stdout=io.StringIO())
+        
+        self.assertAlmostEqual(
+            Template.objects.get(pk=template.pk).trending_score, template.trending_score, places=9
+        )
+
+
+class CatalogCounterInvalidationTests(TestCase):
+    """
+    Counter updates that bypass model signals still invalidate cached
+    catalog responses and their ETags, after the debounce interval
+    """
+    
+    def setUp(self):
+        caches['default'].clear()
+        self.template = create_template(1)
+        self.url = reverse('templates_api:template-list')
+    
+    def test_trending_update_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        
+        with self.settings(CATALOG_COUNTER_DEBOUNCE=3600):
+            with self.captureOnCommitCallbacks(execute=True):
+                record_event(self.template.pk, TemplateEvent.PURCHASE)
+            # Within the debounce interval the cached response still stands
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        
+        with self.settings(CATALOG_COUNTER_DEBOUNCE=0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_pending_bumps_fold_into_one(self):
+        generation = get_generation()
+        with self.settings(CATALOG_COUNTER_DEBOUNCE=0):
+            bump_generation_later()
+            bump_generation_later()
+            self.assertEqual(get_generation(), generation + 1)
+            self.assertEqual(get_generation(), generation + 1)
+
+
+class SearchTests(TestCase):
+    """
+    Catalog search narrows to matching templates, best match first
+    """
+    
+    def setUp(self):
+        self.in_description = create_template(1, title='Shop Bot', description='Weather alerts')
+        self.in_title = create_template(2, title='Weather Bot')
+        create_template(3, title='Quiz Bot')
+    
+    def test_title_match_ranks_first(self):
+        # post_save receivers have already indexed the new templates
+        results = search_templates(Template.objects.all(), 'weather')
+        self.assertEqual(list(results), [self.in_title, self.in_description])
+    
+    def test_index_is_matched_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            list(SQLiteFTSBackend().search(Template.objects.all(), 'weather'))
+        
+        # A join rather than a subquery per matching row
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(queries[0]['sql'].count('SELECT'), 1)
+    
+    def test_fallback_backend(self):
+        results = IContainsSearchBackend().search(Template.objects.all(), 'weather')
+        
+        self.assertCountEqual(results, [self.in_title, self.in_description])
+        self.assertEqual({template.search_rank for template in results}, {0.0})
+    
+    def test_backends_must_implement_search(self):
+        with self.assertRaises(TypeError):
+            BaseSearchBackend()
+
+
+class RatingAggregateTests(TestCase):
+    """
+    Review signals keep each template's rating sum, count, average and
+    histogram in step with its reviews
+    """
+    
+    def setUp(self):
+        self.template = create_template(1)
+        self.other = create_template(2)
+        self.users = [
+            User.objects.create_user(f'user{number}', f'user{number}@example.com', 'password')
+            for number in range(3)
+        ]
+    
+    def assertAggregates(self, template, ratings):
+        template.refresh_from_db()
+        self.assertEqual(template.review_count, len(ratings))
+        self.assertEqual(template.rating_sum, sum(ratings))
+        self.assertAlmostEqual(
+            template.average_rating, sum(ratings) / len(ratings) if ratings else 0
+        )
+        for rating in RATING_VALUES:
+            self.assertEqual(getattr(template, f'rating_{rating}_count'), ratings.count(rating))
+    
+    def test_create_update_and_delete(self):
+        first = Review.objects.create(user=self.users[0], template=self.template, rating=5)
+        second = Review.objects.create(user=self.users[1], template=self.template, rating=2)
+        self.assertAggregates(self.template, [5, 2])
+        
+        second.rating = 4
+        second.save()
+        self.assertAggregates(self.template, [5, 4])
+        
+        first.delete()
+        self.assertAggregates(self.template, [4])
+        second.delete()
+        self.assertAggregates(self.template, [])
+    
+    def test_review_moved_to_another_template(self):
+        review = Review.objects.create(user=self.users[0], template=self.template, rating=3)
+        
+        review.template = self.other
+        review.save()
+        
+        self.assertAggregates(self.template, [])
+        self.assertAggregates(self.other, [3])
+    
+    def test_deferred_instance_rebuilds(self):
+        Review.objects.create(user=self.users[0], template=self.template, rating=1)
+        review = Review.objects.only('id', 'template_id').get()
+        
+        review.rating = 5
+        review.save()
+        
+        self.assertAggregates(self.template, [5])
+    
+    def test_rebuild_matches_reviews(self):
+        for user, rating in zip(self.users, (5, 5, 3)):
+            Review.objects.create(user=user, template=self.template, rating=rating)
+        Template.objects.update(rating_sum=0, review_count=0, average_rating=0, rating_5_count=0)
+        
+        Template.rebuild_rating_aggregates()
+        
+        self.assertAggregates(self.template, [5, 5, 3])
+        self.assertAggregates(self.other, [])
+
+
+class CatalogCacheTests(TestCase):
+    """
+    Anonymous catalog requests are served from the versioned cache until
+    the catalog changes
+    """
+    
+    def setUp(self):
+        caches['default'].clear()
+        self.template = create_template(1)
+        self.url = reverse('templates:list')
+    
+    def test_second_request_is_a_hit(self):
+        self.assertEqual(self.client.get(self.url)['X-Catalog-Cache'], 'MISS')
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Catalog-Cache'], 'HIT')
+        self.assertContains(response, self.template.title)
+    
+    def test_saving_a_template_invalidates(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.template.title = 'Renamed Bot'
+            self.template.save()
+        
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Catalog-Cache'], 'MISS')
+        self.assertContains(response, 'Renamed Bot')
+    
+    def test_logged_in_users_bypass_the_cache(self):
+        user = User.objects.create_user('buyer', 'buyer@example.com', 'password')
+        self.client.force_login(user)
+        
+        self.assertFalse(self.client.get(self.url).has_header('X-Catalog-Cache'))
+    
+    def test_unknown_parameters_bypass_the_cache(self):
+        self.assertFalse(self.client.get(self.url, {'utm_source': 'x'}).has_header('X-Catalog-Cache'))
+
+
+class ConditionalGetTests(TestCase):
+    """
+    Catalog pages carry validators and answer matching conditional
+    requests with 304 before rendering
+    """
+    
+    def setUp(self):
+        caches['default'].clear()
+        self.template = create_template(1)
+        self.url = reverse('templates:detail', args=[self.template.slug])
+    
+    def test_matching_etag_is_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        
+        # Only the template's updated_at is read
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+    
+    def test_template_edit_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.template.price = 20
+            self.template.save()
+        
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+    
+    def test_api_detail_has_validators(self):
+        url = reverse('templates_api:template-detail', args=[self.template.pk])
+        response = self.client.get(url)
+        
+        self.assertTrue(response.has_header('Last-Modified'))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+    
+    def test_missing_template_is_not_found(self):
+        url = reverse('templates:detail', args=['missing'])
+        
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"x"').status_code, 404)
+@override_settings(REVIEWS_PAGE_SIZE=2)
+class ReviewPageTests(TestCase):
+    """
+    The detail page shows the cached newest reviews and links to the rest,
+    paged by cursor
+    """
+    
+    def setUp(self):
+        caches['default'].clear()
+        self.template = create_template(1)
+        self.reviews = []
+        for number in range(3):
+            user = User.objects.create_user(f'user{number}', f'user{number}@example.com', 'password')
+            self.reviews.append(
+                Review.objects.create(user=user, template=self.template, rating=number + 1)
+            )
+        self.url = reverse('templates:detail', args=[self.template.slug])
+    
+    def test_pages_cover_every_review_once(self):
+        response = self.client.get(self.url)
+        first_page = list(response.context['reviews'])
+        self.assertEqual(first_page, self.reviews[:0:-1])
+        
+        response = self.client.get(response.context['more_reviews_url'])
+        self.assertEqual(list(response.context['reviews']), [self.reviews[0]])
+    
+    def test_new_review_refreshes_cached_first_page(self):
+        self.client.get(self.url)
+        user = User.objects.create_user('late', 'late@example.com', 'password')
+        with self.captureOnCommitCallbacks(execute=True):
+            review = Review.objects.create(user=user, template=self.template, rating=5)
+        
+        response = self.client.get(self.url)
+        self.assertEqual(list(response.context['reviews'])[0], review)
+    
+    def test_api_pages_by_cursor(self):
+        url = reverse('templates_api:template-reviews', args=[self.template.slug])
+        
+        first = self.client.get(url).json()
+        self.assertEqual([review['id'] for review in first['results']], [
+            review.pk for review in self.reviews[:0:-1]
+        ])
+        self.assertIsNone(first['previous'])
+        
+        second = self.client.get(first['next']).json()
+        self.assertEqual([review['id'] for review in second['results']], [self.reviews[0].pk])
+        self.assertIsNone(second['next'])
+    
+    def test_api_first_page_is_cached(self):
+        url = reverse('templates_api:template-reviews', args=[self.template.slug])
+        self.client.get(url)
+        bump_generation()
+        
+        # With the catalog cache gone only the template lookup is left
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(len(response.json()['results']), 2)
+    
+    def test_histogram(self):
+        self.template.refresh_from_db()
+        
+        self.assertEqual(
+            [(bar['rating'], bar['count'], bar['percent']) for bar in self.template.rating_histogram],
+            [(5, 0, 0), (4, 0, 0), (3, 1, 33), (2, 1, 33), (1, 1, 33)]
+        )
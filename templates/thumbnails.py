@@ -0,0 +1,193 @@
+"""
+Responsive thumbnail variants.
+
+Every uploaded thumbnail is resized into a few widths in WebP and JPEG.
+Variant files are named after a hash of their bytes, so a variant URL
+always refers to the same content and can be cached forever. The stored
+names are recorded on `Template.thumbnail_variants`:
+
+    {'source': 'templates/thumbnails/<uuid>.png',
+     'webp': {'320': 'templates/thumbnails/variants/<hash>-320w.webp', ...},
+     'jpeg': {'320': 'templates/thumbnails/variants/<hash>-320w.jpg', ...}}
+
+Variants whose `source` no longer matches the thumbnail are stale and
+ignored until they are regenerated.
+"""
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+VARIANT_DIR = 'templates/thumbnails/variants'
+
+DEFAULT_WIDTHS = (320, 640, 960)
+
+# Variant key -> (Pillow format, file extension, save options)
+FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+_executor = None
+
+
+def get_widths():
+    return tuple(sorted(getattr(settings, 'THUMBNAIL_VARIANT_WIDTHS', DEFAULT_WIDTHS)))
+
+
+def get_storage():
+    from .models import Template
+    return Template._meta.get_field('thumbnail').storage
+
+
+def render_variants(data, widths):
+    """
+    Resize raw image bytes into every width and format.
+    
+    Only depends on its arguments so the backfill command can run it in
+    worker processes. Images are never upscaled. Returns a list of
+    `(variant key, width, bytes)`.
+    """
+    from PIL import Image, ImageOps
+    
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(data)))
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    
+    rendered = []
+    for width in sorted({min(width, image.width) for width in widths}):
+        if width == image.width:
+            resized = image
+        else:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+        
+        for key, (image_format, extension, options) in FORMATS.items():
+            frame = resized
+            if image_format == 'JPEG' and frame.mode == 'RGBA':
+                frame = Image.new('RGB', resized.size, (255, 255, 255))
+                frame.paste(resized, mask=resized.getchannel('A'))
+            buffer = io.BytesIO()
+            frame.save(buffer, image_format, **options)
+            rendered.append((key, width, buffer.getvalue()))
+    return rendered
+
+
+def variant_name(content, width, extension):
+    digest = hashlib.sha256(content).hexdigest()[:20]
+    return f'{VARIANT_DIR}/{digest}-{width}w.{extension}'
+
+
+def store_variants(source_name, rendered):
+    """Write rendered variants to storage and return the variants mapping"""
+    storage = get_storage()
+    variants = {'source': source_name}
+    for key, width, content in rendered:
+        name = variant_name(content, width, FORMATS[key][1])
+        # Same name means same bytes, so an existing file can be reused
+        if not storage.exists(name):
+            name = storage.save(name, ContentFile(content))
+        variants.setdefault(key, {})[str(width)] = name
+    return variants
+
+
+def save_variants(template_id, variants):
+    """
+    Record variants unless the thumbnail was replaced in the meantime.
+    Returns True if the row was updated.
+    """
+    from .models import Template
+    return bool(
+        Template.objects
+        .filter(pk=template_id, thumbnail=variants.get('source'))
+        .update(thumbnail_variants=variants)
+    )
+
+
+def generate_variants(template_id):
+    """Render, store and record the variants of one template's thumbnail"""
+    from .cache import bump_generation
+    from .models import Template
+    
+    template = Template.objects.filter(pk=template_id).only('thumbnail').first()
+    if template is None:
+        return
+    
+    if not template.thumbnail:
+        Template.objects.filter(pk=template_id).update(thumbnail_variants={})
+    else:
+        with template.thumbnail.open('rb') as image_file:
+            data = image_file.read()
+        variants = store_variants(template.thumbnail.name, render_variants(data, get_widths()))
+        if not save_variants(template_id, variants):
+            return
+    # Cached catalog pages embed the old srcset
+    transaction.on_commit(bump_generation)
+
+
+def _generate_in_background(template_id):
+    try:
+        generate_variants(template_id)
+    except Exception:
+        logger.exception('Thumbnail variants failed for template %s', template_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_variants(template_id):
+    """
+    Generate variants once the current transaction commits, on a
+    background thread unless THUMBNAIL_VARIANTS_ASYNC is False
+    """
+    global _executor
+    
+    if not getattr(settings, 'THUMBNAIL_VARIANTS_ASYNC', True):
+        transaction.on_commit(lambda: generate_variants(template_id))
+        return
+    
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='thumbnails')
+    transaction.on_commit(lambda: _executor.submit(_generate_in_background, template_id))
+
+
+def has_current_variants(template):
+    variants = template.thumbnail_variants or {}
+    return bool(template.thumbnail) and variants.get('source') == template.thumbnail.name
+
+
+def build_srcsets(template, build_url=None):
+    """
+    Return `{variant key: srcset string}` for a template's current
+    variants, or an empty dict when there are none
+    """
+    if not has_current_variants(template):
+        return {}
+    
+    storage = get_storage()
+    srcsets = {}
+    for key in FORMATS:
+        names = template.thumbnail_variants.get(key) or {}
+        candidates = []
+        for width in sorted(names, key=int):
+            url = storage.url(names[width])
+            if build_url is not None:
+                url = build_url(url)
+            candidates.append(f'{url} {width}w')
+        if candidates:
+            srcsets[key] = ', '.join(candidates)
+    return srcsets
+
+
+def get_fallback_url(template):
+    """URL for `<img src>`: the largest JPEG variant, else the original"""
+    if has_current_variants(template):
+        names = template.thumbnail_variants.get('jpeg') or {}
+        if names:
+            return get_storage().url(names[max(names, key=int)])
+    return template.thumbnail.url if template.thumbnail else ''
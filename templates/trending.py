@@ -0,0 +1,100 @@
+"""
+Time-decayed trending scores.
+
+An event of weight `w` at time `t` is worth `w * 2 ** ((t - now) / half_life)`
+today. Every score decays by the same factor over time, so ordering by
+`sum(w * 2 ** ((t - ORIGIN) / half_life))` is the same as ordering by the
+decayed score, and no periodic decay pass is needed.
+
+That sum grows without bound (a float overflows after about 1024
+half-lives), so `Template.trending_score` stores its base-2 logarithm:
+`log2(w) + (t - ORIGIN) / half_life` per event, combined with `add_scores`
+(log2 of the sum of the two). Stored values grow linearly with time and
+never overflow, whatever the half-life or date. 0 means no events.
+`decayed_score` turns a stored value back into the current score for
+display.
+
+Changing TRENDING_HALF_LIFE_HOURS changes the scale of every score, so run
+the recompute_trending_scores command afterwards.
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Abs, Greatest, Least, Log, Power
+from django.utils import timezone
+
+# Origin of the stored scale; any fixed time works
+ORIGIN = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+# Past this many half-lives apart the smaller score no longer changes the
+# larger one; also keeps POWER() clear of underflow errors
+MAX_GAP = 64.0
+
+DEFAULT_WEIGHTS = {'download': 1.0, 'purchase': 5.0}
+
+
+def get_half_life():
+    return timedelta(hours=getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 72))
+
+
+def get_weight(kind):
+    weights = {**DEFAULT_WEIGHTS, **getattr(settings, 'TRENDING_EVENT_WEIGHTS', {})}
+    return weights[kind]
+
+
+def event_score(kind, at, half_life=None):
+    """Return the stored (log2) score of one event"""
+    half_life = half_life or get_half_life()
+    return math.log2(get_weight(kind)) + (at - ORIGIN) / half_life
+
+
+def add_scores(first, second):
+    """Combine two stored scores, as adding their decayed values would"""
+    if not first:
+        return second
+    if not second:
+        return first
+    gap = min(abs(first - second), MAX_GAP)
+    return max(first, second) + math.log2(1 + 2 ** -gap)
+
+
+def add_scores_expression(score, field='trending_score'):
+    """
+    Return an UPDATE expression combining the stored score in `field` with
+    `score`, a number or an expression, as add_scores does
+    """
+    if isinstance(score, (int, float)):
+        score = Value(float(score))
+    gap = Least(Abs(F(field) - score), Value(MAX_GAP))
+    return Case(
+        When(**{field: 0}, then=score),
+        default=Greatest(F(field), score) + Log(
+            Value(2.0), Value(1.0) + Power(Value(2.0), -gap)
+        ),
+        output_field=FloatField()
+    )
+
+
+def decayed_score(stored_score, now=None):
+    """Convert a stored trending score into its current decayed value"""
+    if not stored_score:
+        return 0.0
+    exponent = stored_score - ((now or timezone.now()) - ORIGIN) / get_half_life()
+    # Scores stored under a shorter half-life, until recompute_trending_scores
+    # runs, could otherwise overflow
+    return 2 ** min(exponent, MAX_GAP)
+
+
+def record_event(template_id, kind, at=None):
+    """Log an event and add its weight to the template's trending score"""
+    from .cache import bump_generation_later
+    from .models import Template, TemplateEvent
+    
+    at = at or timezone.now()
+    TemplateEvent.objects.create(template_id=template_id, kind=kind, created_at=at)
+    Template.objects.filter(pk=template_id).update(
+        trending_score=add_scores_expression(event_score(kind, at))
+    )
+    transaction.on_commit(bump_generation_later)
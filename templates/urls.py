@@ -8,5 +8,6 @@ urlpatterns = [
     path('category/<slug:slug>/', views.CategoryTemplatesView.as_view(), name='category'),
     path('<slug:slug>/', views.TemplateDetailView.as_view(), name='detail'),
     path('<slug:slug>/demo/', views.GenerateDemoView.as_view(), name='demo'),
+    path('<slug:slug>/reviews/', views.TemplateReviewsView.as_view(), name='reviews'),
     path('<slug:slug>/review/', views.CreateReviewView.as_view(), name='review'),
 ]
\ No newline at end of file
@@ -3,22 +3,30 @@ from django.views.generic import ListView, DetailView, CreateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.http import JsonResponse
-from django.db.models import Q, Avg
-from django.core.paginator import Paginator
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.conf import settings
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from core.pagination import KeysetPaginationMixin
 from .models import Template, Category, Review
 from .forms import ReviewForm
+from .filters import filter_templates
+from .facets import compute_facets
+from .cache import CatalogCacheMixin, get_or_compute
+from .reviews import (
+    REVIEW_ORDERING, get_first_review_page, get_review_queryset,
+    get_page_size as get_review_page_size
+)
+from .conditional import CatalogConditionalMixin
 from .serializers import (
-    TemplateSerializer, TemplateListSerializer, CategorySerializer, 
-    ReviewSerializer, CreateReviewSerializer
+    CategorySerializer, ReviewSerializer, CreateReviewSerializer
 )
 
 
-class TemplateListView(ListView):
+class TemplateListView(CatalogConditionalMixin, CatalogCacheMixin, KeysetPaginationMixin, ListView):
     """
     Template catalog with filtering and search
     """
@@ -26,46 +34,58 @@ class TemplateListView(ListView):
     template_name = 'templates/list.html'
     context_object_name = 'templates'
     paginate_by = 12
+    valid_sorts = ['-created_at', 'created_at', 'price', '-price', 'title', '-title']
+    keyset_orderings = valid_sorts
+    
+    def get_base_queryset(self):
+        return Template.objects.filter(active=True).select_related('category')
     
     def get_queryset(self):
-        queryset = Template.objects.filter(active=True).select_related('category')
-        
-        # Search functionality
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search) |
-                Q(short_description__icontains=search)
-            )
-        
-        # Category filter
-        category_slug = self.request.GET.get('category')
-        if category_slug:
-            queryset = queryset.filter(category__slug=category_slug)
+        queryset = filter_templates(self.get_base_queryset(), self.request.GET)
         
-        # Price filter
-        min_price = self.request.GET.get('min_price')
-        max_price = self.request.GET.get('max_price')
-        if min_price:
-            queryset = queryset.filter(price__gte=min_price)
-        if max_price:
-            queryset = queryset.filter(price__lte=max_price)
-        
-        # Sorting
-        sort = self.request.GET.get('sort', '-created_at')
-        valid_sorts = ['-created_at', 'created_at', 'price', '-price', 'title', '-title']
-        if sort in valid_sorts:
+        # Sorting (searches keep their relevance order by default)
+        sort = self.get_sort()
+        if sort in self.valid_sorts:
             queryset = queryset.order_by(sort)
         
         return queryset
     
+    def use_keyset_pagination(self):
+        return getattr(settings, 'CATALOG_KEYSET_PAGINATION', False)
+    
+    def get_sort(self):
+        default = 'relevance' if self.request.GET.get('search', '').strip() else '-created_at'
+        return self.request.GET.get('sort') or default
+    
+    def get_selected_category(self):
+        return self.request.GET.get('category') or None
+    
+    def get_facets(self):
+        """Facet counts for the current search and filters, cached per generation"""
+        selected = self.get_selected_category()
+        params = [
+            (name, self.request.GET.get(name, '').strip())
+            for name in ('search', 'min_price', 'max_price')
+        ] + [('category', selected or '')]
+        
+        def compute():
+            queryset = filter_templates(
+                self.get_base_queryset(), self.request.GET, category=False
+            )
+            return compute_facets(queryset, selected_category=selected)
+        
+        return get_or_compute('facets', params, compute)
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['categories'] = Category.objects.all()
+        context['facets'] = self.get_facets()
+        context['category_counts'] = {
+            category['id']: category['count'] for category in context['facets']['categories']
+        }
         context['current_category'] = self.request.GET.get('category')
         context['current_search'] = self.request.GET.get('search', '')
-        context['current_sort'] = self.request.GET.get('sort', '-created_at')
+        context['current_sort'] = self.get_sort()
         return context
 
 
@@ -77,13 +97,16 @@ class CategoryTemplatesView(TemplateListView):
         self.category = get_object_or_404(Category, slug=self.kwargs['slug'])
         return super().get_queryset().filter(category=self.category)
     
+    def get_selected_category(self):
+        return self.category.slug
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['category'] = self.category
         return context
 
 
-class TemplateDetailView(DetailView):
+class TemplateDetailView(CatalogConditionalMixin, DetailView):
     """
     Template detail page with reviews and purchase option
     """
@@ -91,6 +114,9 @@ class TemplateDetailView(DetailView):
     template_name = 'templates/detail.html'
     context_object_name = 'template'
     
+    def get_conditional_lookup(self):
+        return {'slug': self.kwargs['slug']}
+    
     def get_queryset(self):
         return Template.objects.filter(active=True).select_related('category')
     
@@ -98,19 +124,45 @@ class TemplateDetailView(DetailView):
         context = super().get_context_data(**kwargs)
         template = self.object
         
-        # Get reviews
-        context['reviews'] = template.reviews.select_related('user').order_by('-created_at')
+        # First page of reviews, cached per template
+        reviews = get_first_review_page(template.pk)
+        context['reviews'] = reviews
+        if reviews.has_next():
+            context['more_reviews_url'] = '{}?{}'.format(
+                reverse('templates:reviews', kwargs={'slug': template.slug}),
+                urlencode({'cursor': reviews.next_cursor})
+            )
         context['review_form'] = ReviewForm()
         
         # Related templates
-        context['related_templates'] = Template.objects.filter(
-            category=template.category,
-            active=True
-        ).exclude(id=template.id)[:3]
+        context['related_templates'] = template.get_related_templates()
         
         return context
 
 
+class TemplateReviewsView(KeysetPaginationMixin, ListView):
+    """
+    All reviews of a template, paginated by cursor
+    """
+    template_name = 'templates/reviews.html'
+    context_object_name = 'reviews'
+    keyset_orderings = (REVIEW_ORDERING,)
+    
+    def get_paginate_by(self, queryset):
+        return get_review_page_size()
+    
+    def get_queryset(self):
+        self.template = get_object_or_404(
+            Template.objects.select_related('category'), slug=self.kwargs['slug'], active=True
+        )
+        return get_review_queryset(self.template.pk)
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['template'] = self.template
+        return context
+
+
 class CreateReviewView(LoginRequiredMixin, CreateView):
     """
     Create a review for a template
@@ -174,54 +226,6 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     lookup_field = 'slug'
 
 
-class TemplateViewSet(viewsets.ReadOnlyModelViewSet):
-    """
-    API ViewSet for templates
-    """
-    queryset = Template.objects.filter(active=True)
-    lookup_field = 'slug'
-    
-    def get_serializer_class(self):
-        if self.action == 'list':
-            return TemplateListSerializer
-        return TemplateSerializer
-    
-    def get_queryset(self):
-        queryset = Template.objects.filter(active=True).select_related('category')
-        
-        # Search functionality
-        search = self.request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search) |
-                Q(short_description__icontains=search)
-            )
-        
-        # Category filter
-        category = self.request.query_params.get('category')
-        if category:
-            queryset = queryset.filter(category__slug=category)
-        
-        # Price filter
-        min_price = self.request.query_params.get('min_price')
-        max_price = self.request.query_params.get('max_price')
-        if min_price:
-            queryset = queryset.filter(price__gte=min_price)
-        if max_price:
-            queryset = queryset.filter(price__lte=max_price)
-        
-        return queryset
-    
-    @action(detail=True, methods=['get'])
-    def reviews(self, request, slug=None):
-        """Get reviews for a specific template"""
-        template = self.get_object()
-        reviews = template.reviews.select_related('user').order_by('-created_at')
-        serializer = ReviewSerializer(reviews, many=True)
-        return Response(serializer.data)
-
-
 class ReviewViewSet(viewsets.ModelViewSet):
     """
     API ViewSet for reviews
@@ -5,6 +5,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import CreateView, UpdateView, TemplateView
 from django.contrib import messages
 from django.urls import reverse_lazy
+from orders.models import PurchaseSummary, prefetch_items
 from .models import User
 from .forms import UserRegistrationForm, UserProfileForm
 
@@ -86,11 +87,13 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         user = self.request.user
         
-        # Get user's orders
-        context['orders'] = user.orders.select_related('template').order_by('-created_at')[:10]
-        context['completed_orders'] = user.orders.filter(status='completed').count()
-        context['total_spent'] = sum(
-            order.amount for order in user.orders.filter(status='completed')
-        )
+        summary = PurchaseSummary.for_user(user.pk)
+        context['summary'] = summary
+        context['completed_orders'] = summary['completed_count']
+        context['spent_by_currency'] = summary['spent_by_currency']
+        context['total_orders'] = user.orders.count()
+        context['orders'] = user.orders.select_related(
+            'template', 'template__category'
+        ).prefetch_related(prefetch_items()).order_by('-created_at')[:10]
         
         return context